@@ -0,0 +1,247 @@
+"""
+Parallel, resumable batch jobs over large tables.
+
+A :class:`BatchJob` names a queryset and what to do with one chunk of it.
+:class:`BatchRunner` splits the queryset into primary-key ranges of
+``chunk_size`` rows (one indexed keyset query per boundary, never loading
+the rows themselves) and runs the chunks, in a ``ProcessPoolExecutor``
+when ``workers`` > 1, each chunk in its own transaction.
+
+* Worker processes open their own database connections: the parent
+  computes every chunk boundary first, then closes its connections just
+  before the pool forks, and each worker closes whatever it inherited.
+* Failed chunks are retried with exponential backoff, then reported.
+* A JSON checkpoint records the primary key below which every chunk has
+  finished. A rerun resumes from there, so jobs must be idempotent:
+  chunks above the checkpoint that finished before an interruption run
+  again.
+* ``rate`` caps rows per second across all workers.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJob:
+    """
+    Base class for batch jobs; subclasses must be importable and picklable.
+
+    Override :meth:`get_queryset` and :meth:`process_chunk`. The job
+    instance is sent to worker processes, so keep its attributes to plain
+    values (no querysets or open files).
+    """
+    #: Checkpoint name; defaults to the class name.
+    name = None
+    chunk_size = 1000
+
+    def get_name(self):
+        return self.name or type(self).__name__
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def process_chunk(self, queryset):
+        """Process the rows of one chunk and return how many were handled."""
+        raise NotImplementedError
+
+
+def chunk_bounds(queryset, chunk_size, after=None):
+    """
+    Yield ``(after_pk, last_pk)`` ranges of up to ``chunk_size`` rows.
+
+    Each boundary is one ``ORDER BY pk LIMIT 1 OFFSET n`` query on the
+    primary key index.
+    """
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        remaining = pks.filter(pk__gt=after) if after is not None else pks
+        last = remaining[chunk_size - 1:chunk_size].first()
+        if last is None:
+            last = remaining.reverse().first()
+            if last is None:
+                return
+            yield after, last
+            return
+        yield after, last
+        after = last
+
+
+def chunk_queryset(queryset, after, last):
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    return queryset.filter(pk__lte=last)
+
+
+def run_chunk(job, after, last):
+    """Run one chunk of ``job`` in a transaction (also the worker entry point)."""
+    with transaction.atomic():
+        return job.process_chunk(chunk_queryset(job.get_queryset(), after, last))
+
+
+def _init_worker():
+    # Needed under the spawn/forkserver start methods; a no-op after fork.
+    django.setup()
+    # The parent closed its connections before forking; make sure this
+    # worker starts without any so it opens its own.
+    connections.close_all()
+
+
+@dataclass
+class BatchResult:
+    processed: int = 0
+    chunks: int = 0
+    failed: list = field(default_factory=list)
+    resumed_after: object = None
+
+
+class Checkpoint:
+    """JSON file holding the resume point of one job."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def for_job(cls, job):
+        return cls(Path(settings.BATCH_CHECKPOINT_DIR) / f'{job.get_name()}.json')
+
+    def load(self):
+        try:
+            return json.loads(self.path.read_text()).get('done_through')
+        except FileNotFoundError:
+            return None
+
+    def save(self, done_through, processed):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'done_through': done_through, 'processed': processed}))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+class BatchRunner:
+    """
+    Run a :class:`BatchJob` over all of its chunks.
+
+    ``progress`` is called as ``progress(result, total_rows)`` after each
+    chunk. ``checkpoint`` is a :class:`Checkpoint`, or ``None`` to always
+    start from the beginning.
+    """
+
+    def __init__(self, job, workers=1, rate=None, retries=2, retry_delay=1.0,
+                 checkpoint=None, progress=None):
+        self.job = job
+        self.workers = max(1, workers)
+        self.rate = rate
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.checkpoint = checkpoint
+        self.progress = progress
+
+    def run(self):
+        queryset = self.job.get_queryset()
+        result = BatchResult(resumed_after=self.checkpoint.load() if self.checkpoint else None)
+        if result.resumed_after is not None:
+            queryset = queryset.filter(pk__gt=result.resumed_after)
+        total = queryset.count()
+        bounds = chunk_bounds(queryset, self.job.chunk_size, result.resumed_after)
+
+        if self.workers == 1:
+            self._run(bounds, result, total, submit=self._run_inline)
+        else:
+            # Run every boundary query now: forked workers must not inherit
+            # (and share) a connection, so none may be opened after this.
+            bounds = list(bounds)
+            connections.close_all()
+            with ProcessPoolExecutor(self.workers, initializer=_init_worker) as executor:
+                self._run(bounds, result, total, submit=lambda *args: executor.submit(run_chunk, self.job, *args))
+
+        if self.checkpoint and not result.failed:
+            self.checkpoint.clear()
+        return result
+
+    def _run_inline(self, after, last):
+        # Mimic a completed future so both modes share one loop.
+        future = Future()
+        try:
+            future.set_result(run_chunk(self.job, after, last))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _throttle(self, started, submitted_rows):
+        if self.rate:
+            ahead = submitted_rows / self.rate - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def _run(self, bounds, result, total, submit):
+        started = time.monotonic()
+        order = deque()        # chunks in pk order, to advance the checkpoint
+        finished = set()
+        running = {}           # future -> (after, last, attempt)
+        retry_at = []          # (ready time, after, last, attempt)
+        submitted_rows = 0
+        bounds = iter(bounds)
+        exhausted = False
+
+        while True:
+            now = time.monotonic()
+            ready = [item for item in retry_at if item[0] <= now]
+            retry_at = [item for item in retry_at if item[0] > now]
+            for _, after, last, attempt in ready:
+                running[submit(after, last)] = (after, last, attempt)
+            while not exhausted and len(running) < self.workers * 2:
+                chunk = next(bounds, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                self._throttle(started, submitted_rows)
+                order.append(chunk)
+                running[submit(*chunk)] = (*chunk, 0)
+                submitted_rows += self.job.chunk_size
+
+            if not running:
+                if retry_at:
+                    time.sleep(max(0, min(item[0] for item in retry_at) - time.monotonic()))
+                    continue
+                break
+
+            done, _ = wait(running, timeout=self.retry_delay, return_when=FIRST_COMPLETED)
+            for future in done:
+                after, last, attempt = running.pop(future)
+                try:
+                    result.processed += future.result()
+                except Exception as e:
+                    if attempt < self.retries:
+                        logger.warning("Chunk (%s, %s] failed, retrying: %s", after, last, e)
+                        retry_at.append((time.monotonic() + self.retry_delay * 2 ** attempt, after, last, attempt + 1))
+                        continue
+                    logger.error("Chunk (%s, %s] failed after %s attempts: %s", after, last, attempt + 1, e)
+                    result.failed.append((after, last, repr(e)))
+                    continue
+                result.chunks += 1
+                finished.add((after, last))
+                if self.progress:
+                    self.progress(result, total)
+            self._advance_checkpoint(order, finished, result)
+
+    def _advance_checkpoint(self, order, finished, result):
+        done_through = None
+        while order and order[0] in finished:
+            finished.discard(order[0])
+            done_through = order.popleft()[1]
+        if done_through is not None and self.checkpoint:
+            self.checkpoint.save(done_through, result.processed)
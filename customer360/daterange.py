@@ -0,0 +1,56 @@
+"""
+Calendar dates to datetime ranges for filtering DateTimeFields.
+
+With ``USE_TZ`` a lookup like ``interaction_date__date__gte`` casts the
+column to a date in the current time zone, so no index on it can be used.
+The helpers here turn user dates into half-open ``[start, end)`` ranges of
+aware datetimes in the current time zone instead, which filter the raw
+column with plain ``>=``/``<`` comparisons.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def start_of_day(day):
+    """Aware datetime for local midnight at the start of ``day``."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_range(start=None, end=None):
+    """
+    ``(since, until)`` covering the days ``start`` through ``end`` inclusive.
+
+    Either bound may be ``None`` for an open-ended range.
+    """
+    since = start_of_day(start) if start else None
+    until = start_of_day(end + timedelta(days=1)) if end else None
+    return since, until
+
+
+def range_lookups(field, start=None, end=None):
+    """
+    Filter kwargs selecting rows of ``field`` on days ``start``..``end``.
+
+    ``Interaction.objects.filter(**range_lookups('interaction_date', d1, d2))``
+    """
+    since, until = day_range(start, end)
+    lookups = {}
+    if since:
+        lookups[f'{field}__gte'] = since
+    if until:
+        lookups[f'{field}__lt'] = until
+    return lookups
+
+
+def days_ago(days):
+    """Local midnight ``days`` days before today, for "last N days" filters."""
+    return start_of_day(timezone.localdate() - timedelta(days=days))
+
+
+def month_range(day=None):
+    """``(since, until)`` for the calendar month containing ``day`` (default today)."""
+    day = day or timezone.localdate()
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return start_of_day(first), start_of_day(next_month)
@@ -0,0 +1,193 @@
+"""
+Minimal thread-safe database connection pool.
+
+Used by the pooled PostgreSQL backend (``customer360.db.postgresql``) but
+independent of any driver: connections are created by the callable passed
+to :meth:`ConnectionPool.acquire` and only need a ``close()`` method. The
+optional ``check`` callable passed alongside tells whether an idle
+connection still works (the server or a proxy may have dropped it).
+Pools live per process, so the server-side connection count is roughly
+workers x ``max_size``.
+"""
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded LIFO pool of connections with idle and lifetime limits.
+
+    Idle connections are reused most-recently-returned first, so surplus
+    connections age out through ``max_idle`` when traffic drops.
+    """
+
+    def __init__(self, max_size=10, timeout=5.0, max_idle=300.0, max_lifetime=3600.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, created_at, returned_at)
+        self._created_at = {}
+        self._size = 0
+        self.in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.failed_checks = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _expired(self, created_at, returned_at, now):
+        return now - created_at > self.max_lifetime or now - returned_at > self.max_idle
+
+    def _discard(self, connection):
+        # Caller holds the lock.
+        self._size -= 1
+        self._created_at.pop(id(connection), None)
+        self.closed += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, connect, check=None):
+        """
+        Return an idle connection, or one from ``connect()`` if the pool has
+        room. Otherwise wait up to ``timeout`` seconds for a release.
+
+        Idle connections for which ``check(connection)`` is false are
+        discarded and the next one (or a new one) is tried instead.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            connection = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        connection, created_at, returned_at = self._idle.pop()
+                        if self._expired(created_at, returned_at, now):
+                            self._discard(connection)
+                            connection = None
+                            continue
+                        break
+                    if connection is not None or self._size < self.max_size:
+                        if connection is None:
+                            self._size += 1
+                        self._checked_out(started, waited)
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"No connection available within {self.timeout}s "
+                            f"({self.in_use} of {self.max_size} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+            if connection is None:
+                break
+            # Check outside the lock: it's a round trip to the server.
+            if check is None or self._check(check, connection):
+                return connection
+            with self._cond:
+                self.in_use -= 1
+                self.checkouts -= 1
+                self.failed_checks += 1
+                self._discard(connection)
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self.in_use -= 1
+                self.checkouts -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self._created_at[id(connection)] = time.monotonic()
+        return connection
+
+    @staticmethod
+    def _check(check, connection):
+        try:
+            return bool(check(connection))
+        except Exception:
+            return False
+
+    def _checked_out(self, started, waited):
+        # Caller holds the lock.
+        self.in_use += 1
+        self.checkouts += 1
+        if waited:
+            wait = time.monotonic() - started
+            self.waits += 1
+            self.wait_time_total += wait
+            self.wait_time_max = max(self.wait_time_max, wait)
+
+    def release(self, connection, discard=False):
+        """Return ``connection``; broken ones should pass ``discard=True``."""
+        with self._cond:
+            self.in_use -= 1
+            if discard:
+                self._discard(connection)
+            else:
+                now = time.monotonic()
+                created_at = self._created_at.get(id(connection), now)
+                self._idle.append((connection, created_at, now))
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones close on release."""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'created': self.created,
+                'closed': self.closed,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'failed_checks': self.failed_checks,
+                'wait_time_total': round(self.wait_time_total, 6),
+                'wait_time_max': round(self.wait_time_max, 6),
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """Return the process-wide pool for ``key``, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def pool_stats():
+    """Return ``{key: stats}`` for every pool in this process."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.stats() for key, pool in pools.items()}
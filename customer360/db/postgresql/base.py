@@ -0,0 +1,64 @@
+"""
+PostgreSQL backend that borrows connections from an in-process pool.
+
+Opening a Postgres connection costs a handshake, authentication and a
+server process (``manage.py benchmark_db_pool`` measures how much on a
+given setup). With this backend ``connect()`` takes a connection from
+:mod:`customer360.db.pool` and ``close()`` hands it back, rolled back and
+ready for the next request. Pool settings come from the ``POOL`` key of
+the database settings (see ``DATABASE_POOL`` in settings.py).
+
+Django's ``CONN_HEALTH_CHECKS`` only covers persistent connections, so
+idle pooled connections are pinged before they are handed out.
+"""
+from django.db.backends.postgresql import base
+
+from customer360.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def pool(self):
+        settings_dict = self.settings_dict
+        key = (
+            self.alias, settings_dict['HOST'], settings_dict['PORT'],
+            settings_dict['NAME'], settings_dict['USER'],
+        )
+        return get_pool(key, **settings_dict.get('POOL', {}))
+
+    def get_new_connection(self, conn_params):
+        # Normally set while connecting; reused connections skip that path.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            base.IsolationLevel(isolation_level) if isolation_level is not None
+            else base.IsolationLevel.READ_COMMITTED
+        )
+        parent = super().get_new_connection
+        return self.pool().acquire(lambda: parent(conn_params), check=self._ping)
+
+    @staticmethod
+    def _ping(connection):
+        """Whether an idle pooled connection still answers."""
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Without autocommit the ping opened a transaction.
+            connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        broken = bool(connection.closed)
+        if not broken:
+            try:
+                # Leave no transaction open for the next borrower.
+                connection.rollback()
+            except base.Database.Error:
+                broken = True
+        self.pool().release(connection, discard=broken)
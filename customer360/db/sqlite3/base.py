@@ -0,0 +1,30 @@
+"""
+SQLite backend tuned for many concurrent users.
+
+Every new connection gets the pragmas in ``SQLITE_PRAGMAS`` (WAL journal,
+synchronous=NORMAL, a busy timeout, memory-mapped I/O, a larger page cache
+and in-memory temp tables). ``atomic()`` blocks start with
+``BEGIN IMMEDIATE`` so a transaction takes the write lock up front: with a
+plain deferred ``BEGIN``, two transactions that both read and then try to
+write deadlock, and SQLite fails one of them with "database is locked"
+without waiting for the busy timeout.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+def apply_pragmas(connection, pragmas):
+    """Run ``PRAGMA name = value`` for each item of ``pragmas``."""
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, settings.SQLITE_PRAGMAS)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
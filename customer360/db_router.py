@@ -0,0 +1,108 @@
+"""
+Read-replica routing.
+
+Replicas are configured with ``DATABASE_REPLICA_URLS`` and registered as
+``replica1``, ``replica2``, ... Reads only go to a replica inside views
+marked with :func:`replica_reads` or :class:`ReplicaReadMixin`; everything
+else, and every write, uses ``default``. After a write request the client
+is pinned to the primary for ``REPLICA_PIN_SECONDS`` (see
+``customer360.middleware.ReplicaPinMiddleware``) so users always read
+their own writes.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+# 'replica' inside replica-safe views, 'primary' when forced back.
+_read_target = ContextVar('read_target', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """Send reads to a random replica when the current context allows it."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or _read_target.get() != 'replica':
+            return DEFAULT_DB_ALIAS
+        # Reads inside a write transaction must see that transaction.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get schema changes through replication.
+        return db not in replica_aliases()
+
+
+@contextmanager
+def _reading_from(target):
+    token = _read_target.set(target)
+    try:
+        yield
+    finally:
+        _read_target.reset(token)
+
+
+def use_replicas():
+    """Context manager allowing reads to go to a replica."""
+    return _reading_from('replica')
+
+
+def use_primary():
+    """Context manager forcing reads back to the primary."""
+    return _reading_from('primary')
+
+
+def _allows_replica(request):
+    return request.method in SAFE_METHODS and not getattr(request, 'pinned_to_primary', False)
+
+
+def _render(response):
+    # Template responses are rendered after the view returns; do it here
+    # so their queries run while replica reads are still allowed.
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def replica_reads(view):
+    """
+    Decorator for read-only views whose queries can tolerate replica lag.
+
+    Has no effect on unsafe methods or while the client is pinned to the
+    primary.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _allows_replica(request):
+            return view(request, *args, **kwargs)
+        with use_replicas():
+            return _render(view(request, *args, **kwargs))
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Class-based view counterpart of :func:`replica_reads`."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not _allows_replica(request):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replicas():
+            return _render(super().dispatch(request, *args, **kwargs))
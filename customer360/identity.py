@@ -0,0 +1,85 @@
+"""
+Request-scoped identity map.
+
+Inside a :func:`scope` (``IdentityMapMiddleware`` opens one per request)
+:func:`get` loads each row at most once and hands every caller the same
+instance, so a view, its form and its template can all look an object up
+by primary key without repeating the query. Misses go through the
+model's :class:`~customer360.objcache.ObjectCache` when it has one.
+
+A queryset passed instead of a model is used to load the row (e.g. for
+``select_related``). Querysets that filter are only used to load, never
+answered from the map, since the mapped instance may not match the
+filter. Outside a scope every call loads afresh.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from django.http import Http404
+
+from .objcache import ObjectCache
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+@contextmanager
+def scope():
+    """Share loaded instances until the block exits."""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def _key(model, pk):
+    return model._meta.label_lower, model._meta.pk.to_python(pk)
+
+
+def add(instance):
+    """Make ``instance`` the one :func:`get` returns for its row."""
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        identity_map[_key(type(instance), instance.pk)] = instance
+
+
+def get(model_or_queryset, pk):
+    """Return the row ``pk``; raises ``DoesNotExist`` or ``ValidationError``."""
+    if isinstance(model_or_queryset, QuerySet):
+        queryset, model = model_or_queryset, model_or_queryset.model
+    else:
+        queryset, model = None, model_or_queryset
+    key = _key(model, pk)
+    identity_map = _identity_map.get()
+    if identity_map is not None and key in identity_map and not (queryset is not None and queryset.query.where):
+        return identity_map[key]
+
+    object_cache = ObjectCache.registry.get(key[0])
+    if queryset is None and object_cache is not None:
+        instance = object_cache.get(key[1])
+    else:
+        instance = (queryset if queryset is not None else model._default_manager.all()).get(pk=key[1])
+    if identity_map is not None:
+        identity_map[key] = instance
+    return instance
+
+
+def get_or_404(model_or_queryset, pk):
+    model = getattr(model_or_queryset, 'model', model_or_queryset)
+    try:
+        return get(model_or_queryset, pk)
+    except (model.DoesNotExist, ValidationError):
+        raise Http404(f"No {model._meta.verbose_name} matches the given query.")
+
+
+class IdentityMapMixin:
+    """Route ``SingleObjectMixin.get_object()`` through the identity map."""
+
+    def get_object(self, queryset=None):
+        if self.pk_url_kwarg not in self.kwargs:
+            return super().get_object(queryset)
+        if queryset is None:
+            queryset = self.get_queryset()
+        return get_or_404(queryset, self.kwargs[self.pk_url_kwarg])
@@ -0,0 +1,173 @@
+"""
+Logging helpers: a non-blocking queue handler, JSON output and sampling.
+
+With ``LOG_QUEUE`` on, loggers only write to :class:`QueueListenerHandler`,
+which puts records on an in-memory queue. A background listener thread
+hands them to the real handlers (console, rotating file), so file I/O never
+happens in the request thread.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+# LogRecord attributes that are not user-supplied ``extra`` fields.
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _handler_by_name(name):
+    # logging.getHandlerByName() only exists from Python 3.12.
+    getter = getattr(logging, 'getHandlerByName', None)
+    if getter:
+        return getter(name)
+    return logging._handlers.get(name)
+
+
+class QueueListenerHandler(logging.handlers.QueueHandler):
+    """
+    Queue records and write them to ``handlers`` from a background thread.
+
+    ``handlers`` are names of other handlers in ``LOGGING``. The listener
+    thread starts on the first record, is restarted after a fork (e.g.
+    gunicorn workers) and is drained at interpreter exit.
+    """
+
+    def __init__(self, handlers, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = [_handler_by_name(name) for name in handlers]
+        if None in self.handlers:
+            # dictConfig retries handlers failing with this message once
+            # the others are configured.
+            raise ValueError('Logging target not configured yet')
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = logging.handlers.QueueListener(
+                self.queue, *self.handlers, respect_handler_level=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Unlike the stdlib version, keep the message and traceback apart so
+        # the target handlers' formatters (e.g. JSON) can still place them.
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Better to lose a record than to block a request on logging.
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of low-severity records from chatty loggers.
+
+    ``rates`` maps logger names to the fraction of records to keep (or is a
+    ``"name=rate,..."`` string); a name also covers its child loggers.
+    Records above ``max_level`` (warnings and errors by default) always
+    pass. Sampling is deterministic: a rate of 0.1 keeps exactly every
+    tenth record.
+    """
+
+    def __init__(self, rates=None, max_level='INFO'):
+        super().__init__()
+        if isinstance(rates, str):
+            rates = parse_sample_rates(rates)
+        self.rates = {name: float(rate) for name, rate in (rates or {}).items()}
+        self.max_level = logging._checkLevel(max_level)
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _rate_for(self, name):
+        while name:
+            if name in self.rates:
+                return name, self.rates[name]
+            name = name.rpartition('.')[0]
+        return None, 1.0
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        name, rate = self._rate_for(record.name)
+        if rate >= 1:
+            return True
+        if rate <= 0:
+            return False
+        with self._lock:
+            seen = self._seen.get(name, 0) + 1
+            self._seen[name] = seen
+        return int(seen * rate) != int((seen - 1) * rate)
+
+
+def parse_sample_rates(value):
+    """Parse ``"logger=0.1,other.logger=0.5"`` into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
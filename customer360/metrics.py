@@ -0,0 +1,152 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Under gunicorn each worker process keeps its own counters, so a scrape
+that reaches one worker would only see a fraction of the traffic. Set
+``PROMETHEUS_MULTIPROC_DIR`` to an empty directory in the environment of
+the master process (see ``gunicorn.conf.py``) and every worker writes its
+values to mmap'd files there; :func:`render` aggregates all of them. The
+variable must be set before ``prometheus_client`` is imported.
+"""
+import os
+import resource
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from django.db import connections
+from django.db.backends.signals import connection_created
+from prometheus_client import multiprocess
+
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+REQUEST_LATENCY = Histogram(
+    'django_http_request_duration_seconds',
+    'Request latency by URL name',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter(
+    'django_db_queries_total',
+    'Database queries executed',
+    ['alias', 'vendor'],
+)
+DB_QUERY_DURATION = Histogram(
+    'django_db_query_duration_seconds',
+    'Database query time',
+    ['alias', 'vendor'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+DB_QUERY_ERRORS = Counter(
+    'django_db_query_errors_total',
+    'Database queries that raised',
+    ['alias', 'vendor'],
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Application cache lookups',
+    ['cache', 'result'],
+)
+INTERACTIONS_CREATED = Counter(
+    'interactions_created_total',
+    'Interactions created',
+    ['channel'],
+)
+# Not ``process_resident_memory_bytes``: the default registry's process
+# collector already exports that for the current process only.
+PROCESS_MEMORY = Gauge(
+    'worker_resident_memory_bytes',
+    'Resident memory of each worker process',
+    multiprocess_mode='liveall',
+)
+
+MEMORY_SAMPLE_SECONDS = 10
+_memory_sampled_at = 0.0
+
+
+def view_label(request):
+    """URL name such as ``customer_management:customer_list``."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or '<unnamed>'
+
+
+def observe_request(request, status, seconds):
+    REQUEST_LATENCY.labels(view_label(request), request.method, str(status)).observe(seconds)
+    sample_memory()
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def _resident_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+def sample_memory(force=False):
+    """Refresh this process's memory gauge, at most every few seconds."""
+    global _memory_sampled_at
+    now = time.monotonic()
+    if force or now - _memory_sampled_at >= MEMORY_SAMPLE_SECONDS:
+        _memory_sampled_at = now
+        PROCESS_MEMORY.set(_resident_bytes())
+
+
+class QueryTimer:
+    """``connection.execute_wrappers`` entry counting and timing queries."""
+
+    def __init__(self, connection):
+        self.labels = (connection.alias, connection.vendor)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception:
+            DB_QUERY_ERRORS.labels(*self.labels).inc()
+            raise
+        finally:
+            DB_QUERIES.labels(*self.labels).inc()
+            DB_QUERY_DURATION.labels(*self.labels).observe(time.perf_counter() - start)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver installing :class:`QueryTimer`."""
+    if not any(isinstance(wrapper, QueryTimer) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(QueryTimer(connection))
+
+
+def instrument_open_connections():
+    """Cover connections opened before this module was imported."""
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(None, connection)
+
+
+connection_created.connect(instrument_connection, dispatch_uid='customer360.metrics')
+
+
+def render(path=None):
+    """
+    Return ``(body, content_type)`` for a scrape.
+
+    Aggregates every worker's files when running multi-process (or when
+    ``path`` is given), otherwise reads this process's registry.
+    """
+    path = path or os.environ.get(MULTIPROC_DIR_ENV)
+    if path:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=path)
+    else:
+        sample_memory(force=True)
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
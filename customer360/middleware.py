@@ -0,0 +1,93 @@
+"""
+Project-wide middleware.
+"""
+import time
+
+from django.conf import settings
+
+from . import identity, metrics, profiling
+from .db_router import SAFE_METHODS, replica_aliases
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a client to the primary database for a short while after it writes.
+
+    Any unsafe request sets a short-lived cookie; while it is present,
+    replica-safe views read from the primary, so a redirect after a POST
+    never shows data from before the write.
+    """
+    cookie_name = 'db_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.pinned_to_primary = self.cookie_name in request.COOKIES
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and replica_aliases():
+            response.set_cookie(
+                self.cookie_name,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Time every request into ``django_http_request_duration_seconds``.
+
+    Listed first so the histogram covers the rest of the middleware too.
+    Requests are labelled by URL name, which keeps the number of series
+    bounded however many distinct paths are requested.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_open_connections()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.observe_request(request, status, time.perf_counter() - start)
+
+
+class ProfilerMiddleware:
+    """
+    Profile single requests on demand (see ``customer360.profiling``).
+
+    Must come after AuthenticationMiddleware, which the staff check needs.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.requested(request):
+            return self.get_response(request)
+        if profiling.QUERY_PARAM in request.GET:
+            # Hide the trigger from views that reject unknown parameters,
+            # such as the admin changelist.
+            request.GET = request.GET.copy()
+            del request.GET[profiling.QUERY_PARAM]
+        return profiling.profile_request(request, self.get_response)
+
+
+class IdentityMapMiddleware:
+    """Give each request its own identity map (see ``customer360.identity``)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity.scope():
+            return self.get_response(request)
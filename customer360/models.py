@@ -1,3 +1,10 @@
+"""
+Models of the original customer360 app.
+
+The app is no longer installed; the new apps replaced it. Its tables are
+only read by the ``migrate_legacy_data`` command and can be dropped once
+that command verifies cleanly.
+"""
 from django.db import models
 
 
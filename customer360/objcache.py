@@ -0,0 +1,176 @@
+"""
+Two-tier read-through cache for model instances looked up by primary key.
+
+L1 is a small LRU in each process; L2 is the Django cache backend, shared
+by all workers when ``CACHES`` points at Redis or Memcached (the default
+local-memory backend is per process, so then L2 is too).
+
+* L2 keys carry a per-object version. Invalidating an object bumps its
+  version at once and again when the transaction commits, so a reader
+  that fetched the old row just before the commit can only store it
+  under a key nobody reads any more.
+* Each invalidation is also appended to an eviction log in L2. Processes
+  replay the log at most every ``OBJECT_CACHE_SYNC_INTERVAL`` seconds and
+  drop the evicted objects from their L1; one that fell too far behind
+  clears its L1 instead. An L1 copy is therefore at most that many
+  seconds out of date (and never in the process that made the change).
+
+Misses always read the primary, also inside replica-read views.
+
+Lookups are counted in ``cache_requests_total`` as ``<model>:l1`` and
+``<model>:l2``; :meth:`ObjectCache.stats` gives this process's ratios.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.http import Http404
+
+from . import metrics
+from .lru import LRUCache
+
+KEY_PREFIX = 'objcache'
+EVICTION_SEQ_KEY = f'{KEY_PREFIX}:evictions'
+# Evictions kept in L2 for lagging processes; beyond that they clear L1.
+EVICTION_BACKLOG = 1000
+
+
+def _incr(key):
+    """Atomically increment ``key``, creating it (without expiry) if needed."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+class ObjectCache:
+    """
+    Cache of one model's rows by primary key.
+
+    Instances handed out are copies, so callers may modify them freely.
+    Receivers for the model's save/delete signals must call
+    :meth:`invalidate`.
+    """
+    registry = {}
+
+    def __init__(self, model, l1_size=None, l1_ttl=None, timeout=None):
+        self.model = model
+        self.label = model._meta.label_lower
+        self.timeout = timeout or settings.OBJECT_CACHE_TIMEOUT
+        self.local = LRUCache(l1_size or settings.OBJECT_CACHE_L1_SIZE, l1_ttl or settings.OBJECT_CACHE_L1_TTL)
+        self.l1_hits = self.l2_hits = self.misses = 0
+        self.registry[self.label] = self
+
+    def _version_key(self, pk):
+        return f'{KEY_PREFIX}:{self.label}:{pk}:v'
+
+    def _object_key(self, pk, version):
+        return f'{KEY_PREFIX}:{self.label}:{pk}:{version}'
+
+    def get(self, pk):
+        """Return the instance with primary key ``pk``; raises ``DoesNotExist``."""
+        pk = self.model._meta.pk.to_python(pk)
+        sync_evictions()
+        instance = self.local.get(pk)
+        metrics.record_cache(f'{self.label}:l1', instance is not None)
+        if instance is not None:
+            self.l1_hits += 1
+            return copy.copy(instance)
+
+        version = cache.get(self._version_key(pk), 0)
+        key = self._object_key(pk, version)
+        instance = cache.get(key)
+        metrics.record_cache(f'{self.label}:l2', instance is not None)
+        if instance is not None:
+            self.l2_hits += 1
+        else:
+            self.misses += 1
+            # Never fill from a replica: a lagging one would put an old row
+            # under the current version, where no invalidation evicts it.
+            instance = self.model._default_manager.db_manager(router.db_for_write(self.model)).get(pk=pk)
+            cache.set(key, instance, self.timeout)
+        self.local.set(pk, instance)
+        return copy.copy(instance)
+
+    def get_or_404(self, pk):
+        try:
+            return self.get(pk)
+        except (self.model.DoesNotExist, ValidationError):
+            raise Http404(f"No {self.model._meta.verbose_name} matches the given query.")
+
+    def invalidate(self, pks):
+        """
+        Evict ``pks`` in this process now and everywhere on commit.
+
+        Bumping the version again on commit discards anything other
+        processes cached from the old row in the meantime.
+        """
+        pks = [self.model._meta.pk.to_python(pk) for pk in pks]
+        self._evict(pks, broadcast=False)
+        transaction.on_commit(lambda: self._evict(pks), using=router.db_for_write(self.model))
+
+    def _evict(self, pks, broadcast=True):
+        for pk in pks:
+            self.local.discard(pk)
+            # Versions never expire, or an old version's key could be reused.
+            _incr(self._version_key(pk))
+            if broadcast:
+                seq = _incr(EVICTION_SEQ_KEY)
+                cache.set(f'{EVICTION_SEQ_KEY}:{seq}', (self.label, pk), self.timeout)
+
+    def stats(self):
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            'l1_hits': self.l1_hits,
+            'l2_hits': self.l2_hits,
+            'misses': self.misses,
+            'hit_ratio': (self.l1_hits + self.l2_hits) / lookups if lookups else 0.0,
+        }
+
+
+_eviction_seen = None
+_eviction_checked_at = 0.0
+_eviction_lock = threading.Lock()
+
+
+def _clear_local():
+    for object_cache in ObjectCache.registry.values():
+        object_cache.local.clear()
+
+
+def sync_evictions(force=False):
+    """Apply evictions made by other processes since the last check."""
+    global _eviction_seen, _eviction_checked_at
+    now = time.monotonic()
+    if not force and now - _eviction_checked_at < settings.OBJECT_CACHE_SYNC_INTERVAL:
+        return
+    if not _eviction_lock.acquire(blocking=False):
+        # Another thread is syncing right now.
+        return
+    try:
+        _eviction_checked_at = now
+        latest = cache.get(EVICTION_SEQ_KEY, 0)
+        seen, _eviction_seen = _eviction_seen, latest
+        if seen is None or latest == seen:
+            return
+        if latest < seen or latest - seen > EVICTION_BACKLOG:
+            # The log was reset (cache flushed) or we are too far behind.
+            _clear_local()
+            return
+        keys = [f'{EVICTION_SEQ_KEY}:{seq}' for seq in range(seen + 1, latest + 1)]
+        found = cache.get_many(keys)
+        if len(found) < len(keys):
+            _clear_local()
+            return
+        for label, pk in found.values():
+            object_cache = ObjectCache.registry.get(label)
+            if object_cache is not None:
+                object_cache.local.discard(pk)
+    finally:
+        _eviction_lock.release()
@@ -0,0 +1,195 @@
+"""
+On-demand profiling of single requests.
+
+A request is profiled when it carries either
+
+* ``?_profile=1`` and comes from a logged-in staff user, or
+* an ``X-Profile`` header holding a token from ``manage.py profile_token``
+  (for API clients and reproducing a customer's exact request).
+
+Such a request runs under cProfile while a sampling thread records the
+request thread's call stack every ``PROFILE_SAMPLE_INTERVAL`` seconds,
+and every SQL statement is logged with its duration. The capture is
+written to ``PROFILE_DIR`` as
+
+* ``<id>.prof``: pstats data (``python -m pstats``, snakeviz, ...);
+* ``<id>.collapsed``: folded stacks for flamegraph.pl or speedscope;
+* ``<id>.json``: the request, timings and SQL log.
+
+Untriggered requests pay for one header and one query parameter lookup.
+"""
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+QUERY_PARAM = '_profile'
+HEADER = 'X-Profile'
+HEADER_META_KEY = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'customer360.profiling'
+EXTENSIONS = {'prof', 'collapsed', 'json'}
+PROFILE_ID_RE = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+
+def make_token():
+    """Signed token for the ``X-Profile`` header."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def requested(request):
+    """Whether ``request`` asks to be profiled (and is allowed to)."""
+    token = request.META.get(HEADER_META_KEY)
+    if token is not None:
+        return valid_token(token)
+    if QUERY_PARAM in request.GET:
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff)
+    return False
+
+
+class StackSampler(threading.Thread):
+    """Count the call stacks of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name='profile-sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryLog:
+    """``execute_wrapper`` recording each statement with its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': None if many else repr(params),
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def profile_request(request, get_response):
+    """Run ``get_response(request)`` under the profiler and save the capture."""
+    started_at = timezone.now()
+    profile_id = f'{started_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}'
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+    queries = QueryLog()
+
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        sampler.start()
+        profiler.enable()
+        try:
+            response = get_response(request)
+            # Lazy template responses render on the way out; include that.
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+        finally:
+            profiler.disable()
+            sampler.stop()
+    elapsed = time.perf_counter() - start
+
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    (directory / f'{profile_id}.collapsed').write_text(sampler.collapsed())
+    (directory / f'{profile_id}.json').write_text(json.dumps({
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': getattr(getattr(request, 'user', None), 'username', '') or '',
+        'status': response.status_code,
+        'started_at': started_at.isoformat(),
+        'duration_ms': round(elapsed * 1000, 3),
+        'query_count': len(queries.queries),
+        'query_ms': round(sum(q['ms'] for q in queries.queries), 3),
+        'samples': sum(sampler.stacks.values()),
+        'queries': queries.queries,
+    }, indent=2))
+    prune(settings.PROFILE_KEEP)
+
+    response[f'{HEADER}-Id'] = profile_id
+    return response
+
+
+def list_profiles():
+    """Metadata of stored captures, newest first."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        data.pop('queries', None)
+        profiles.append(data)
+    return profiles
+
+
+def profile_path(profile_id, extension):
+    """Path of one capture file, or ``None`` if the name is not valid."""
+    if not PROFILE_ID_RE.match(profile_id) or extension not in EXTENSIONS:
+        return None
+    path = profile_dir() / f'{profile_id}.{extension}'
+    return path if path.exists() else None
+
+
+def prune(keep):
+    """Delete all but the ``keep`` newest captures."""
+    for path in sorted(profile_dir().glob('*.json'), reverse=True)[keep:]:
+        for extension in EXTENSIONS:
+            path.with_suffix(f'.{extension}').unlink(missing_ok=True)
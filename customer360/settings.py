@@ -45,16 +45,22 @@ INSTALLED_APPS = [
     # Project apps
     'customer_management',
     'interactions',
+    'segments',
 ]
 
 MIDDLEWARE = [
+    'customer360.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'customer360.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'customer360.middleware.ReplicaPinMiddleware',
+    'customer360.middleware.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'customer360.urls'
@@ -81,11 +87,73 @@ WSGI_APPLICATION = 'customer360.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Persistent connections: reuse each connection for this many seconds and
+# check it is still alive before reusing it
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=60, cast=int)
+DATABASE_CONN_HEALTH_CHECKS = config('DATABASE_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
 DATABASES = {
     'default': dj_database_url.config(
-        default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3')
+        default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3'),
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
+    )
+}
+
+# Read replicas (comma-separated URLs), registered as replica1, replica2, ...
+# Only views marked replica-safe read from them; see customer360/db_router.py.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+DATABASE_REPLICAS = []
+for index, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = dj_database_url.parse(
+        url,
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
     )
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['customer360.db_router.ReplicaRouter']
+
+# Tuned SQLite connections (WAL, busy timeout, BEGIN IMMEDIATE); see
+# customer360/db/sqlite3/base.py. Run sqlite_checkpoint periodically to
+# keep the WAL file from growing under constant read traffic.
+SQLITE_TUNED = config('SQLITE_TUNED', default=True, cast=bool)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=268435456, cast=int),
+    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+    'temp_store': 'MEMORY',
+    'journal_size_limit': 67108864,
+}
+if SQLITE_TUNED:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            database['ENGINE'] = 'customer360.db.sqlite3'
+            database.setdefault('OPTIONS', {})['timeout'] = SQLITE_PRAGMAS['busy_timeout'] / 1000
+
+# Optional in-process connection pool for PostgreSQL; see
+# customer360/db/postgresql/base.py. Sizes are per worker process.
+DATABASE_POOL = config('DATABASE_POOL', default=False, cast=bool)
+DATABASE_POOL_OPTIONS = {
+    'max_size': config('DATABASE_POOL_SIZE', default=10, cast=int),
+    'timeout': config('DATABASE_POOL_TIMEOUT', default=5.0, cast=float),
+    'max_idle': config('DATABASE_POOL_MAX_IDLE', default=300.0, cast=float),
+    'max_lifetime': config('DATABASE_POOL_MAX_LIFETIME', default=3600.0, cast=float),
 }
+if DATABASE_POOL:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.postgresql':
+            database['ENGINE'] = 'customer360.db.postgresql'
+            database['POOL'] = DATABASE_POOL_OPTIONS
+            # Hand connections back to the pool at the end of every request.
+            database['CONN_MAX_AGE'] = 0
+
+# Seconds a client reads from the primary after a write (read-your-writes)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
 
 
 # Password validation
@@ -133,12 +201,56 @@ STATICFILES_DIRS = [
 # Static files collection directory for production
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Hashed filenames plus gzip/brotli copies written by collectstatic. The
+# manifest only exists after collectstatic, so it is off by default in DEBUG.
+STATIC_MANIFEST = config('STATIC_MANIFEST', default=not DEBUG, cast=bool)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'whitenoise.storage.CompressedManifestStaticFilesStorage'
+            if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Logging Configuration
+# LOG_QUEUE hands records to a background thread so file writes never block
+# a request; LOG_FORMAT=json writes one JSON object per line to the log file.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_QUEUE = config('LOG_QUEUE', default=True, cast=bool)
+LOG_FORMAT = config('LOG_FORMAT', default='json')
+# Size-based rotation by default; set LOG_ROTATE_WHEN (e.g. 'midnight') for
+# time-based rotation instead. Use one log file per process when running
+# several workers, since rotation is not coordinated between processes.
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'django.log'))
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+LOG_ROTATE_WHEN = config('LOG_ROTATE_WHEN', default='')
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=5, cast=int)
+# Fraction of INFO/DEBUG records to keep per logger, e.g.
+# "interactions.views=0.1,django.server=0.5". Warnings are never sampled.
+LOG_SAMPLE_RATES = config('LOG_SAMPLE_RATES', default='')
+
+if LOG_ROTATE_WHEN:
+    LOG_FILE_HANDLER = {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'when': LOG_ROTATE_WHEN,
+    }
+else:
+    LOG_FILE_HANDLER = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'maxBytes': LOG_MAX_BYTES,
+    }
+LOG_HANDLERS = ['queue'] if LOG_QUEUE else ['console', 'file']
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -151,33 +263,51 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'customer360.log.JSONFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'customer360.log.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
     },
     'handlers': {
         'file': {
-            'level': config('LOG_LEVEL', default='INFO'),
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            **LOG_FILE_HANDLER,
+            'level': LOG_LEVEL,
+            'filename': LOG_FILE,
+            'backupCount': LOG_BACKUP_COUNT,
+            'delay': True,
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
+            'filters': [] if LOG_QUEUE else ['sampling'],
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
+            'filters': [] if LOG_QUEUE else ['sampling'],
+        },
+        'queue': {
+            '()': 'customer360.log.QueueListenerHandler',
+            'handlers': ['console', 'file'],
+            'filters': ['sampling'],
         },
     },
     'root': {
-        'handlers': ['console', 'file'],
-        'level': config('LOG_LEVEL', default='INFO'),
+        'handlers': LOG_HANDLERS,
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
-            'level': config('LOG_LEVEL', default='INFO'),
+            'handlers': LOG_HANDLERS,
+            'level': LOG_LEVEL,
             'propagate': False,
         },
         'customer360': {
-            'handlers': ['console', 'file'],
-            'level': config('LOG_LEVEL', default='INFO'),
+            'handlers': LOG_HANDLERS,
+            'level': LOG_LEVEL,
             'propagate': False,
         },
     },
@@ -198,3 +328,70 @@ if not DEBUG:
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     X_FRAME_OPTIONS = 'DENY'
+
+# Admin bulk actions run in pk-ordered chunks with one transaction per chunk
+BULK_ACTION_CHUNK_SIZE = config('BULK_ACTION_CHUNK_SIZE', default=500, cast=int)
+BULK_ACTION_BACKGROUND = config('BULK_ACTION_BACKGROUND', default=True, cast=bool)
+
+# Segment leaves with a time window are fully rebuilt once older than this
+SEGMENT_WINDOW_MAX_AGE = config('SEGMENT_WINDOW_MAX_AGE', default=300, cast=int)
+# Dirty customers patched per segment evaluation; `rebuild_segments --patch`
+# drains a larger backlog outside requests
+SEGMENT_PATCH_LIMIT = config('SEGMENT_PATCH_LIMIT', default=2000, cast=int)
+
+# Phone numbers without an international prefix get this country code
+PHONE_DEFAULT_COUNTRY_CODE = config('PHONE_DEFAULT_COUNTRY_CODE', default='1')
+
+# Per-process LRU of recent caller-ID lookups
+CALLER_ID_CACHE_SIZE = config('CALLER_ID_CACHE_SIZE', default=1024, cast=int)
+CALLER_ID_CACHE_TTL = config('CALLER_ID_CACHE_TTL', default=30, cast=int)
+
+# Interaction trend series are cached per parameter set for this many seconds
+TRENDS_CACHE_TIMEOUT = config('TRENDS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Webhooks: events are queued in the outbox and sent by `manage.py dispatch_outbox`
+WEBHOOK_URL = config('WEBHOOK_URL', default='')
+WEBHOOK_SECRET = config('WEBHOOK_SECRET', default='')
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=100, cast=int)
+WEBHOOK_CONCURRENCY = config('WEBHOOK_CONCURRENCY', default=4, cast=int)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)
+WEBHOOK_MAX_ATTEMPTS = config('WEBHOOK_MAX_ATTEMPTS', default=10, cast=int)
+WEBHOOK_BACKOFF_BASE = config('WEBHOOK_BACKOFF_BASE', default=5, cast=int)
+WEBHOOK_BACKOFF_MAX = config('WEBHOOK_BACKOFF_MAX', default=3600, cast=int)
+WEBHOOK_RETENTION_DAYS = config('WEBHOOK_RETENTION_DAYS', default=7, cast=int)
+
+# Parallel batch jobs (customer360.batch): worker processes and resume points
+BATCH_WORKERS = config('BATCH_WORKERS', default=4, cast=int)
+BATCH_CHECKPOINT_DIR = config('BATCH_CHECKPOINT_DIR', default=str(BASE_DIR / 'checkpoints'))
+
+# Prometheus scrape endpoint at /metrics; when set, scrapers must send
+# "Authorization: Bearer <token>". Multi-process servers also need the
+# PROMETHEUS_MULTIPROC_DIR environment variable (see gunicorn.conf.py).
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# On-demand request profiles (?_profile=1 for staff, or an X-Profile token)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILE_KEEP = config('PROFILE_KEEP', default=50, cast=int)
+PROFILE_SAMPLE_INTERVAL = config('PROFILE_SAMPLE_INTERVAL', default=0.005, cast=float)
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=3600, cast=int)
+
+# Statements slower than this are aggregated by fingerprint with their
+# EXPLAIN plan (manage.py slow_queries, /slow-queries/)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=float)
+SLOW_QUERY_LOG_ASYNC = config('SLOW_QUERY_LOG_ASYNC', default=True, cast=bool)
+SLOW_QUERY_QUEUE_SIZE = config('SLOW_QUERY_QUEUE_SIZE', default=1000, cast=int)
+
+# Shared cache backend (L2 of customer360.objcache); the local-memory
+# default is per process, so use Redis or Memcached with several workers
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Two-tier object cache: per-process LRU (L1) in front of CACHES (L2)
+OBJECT_CACHE_L1_SIZE = config('OBJECT_CACHE_L1_SIZE', default=1000, cast=int)
+OBJECT_CACHE_L1_TTL = config('OBJECT_CACHE_L1_TTL', default=60, cast=int)
+OBJECT_CACHE_TIMEOUT = config('OBJECT_CACHE_TIMEOUT', default=300, cast=int)
+OBJECT_CACHE_SYNC_INTERVAL = config('OBJECT_CACHE_SYNC_INTERVAL', default=1.0, cast=float)
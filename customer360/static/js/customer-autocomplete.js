@@ -0,0 +1,93 @@
+// Customer autocomplete for <select data-autocomplete-url="...">.
+// The select stays in the form (hidden) and only ever holds the chosen
+// customer; suggestions come from the customer search API. Its required
+// attribute moves to the visible search box; the server still validates.
+(function () {
+  "use strict";
+
+  function init(select) {
+    const url = select.dataset.autocompleteUrl;
+    const wrapper = document.createElement("div");
+    wrapper.className = "position-relative";
+
+    const input = document.createElement("input");
+    input.type = "search";
+    input.className = select.className;
+    input.placeholder = "Type 2+ letters to search customers...";
+    input.autocomplete = "off";
+    const current = select.options[select.selectedIndex];
+    if (current && current.value) {
+      input.value = current.text;
+    }
+
+    const menu = document.createElement("div");
+    menu.className = "dropdown-menu w-100";
+
+    select.parentNode.insertBefore(wrapper, select);
+    wrapper.appendChild(input);
+    wrapper.appendChild(menu);
+    wrapper.appendChild(select);
+    select.hidden = true;
+    // A hidden required control can't take focus, so the browser would
+    // block submission without saying why; require the search box instead.
+    input.required = select.required;
+    select.required = false;
+
+    function choose(id, label) {
+      let option = select.querySelector('option[value="' + id + '"]');
+      if (!option) {
+        option = new Option(label, id);
+        select.add(option);
+      }
+      select.value = id;
+      input.value = id ? label : "";
+      menu.classList.remove("show");
+      select.dispatchEvent(new Event("change", { bubbles: true }));
+    }
+
+    let timer = null;
+    let controller = null;
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      if (!input.value) {
+        choose("", "");
+        return;
+      }
+      timer = setTimeout(function () {
+        if (controller) {
+          controller.abort();
+        }
+        controller = new AbortController();
+        const sep = url.indexOf("?") === -1 ? "?" : "&";
+        fetch(url + sep + "q=" + encodeURIComponent(input.value), {
+          signal: controller.signal,
+        })
+          .then((response) => response.json())
+          .then(function (data) {
+            menu.innerHTML = "";
+            data.customers.forEach(function (customer) {
+              const label = customer.name + " (" + customer.email + ")";
+              const item = document.createElement("button");
+              item.type = "button";
+              item.className = "dropdown-item";
+              item.textContent = label;
+              item.addEventListener("click", () => choose(String(customer.id), label));
+              menu.appendChild(item);
+            });
+            menu.classList.toggle("show", data.customers.length > 0);
+          })
+          .catch(() => {});
+      }, 250);
+    });
+
+    document.addEventListener("click", function (event) {
+      if (!wrapper.contains(event.target)) {
+        menu.classList.remove("show");
+      }
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    document.querySelectorAll("select[data-autocomplete-url]").forEach(init);
+  });
+})();
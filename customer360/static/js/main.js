@@ -0,0 +1,92 @@
+// Page-wide UX enhancements for the Customer 360 layout.
+// Served as a hashed, compressed static file so browsers cache it across
+// pages instead of re-downloading it inline with every response.
+(function () {
+  "use strict";
+
+  // Show a loading state on submit buttons
+  function initForms() {
+    document.querySelectorAll("form").forEach((form) => {
+      form.addEventListener("submit", function () {
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) {
+          submitBtn.innerHTML =
+            '<i class="bi bi-hourglass-split me-1"></i> Processing...';
+          submitBtn.disabled = true;
+        }
+      });
+    });
+  }
+
+  function initTooltips() {
+    document.querySelectorAll('[data-bs-toggle="tooltip"]').forEach((el) => {
+      new bootstrap.Tooltip(el);
+    });
+  }
+
+  // Auto-hide alerts after 5 seconds
+  function initAlerts() {
+    document.querySelectorAll(".alert:not(.alert-permanent)").forEach((alert) => {
+      setTimeout(() => {
+        new bootstrap.Alert(alert).close();
+      }, 5000);
+    });
+  }
+
+  // Smooth scroll for anchor links
+  function initSmoothScroll() {
+    document.querySelectorAll('a[href^="#"]').forEach((anchor) => {
+      anchor.addEventListener("click", function (e) {
+        e.preventDefault();
+        const target = document.querySelector(this.getAttribute("href"));
+        if (target) {
+          target.scrollIntoView({ behavior: "smooth", block: "start" });
+        }
+      });
+    });
+  }
+
+  // Fade cards and tables in as they scroll into view
+  function initFadeIn() {
+    const observer = new IntersectionObserver(
+      (entries) => {
+        entries.forEach((entry) => {
+          if (entry.isIntersecting) {
+            entry.target.classList.add("fade-in");
+          }
+        });
+      },
+      { threshold: 0.1, rootMargin: "0px 0px -50px 0px" }
+    );
+    document.querySelectorAll(".card, .table").forEach((el) => {
+      observer.observe(el);
+    });
+  }
+
+  // Visual feedback while typing in the search box
+  function initSearch() {
+    const searchInput = document.querySelector('input[type="search"]');
+    if (!searchInput) {
+      return;
+    }
+    let searchTimeout;
+    searchInput.addEventListener("input", function () {
+      clearTimeout(searchTimeout);
+      searchTimeout = setTimeout(() => {
+        this.classList.add("searching");
+        setTimeout(() => {
+          this.classList.remove("searching");
+        }, 500);
+      }, 300);
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    initForms();
+    initTooltips();
+    initAlerts();
+    initSmoothScroll();
+    initFadeIn();
+    initSearch();
+  });
+})();
@@ -0,0 +1,58 @@
+// Draw the interaction trend series as an SVG line chart.
+(function () {
+  "use strict";
+
+  var COLORS = ["#4f46e5", "#10b981", "#f59e0b", "#ef4444", "#0891b2", "#8b5cf6", "#64748b"];
+  var SVG_NS = "http://www.w3.org/2000/svg";
+
+  function line(svg, points, color, dashed) {
+    var path = document.createElementNS(SVG_NS, "polyline");
+    path.setAttribute("points", points.join(" "));
+    path.setAttribute("fill", "none");
+    path.setAttribute("stroke", color);
+    path.setAttribute("stroke-width", dashed ? "1.5" : "2");
+    if (dashed) {
+      path.setAttribute("stroke-dasharray", "4 3");
+    }
+    svg.appendChild(path);
+  }
+
+  function draw() {
+    var data = document.getElementById("trend-data");
+    var svg = document.getElementById("trend-chart");
+    if (!data || !svg) {
+      return;
+    }
+    var trend = JSON.parse(data.textContent);
+    var width = svg.clientWidth || 800;
+    var height = svg.clientHeight || 280;
+    var pad = 10;
+    var steps = Math.max(trend.labels.length - 1, 1);
+    var max = 1;
+    trend.series.forEach(function (series) {
+      max = Math.max(max, Math.max.apply(null, series.counts.concat([0])));
+    });
+
+    svg.setAttribute("viewBox", "0 0 " + width + " " + height);
+    svg.textContent = "";
+    trend.series.forEach(function (series, i) {
+      var color = COLORS[i % COLORS.length];
+      function points(values) {
+        return values.map(function (value, j) {
+          var x = pad + (j / steps) * (width - 2 * pad);
+          var y = height - pad - (value / max) * (height - 2 * pad);
+          return x.toFixed(1) + "," + y.toFixed(1);
+        });
+      }
+      line(svg, points(series.counts), color, false);
+      line(svg, points(series.moving_average), color, true);
+    });
+
+    document.querySelectorAll(".trend-swatch").forEach(function (swatch) {
+      var color = COLORS[Number(swatch.dataset.series) % COLORS.length];
+      swatch.style.cssText = "display:inline-block;width:12px;height:12px;border-radius:2px;background:" + color;
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", draw);
+})();
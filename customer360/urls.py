@@ -29,6 +29,10 @@ def redirect_to_summary(request):
     return redirect('interactions:summary')
 
 urlpatterns = [
+    path('metrics', views.metrics_view, name='metrics'),
+    path('admin/db-pool/', views.db_pool_status, name='db_pool_status'),
+    path('admin/profiles/', views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:profile_id>.<str:extension>', views.profile_download, name='profile_download'),
     path('admin/', admin.site.urls),
     
     # New app URLs
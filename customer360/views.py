@@ -1,11 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
-from datetime import date, timedelta
 from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils import timezone
+import hmac
 import logging
 from customer_management.models import Customer
+from . import metrics, profiling
+from .daterange import days_ago
+from .db.pool import pool_stats
+from .db_router import replica_reads
 from interactions.models import Interaction
 
 logger = logging.getLogger(__name__)
@@ -16,11 +24,10 @@ def index(request):
     """
     try:
         customers = Customer.objects.all().order_by('name')
-        logger.info(f"Retrieved {customers.count()} customers for display")
         context = {"customers": customers}
         return render(request, "index.html", context=context)
     except Exception as e:
-        logger.error(f"Error retrieving customers: {str(e)}")
+        logger.error("Error retrieving customers: %s", e)
         messages.error(request, "An error occurred while loading customers.")
         return render(request, "index.html", {"customers": []})
 
@@ -56,46 +63,47 @@ def create_customer(request):
                 social_media=social_media
             )
             
-            logger.info(f"Created new customer: {customer.name} (ID: {customer.id})")
+            logger.info("Created new customer: %s (ID: %s)", customer.name, customer.id)
             messages.success(request, f"Successfully created customer: {customer.name}")
-            return redirect('index')
+            return redirect('legacy_index')
             
         except ValidationError as e:
-            logger.warning(f"Validation error creating customer: {str(e)}")
+            logger.warning("Validation error creating customer: %s", e)
             messages.error(request, f"Validation error: {str(e)}")
         except IntegrityError as e:
-            logger.error(f"Database integrity error: {str(e)}")
+            logger.error("Database integrity error: %s", e)
             messages.error(request, "A customer with this information already exists.")
         except Exception as e:
-            logger.error(f"Unexpected error creating customer: {str(e)}")
+            logger.error("Unexpected error creating customer: %s", e)
             messages.error(request, "An unexpected error occurred. Please try again.")
     
     return render(request, "add.html")
 
 
+@replica_reads
 def summary(request):
     """
     Display interaction summary for the last 30 days with proper error handling.
     """
     try:
-        thirty_days_ago = date.today() - timedelta(days=30)
+        thirty_days_ago = days_ago(30)
         interactions_queryset = Interaction.objects.filter(interaction_date__gte=thirty_days_ago)
         
         count = interactions_queryset.count()
         interactions = interactions_queryset.values("channel", "direction").annotate(count=Count('channel'))
         
-        logger.info(f"Generated summary for {count} interactions in last 30 days")
+        logger.info("Generated summary for %s interactions in last 30 days", count)
         
         context = {
             "interactions": interactions,
             "count": count,
-            "date_range": f"{thirty_days_ago.strftime('%Y-%m-%d')} to {date.today().strftime('%Y-%m-%d')}"
+            "date_range": f"{thirty_days_ago:%Y-%m-%d} to {timezone.localdate():%Y-%m-%d}"
         }
         
         return render(request, "summary.html", context=context)
         
     except Exception as e:
-        logger.error(f"Error generating summary: {str(e)}")
+        logger.error("Error generating summary: %s", e)
         messages.error(request, "An error occurred while generating the summary.")
         return render(request, "summary.html", {"interactions": [], "count": 0})
 
@@ -141,20 +149,59 @@ def interact(request, cid):
                     summary=summary
                 )
                 
-                logger.info(f"Created interaction for customer {customer.name} (ID: {customer.id})")
+                logger.info("Created interaction for customer %s (ID: %s)", customer.name, customer.id)
                 messages.success(request, "Interaction recorded successfully!")
-                return redirect('index')
+                return redirect('legacy_index')
                 
             except ValidationError as e:
-                logger.warning(f"Validation error in interaction: {str(e)}")
+                logger.warning("Validation error in interaction: %s", e)
                 messages.error(request, f"Validation error: {str(e)}")
             except Exception as e:
-                logger.error(f"Error creating interaction: {str(e)}")
+                logger.error("Error creating interaction: %s", e)
                 messages.error(request, "An error occurred while saving the interaction.")
 
         return render(request, "interact.html", context=context)
         
     except Exception as e:
-        logger.error(f"Error in interact view: {str(e)}")
+        logger.error("Error in interact view: %s", e)
         messages.error(request, "Customer not found or an error occurred.")
-        return redirect('index')
\ No newline at end of file
+        return redirect('legacy_index')
+
+
+@staff_member_required
+def db_pool_status(request):
+    """Connection pool metrics for this worker process, as JSON."""
+    pools = [
+        {'alias': key[0], 'host': key[1], 'database': key[3], **stats}
+        for key, stats in pool_stats().items()
+    ]
+    return JsonResponse({'pools': pools})
+
+
+@staff_member_required
+def profile_list(request):
+    """Captured request profiles, newest first."""
+    return render(request, 'customer_management/profile_list.html', {
+        'profiles': profiling.list_profiles(),
+        'token_max_age': settings.PROFILE_TOKEN_MAX_AGE,
+    })
+
+
+@staff_member_required
+def profile_download(request, profile_id, extension):
+    """Download one file of a capture (.prof, .collapsed or .json)."""
+    path = profiling.profile_path(profile_id, extension)
+    if path is None:
+        raise Http404("No such profile")
+    return FileResponse(path.open('rb'), as_attachment=True, filename=path.name)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, aggregated across worker processes."""
+    token = settings.METRICS_TOKEN
+    if token:
+        expected = f'Bearer {token}'.encode()
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+            return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    body, content_type = metrics.render()
+    return HttpResponse(body, content_type=content_type)
@@ -1,10 +1,39 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
 from django.utils.html import format_html
-from .models import Customer
+from django.utils import timezone
+from interactions.snapshots import get_snapshot
+from .bulk import start_in_background, submit_bulk_update
+from .dedupe import merge_customers
+from .models import BulkActionJob, Customer, DuplicateCandidate, OutboxEvent
+from .outbox import requeue
+
+
+class ChunkedBulkActionMixin:
+    """
+    Run bulk field updates as chunked jobs instead of one long UPDATE.
+
+    Selections that fit in a single chunk are applied inline; larger ones
+    run in the background and the user is sent to the job progress page.
+    """
+
+    def chunked_update(self, request, queryset, values, description, message):
+        job = submit_bulk_update(queryset, values, description, user=request.user)
+        if job.status == 'completed':
+            self.message_user(request, message.format(count=job.processed))
+            return None
+        if job.status == 'failed':
+            self.message_user(request, f"Bulk action failed: {job.error}", level=messages.ERROR)
+            return None
+        self.message_user(
+            request,
+            f"{job.total} rows queued in chunks of {job.chunk_size}. Progress is shown below."
+        )
+        return HttpResponseRedirect(job.get_absolute_url())
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(ChunkedBulkActionMixin, admin.ModelAdmin):
     """
     Enhanced admin interface for Customer model.
     """
@@ -38,7 +67,7 @@ class CustomerAdmin(admin.ModelAdmin):
 
     def interaction_count_display(self, obj):
         """Display interaction count with badge styling."""
-        count = obj.interaction_count
+        count = get_snapshot(obj).total_interactions
         if count == 0:
             return format_html('<span class="badge badge-secondary">0</span>')
         elif count < 5:
@@ -49,32 +78,145 @@ class CustomerAdmin(admin.ModelAdmin):
             return format_html('<span class="badge badge-success">{}</span>', count)
     
     interaction_count_display.short_description = 'Interactions'
-    interaction_count_display.admin_order_field = 'interactions__count'
+    interaction_count_display.admin_order_field = 'snapshot__total_interactions'
 
     def last_interaction_display(self, obj):
         """Display last interaction date."""
-        last_interaction = obj.last_interaction
-        if last_interaction:
-            return last_interaction.interaction_date.strftime('%Y-%m-%d %H:%M')
+        snapshot = get_snapshot(obj)
+        if snapshot.last_interaction_at:
+            return snapshot.last_interaction_at.strftime('%Y-%m-%d %H:%M')
         return '-'
     
     last_interaction_display.short_description = 'Last Interaction'
+    last_interaction_display.admin_order_field = 'snapshot__last_interaction_at'
 
     def activate_customers(self, request, queryset):
         """Bulk activate customers."""
-        updated = queryset.update(is_active=True)
-        self.message_user(request, f'{updated} customers were successfully activated.')
+        return self.chunked_update(
+            request, queryset, {'is_active': True},
+            "Activate customers", '{count} customers were successfully activated.'
+        )
     
     activate_customers.short_description = "Activate selected customers"
 
     def deactivate_customers(self, request, queryset):
         """Bulk deactivate customers."""
-        updated = queryset.update(is_active=False)
-        self.message_user(request, f'{updated} customers were successfully deactivated.')
+        return self.chunked_update(
+            request, queryset, {'is_active': False},
+            "Deactivate customers", '{count} customers were successfully deactivated.'
+        )
     
     deactivate_customers.short_description = "Deactivate selected customers"
 
     def get_queryset(self, request):
-        """Optimize queryset with prefetch_related."""
+        """Read interaction stats from the one-row-per-customer snapshot."""
         queryset = super().get_queryset(request)
-        return queryset.prefetch_related('interactions')
\ No newline at end of file
+        return queryset.select_related('snapshot')
+
+
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    """
+    Admin interface for monitoring and resuming chunked bulk actions.
+    """
+    list_display = [
+        'description', 'model_label', 'status', 'processed', 'total',
+        'chunk_size', 'created_by', 'created_at', 'finished_at'
+    ]
+    list_filter = ['status', 'model_label']
+    readonly_fields = [
+        'model_label', 'description', 'values', 'chunk_size', 'status', 'total',
+        'processed', 'last_pk', 'error', 'created_by', 'created_at', 'updated_at',
+        'finished_at'
+    ]
+    exclude = ['pks']
+    actions = ['resume_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    def resume_jobs(self, request, queryset):
+        """Restart queued or failed jobs from their last committed chunk."""
+        resumed = 0
+        for job in queryset.filter(status__in=['queued', 'failed']):
+            start_in_background(job.pk)
+            resumed += 1
+        self.message_user(request, f'{resumed} jobs resumed in the background.')
+
+    resume_jobs.short_description = "Resume selected jobs"
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """
+    Review queue for pairs found by ``find_duplicate_customers``.
+    """
+    list_display = [
+        'customer_a', 'customer_b', 'score', 'matched_on', 'status',
+        'reviewed_by', 'created_at'
+    ]
+    list_filter = ['status']
+    list_select_related = ['customer_a', 'customer_b']
+    search_fields = ['customer_a__name', 'customer_a__email', 'customer_b__name', 'customer_b__email']
+    raw_id_fields = ['customer_a', 'customer_b']
+    readonly_fields = ['score', 'matched_on', 'reviewed_by', 'reviewed_at', 'created_at']
+    actions = ['merge_pairs', 'dismiss_pairs']
+
+    def has_add_permission(self, request):
+        return False
+
+    def merge_pairs(self, request, queryset):
+        """Merge the newer customer of each pair into the older one."""
+        merged = moved = 0
+        # Each merge can dismiss other pairs and deactivate their customers,
+        # so reload every pair just before merging it.
+        pending = DuplicateCandidate.objects.filter(status='pending').select_related('customer_a', 'customer_b')
+        for pk in queryset.filter(status='pending').values_list('pk', flat=True):
+            pair = pending.filter(pk=pk).first()
+            if pair is None or not (pair.customer_a.is_active and pair.customer_b.is_active):
+                continue
+            try:
+                moved += merge_customers(pair.customer_a, pair.customer_b, user=request.user)
+            except ValueError as e:
+                self.message_user(request, str(e), level=messages.WARNING)
+                continue
+            merged += 1
+        self.message_user(request, f'{merged} pairs merged, {moved} interactions reassigned.')
+
+    merge_pairs.short_description = "Merge selected pairs (keep older customer)"
+
+    def dismiss_pairs(self, request, queryset):
+        """Mark pairs as not duplicates so later scans don't re-raise them."""
+        updated = queryset.filter(status='pending').update(
+            status='dismissed', reviewed_by=request.user.username, reviewed_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} pairs dismissed.')
+
+    dismiss_pairs.short_description = "Dismiss selected pairs"
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    """
+    Admin interface for webhook delivery and dead letters.
+    """
+    list_display = [
+        'id', 'event_type', 'status', 'attempts', 'next_attempt_at',
+        'created_at', 'delivered_at'
+    ]
+    list_filter = ['status', 'event_type']
+    readonly_fields = [
+        'event_type', 'payload', 'status', 'attempts', 'next_attempt_at',
+        'claimed_by', 'last_error', 'created_at', 'delivered_at'
+    ]
+    actions = ['requeue_events']
+
+    def has_add_permission(self, request):
+        return False
+
+    def requeue_events(self, request, queryset):
+        """Give dead-lettered events a fresh set of delivery attempts."""
+        requeued = requeue(queryset)
+        self.message_user(request, f'{requeued} events requeued.')
+
+    requeue_events.short_description = "Requeue selected dead letters"
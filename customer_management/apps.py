@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CustomerManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_management'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .slowlog import instrument_connection
+
+        connection_created.connect(instrument_connection, dispatch_uid='customer_management.slowlog')
@@ -0,0 +1,127 @@
+"""
+Chunked execution of admin bulk actions.
+
+A single ``queryset.update()`` over a "select all N matching" selection
+holds one long write transaction. Jobs here record the primary keys of the
+selection when submitted, walk them in order, update one chunk per
+transaction and record a cursor after each chunk, so progress is visible
+and an interrupted job resumes where it stopped.
+"""
+import logging
+import threading
+from bisect import bisect_right
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BulkActionJob
+from .signals import bulk_updated
+
+logger = logging.getLogger(__name__)
+
+
+def submit_bulk_update(queryset, values, description, user=None, chunk_size=None):
+    """
+    Create a job applying ``values`` to every row selected by ``queryset``.
+
+    Selections that fit in one chunk, or every selection when
+    ``BULK_ACTION_BACKGROUND`` is off, run inline before returning. Larger
+    ones start in a background thread once the surrounding transaction
+    commits; check ``job.status`` to tell the two apart.
+    """
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    job = BulkActionJob.objects.create(
+        model_label=queryset.model._meta.label,
+        description=description,
+        values=values,
+        pks=pks,
+        chunk_size=chunk_size or settings.BULK_ACTION_CHUNK_SIZE,
+        total=len(pks),
+        created_by=getattr(user, 'username', '') or '',
+    )
+    if job.total > job.chunk_size and settings.BULK_ACTION_BACKGROUND:
+        logger.info("Queued bulk job %s: %s (%s rows)", job.pk, description, job.total)
+        transaction.on_commit(lambda: start_in_background(job.pk))
+        return job
+    return run_job(job)
+
+
+def start_in_background(job_id):
+    """Run a job in a daemon thread of the current process."""
+    thread = threading.Thread(
+        target=_run_in_thread,
+        args=(job_id,),
+        name=f'bulk-job-{job_id}',
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(BulkActionJob.objects.get(pk=job_id))
+    finally:
+        # Threads get their own connections; don't leak them.
+        connections.close_all()
+
+
+def next_chunk(job):
+    """Primary keys of the next chunk of ``job``: those after its cursor."""
+    start = 0 if job.last_pk is None else bisect_right(job.pks, job.last_pk)
+    return job.pks[start:start + job.chunk_size]
+
+
+def run_chunk(job, model):
+    """
+    Process the next chunk of ``job`` in its own transaction.
+
+    Returns the number of rows updated, or ``None`` when nothing is left.
+    """
+    pks = next_chunk(job)
+    if not pks:
+        return None
+    with transaction.atomic():
+        updated = model._base_manager.filter(pk__in=pks).update(**job.values)
+        bulk_updated.send(sender=model, pks=pks, values=job.values)
+
+        BulkActionJob.objects.filter(pk=job.pk).update(
+            last_pk=pks[-1],
+            processed=F('processed') + updated,
+            updated_at=timezone.now(),
+        )
+    job.last_pk = pks[-1]
+    job.processed += updated
+    return updated
+
+
+def run_job(job):
+    """
+    Run ``job`` to completion, resuming from its cursor.
+
+    Chunks already committed stay committed if a later chunk fails; the job
+    is then marked failed and can be resumed with ``resume_bulk_jobs``.
+    """
+    model = apps.get_model(job.model_label)
+    job.status = 'running'
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        while run_chunk(job, model) is not None:
+            pass
+    except Exception as e:
+        logger.error("Bulk job %s failed after %s rows: %s", job.pk, job.processed, e)
+        job.status = 'failed'
+        job.error = str(e)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        return job
+
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info("Bulk job %s completed: %s rows updated", job.pk, job.processed)
+    return job
@@ -0,0 +1,12 @@
+"""
+Cached lookups of hot rows by primary key (see ``customer360.objcache``).
+
+Use ``customers.get(pk)`` / ``customers.get_or_404(pk)`` where a view or
+form only needs one customer's own fields; receivers in
+``customer_management.signals`` keep it in step with writes.
+"""
+from customer360.objcache import ObjectCache
+
+from .models import Customer
+
+customers = ObjectCache(Customer)
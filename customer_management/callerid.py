@@ -0,0 +1,91 @@
+"""
+Caller-ID lookup: phone number to customer plus recent interactions.
+
+The lookup is one query on the indexed ``phone_normalized`` column, with
+the latest interactions per customer picked by a window function in the
+same statement. Results are kept in a small per-process LRU so repeat
+callers are answered without touching the database. Entries expire after
+``CALLER_ID_CACHE_TTL`` seconds, and writes in this process evict the
+affected customer straight away.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from customer360 import metrics
+from customer360.lru import LRUCache
+from .models import Customer
+from .phone import to_e164
+
+RECENT_INTERACTIONS = 5
+
+CUSTOMER_FIELDS = ['id', 'name', 'email', 'phone', 'is_active']
+INTERACTION_FIELDS = ['id', 'channel', 'direction', 'status', 'interaction_date', 'summary']
+
+_cache = LRUCache(settings.CALLER_ID_CACHE_SIZE, settings.CALLER_ID_CACHE_TTL)
+
+
+def _fetch(number, limit):
+    interaction_fields = [f'interactions__{field}' for field in INTERACTION_FIELDS]
+    rows = (
+        Customer.objects.filter(phone_normalized=number)
+        .annotate(row=Window(
+            RowNumber(),
+            partition_by=F('id'),
+            order_by=[F('interactions__interaction_date').desc(), F('interactions__id').desc()],
+        ))
+        .filter(row__lte=limit)
+        .order_by('-is_active', 'name', 'id', 'row')
+        .values(*CUSTOMER_FIELDS, *interaction_fields)
+    )
+
+    customers = {}
+    for row in rows:
+        customer = customers.get(row['id'])
+        if customer is None:
+            customer = {field: row[field] for field in CUSTOMER_FIELDS}
+            customer['recent_interactions'] = []
+            customers[row['id']] = customer
+        if row['interactions__id'] is not None:
+            customer['recent_interactions'].append(
+                {field: row[f'interactions__{field}'] for field in INTERACTION_FIELDS}
+            )
+    return list(customers.values())
+
+
+def lookup(raw_number, limit=RECENT_INTERACTIONS):
+    """
+    Return ``(e164, customers)`` for an incoming number.
+
+    ``customers`` is a list of dicts, active customers first, each with up
+    to ``limit`` recent interactions. Raises ``ValueError`` if the number
+    can't be normalized.
+    """
+    number = to_e164(raw_number)
+    if not number:
+        raise ValueError(f"Not a valid phone number: {raw_number}")
+    key = (number, limit)
+    customers = _cache.get(key)
+    metrics.record_cache('caller_id', customers is not None)
+    if customers is None:
+        customers = _fetch(number, limit)
+        _cache.set(key, customers)
+    return number, customers
+
+
+def invalidate_customers(customer_ids):
+    """Evict cached lookups that returned any of ``customer_ids``."""
+    customer_ids = set(customer_ids)
+    _cache.discard_if(lambda key, customers: any(c['id'] in customer_ids for c in customers))
+
+
+def invalidate_number(number):
+    """Evict cached lookups for ``number`` (already in E.164 form)."""
+    _cache.discard_if(lambda key, customers: key[0] == number)
+
+
+def invalidate_numbers(numbers):
+    """Evict cached lookups for any of ``numbers`` (already in E.164 form)."""
+    numbers = set(numbers)
+    if numbers:
+        _cache.discard_if(lambda key, customers: key[0] in numbers)
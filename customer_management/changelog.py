@@ -0,0 +1,87 @@
+"""
+Append-only change log for delta sync.
+
+Receivers in ``customer_management.signals`` and ``interactions.signals``
+call :func:`record` for single-row saves and deletes and
+:func:`record_bulk` for ``bulk_updated`` chunks, always inside the
+transaction making the change, and hand the new entries to
+:func:`customer_management.outbox.publish`. :func:`changes_since` serves
+consumers that poll with the last sequence number they processed.
+"""
+from django.core import serializers
+from django.db import connections, router, transaction
+
+from . import outbox
+from .models import ChangeLogEntry
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+# Arbitrary key for the PostgreSQL advisory lock serializing writers.
+WRITER_LOCK_ID = 360_043
+
+
+def _serialize_writers(using):
+    """
+    Make sequence order match commit order.
+
+    On PostgreSQL two transactions can commit their entries in the
+    opposite order to the sequence numbers they drew, and a consumer that
+    already moved past the larger one would never see the smaller. The
+    transaction-scoped lock makes writers take turns; SQLite already
+    allows only one writer at a time.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [WRITER_LOCK_ID])
+
+
+def _data(instances):
+    return {
+        int(row['pk']): row['fields']
+        for row in serializers.serialize('python', instances)
+    }
+
+
+def record(instance, action):
+    """Log ``action`` ('create', 'update', 'delete', ...) for one instance."""
+    model = type(instance)
+    using = router.db_for_write(ChangeLogEntry)
+    with transaction.atomic(using=using):
+        _serialize_writers(using)
+        data = None if action == 'delete' else _data([instance])[instance.pk]
+        entry = ChangeLogEntry.objects.using(using).create(
+            model=model._meta.label_lower, object_id=instance.pk, action=action, data=data,
+        )
+        outbox.publish([entry])
+
+
+def record_bulk(model, pks, action='update'):
+    """Log one entry per row of a bulk change, reading the rows in one query."""
+    if not pks:
+        return
+    using = router.db_for_write(ChangeLogEntry)
+    with transaction.atomic(using=using):
+        _serialize_writers(using)
+        data = _data(model._base_manager.using(using).filter(pk__in=pks).order_by('pk'))
+        entries = ChangeLogEntry.objects.using(using).bulk_create([
+            ChangeLogEntry(model=model._meta.label_lower, object_id=pk, action=action, data=data[pk])
+            for pk in sorted(data)
+        ])
+        outbox.publish(entries)
+
+
+def changes_since(since=0, limit=DEFAULT_PAGE_SIZE, models=None):
+    """
+    Return up to ``limit`` entries with a sequence above ``since``.
+
+    ``models`` optionally restricts the result to some ``label_lower``
+    values. The caller passes the last returned sequence as ``since`` to
+    get the next page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    entries = ChangeLogEntry.objects.filter(sequence__gt=since).order_by('sequence')
+    if models:
+        entries = entries.filter(model__in=models)
+    return list(entries[:limit])
@@ -0,0 +1,301 @@
+"""
+Batch detection and merging of near-duplicate customers.
+
+Comparing every customer with every other one is O(n²). Instead each
+customer gets a few blocking keys (E.164 phone, email local-part and
+a phonetic code of the name), and only customers sharing a key are
+compared. Oversized blocks fall back to a sorted-neighbourhood window so a
+common name can't blow up the pair count. Pairs are scored in chunks with
+NumPy (trigram Jaccard over integer token ids) in a process pool.
+"""
+import logging
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Customer, DuplicateCandidate
+from .phone import to_e164
+from .signals import bulk_updated
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SCORE = 0.6
+DEFAULT_MAX_BLOCK_SIZE = 100
+DEFAULT_WINDOW = 10
+SCORE_CHUNK_SIZE = 20000
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def email_local_part(email):
+    """Lower-cased local part with dots and ``+tags`` removed."""
+    local = (email or '').split('@')[0].lower()
+    return local.split('+')[0].replace('.', '')
+
+
+def soundex(word):
+    word = word.lower()
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':
+            previous = digit
+    return (code + '000')[:4]
+
+
+def name_key(name):
+    """Phonetic code of the first and last name, independent of order."""
+    tokens = re.findall(r'[a-z]+', (name or '').lower())
+    if not tokens:
+        return ''
+    return '-'.join(sorted({soundex(tokens[0]), soundex(tokens[-1])}))
+
+
+def blocking_keys(name, email, phone):
+    """Return ``(kind, key)`` pairs; ``phone`` is already in E.164 form."""
+    keys = []
+    if phone_key := phone:
+        keys.append(('phone', phone_key))
+    if email_key := email_local_part(email):
+        keys.append(('email', email_key))
+    if phonetic := name_key(name):
+        keys.append(('name', phonetic))
+    return keys
+
+
+def _trigrams(text):
+    padded = f'  {text.lower().strip()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _token_ids(text, vocabulary):
+    """Ids of the trigrams of ``text``, adding new ones to ``vocabulary``; none if blank."""
+    if not (text or '').strip():
+        return np.empty(0, dtype=np.int64)
+    return np.array([vocabulary.setdefault(t, len(vocabulary)) for t in _trigrams(text)], dtype=np.int64)
+
+
+def _jaccard(tokens, ids_a, ids_b):
+    """
+    Jaccard similarity of the token sets of each ``(ids_a[i], ids_b[i])``.
+
+    ``tokens`` maps ids to arrays of distinct integer token ids. The
+    intersections of all pairs come from one sort of ``(pair, token)``
+    keys: a key occurring on both sides is a shared token.
+    """
+    sizes_a = np.array([len(tokens[pk]) for pk in ids_a], dtype=np.int64)
+    sizes_b = np.array([len(tokens[pk]) for pk in ids_b], dtype=np.int64)
+    vocabulary = 1 + max((int(t.max()) for t in tokens.values() if len(t)), default=0)
+    pair_index = np.arange(len(ids_a), dtype=np.int64)
+
+    def keys(ids, sizes):
+        token_ids = np.concatenate([tokens[pk] for pk in ids] + [np.empty(0, dtype=np.int64)])
+        return np.repeat(pair_index, sizes) * vocabulary + token_ids
+
+    shared_keys, counts = np.unique(np.concatenate([keys(ids_a, sizes_a), keys(ids_b, sizes_b)]), return_counts=True)
+    shared = np.bincount(shared_keys[counts == 2] // vocabulary, minlength=len(ids_a))
+    union = sizes_a + sizes_b - shared
+    return np.divide(shared, union, out=np.zeros(len(ids_a)), where=(sizes_a > 0) & (sizes_b > 0))
+
+
+def score_pairs(pairs):
+    """
+    Score ``(id_a, record_a, id_b, record_b)`` tuples.
+
+    Records are ``(name, email_local, e164_phone)``. The score weights name
+    similarity (trigram Jaccard) most, then the email local-part, then an
+    exact phone match. Trigrams are computed once per record; the
+    similarities of the whole chunk are then computed with array operations.
+    Runs in worker processes, so it must not touch the database.
+    """
+    if not pairs:
+        return []
+    vocabulary = {}
+    names, emails, phones = {}, {}, {}
+    for id_a, record_a, id_b, record_b in pairs:
+        for pk, (name, email, phone) in ((id_a, record_a), (id_b, record_b)):
+            if pk not in names:
+                names[pk] = _token_ids(name, vocabulary)
+                emails[pk] = _token_ids(email, vocabulary)
+                phones[pk] = phone or ''
+
+    ids_a = [pair[0] for pair in pairs]
+    ids_b = [pair[2] for pair in pairs]
+    phones_a = np.array([phones[pk] for pk in ids_a], dtype=object)
+    phones_b = np.array([phones[pk] for pk in ids_b], dtype=object)
+    scores = (
+        0.5 * _jaccard(names, ids_a, ids_b)
+        + 0.25 * _jaccard(emails, ids_a, ids_b)
+        + 0.25 * ((phones_a == phones_b) & (phones_a != '')).astype(float)
+    )
+    return [(a, b, round(float(score), 4)) for a, b, score in zip(ids_a, ids_b, scores)]
+
+
+def load_records(batch_size=5000):
+    """Return ``{pk: (name, email, e164_phone)}`` for active customers."""
+    records = {}
+    last_pk = 0
+    while True:
+        rows = list(
+            Customer.objects.filter(is_active=True, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'name', 'email', 'phone', 'phone_normalized')[:batch_size]
+        )
+        if not rows:
+            return records
+        for pk, name, email, phone, phone_normalized in rows:
+            # Rows saved before the backfill have no normalized phone yet.
+            records[pk] = (name, email, phone_normalized or to_e164(phone))
+        last_pk = rows[-1][0]
+
+
+def candidate_pairs(records, max_block_size=DEFAULT_MAX_BLOCK_SIZE, window=DEFAULT_WINDOW):
+    """
+    Return ``{(id_a, id_b): {key kinds shared}}`` with ``id_a < id_b``.
+
+    Blocks up to ``max_block_size`` are compared exhaustively; larger ones
+    only compare each customer with the next ``window`` customers by name.
+    """
+    blocks = defaultdict(list)
+    for pk, (name, email, phone) in records.items():
+        for key in blocking_keys(name, email, phone):
+            blocks[key].append(pk)
+
+    pairs = defaultdict(set)
+    for (kind, _), members in blocks.items():
+        if len(members) < 2:
+            continue
+        if len(members) <= max_block_size:
+            members.sort()
+            for i, id_a in enumerate(members):
+                for id_b in members[i + 1:]:
+                    pairs[(id_a, id_b)].add(kind)
+        else:
+            members.sort(key=lambda pk: records[pk][0].lower())
+            for i, id_a in enumerate(members):
+                for id_b in members[i + 1:i + 1 + window]:
+                    pairs[(min(id_a, id_b), max(id_a, id_b))].add(kind)
+    return pairs
+
+
+def find_duplicates(min_score=DEFAULT_MIN_SCORE, workers=None, max_block_size=DEFAULT_MAX_BLOCK_SIZE,
+                    window=DEFAULT_WINDOW, stdout=None):
+    """
+    Scan active customers and record likely duplicates for review.
+
+    With ``workers`` of 1 scoring runs in-process. Pairs already reviewed
+    keep their status. Returns the number of candidate pairs found.
+    """
+    raw = load_records()
+    records = {
+        pk: (name, email_local_part(email), phone)
+        for pk, (name, email, phone) in raw.items()
+    }
+    pairs = candidate_pairs(raw, max_block_size, window)
+    if stdout:
+        stdout.write(f"{len(records)} customers, {len(pairs)} pairs to score")
+
+    keys = list(pairs)
+    chunks = (
+        [(a, records[a], b, records[b]) for a, b in keys[start:start + SCORE_CHUNK_SIZE]]
+        for start in range(0, len(keys), SCORE_CHUNK_SIZE)
+    )
+    if workers == 1:
+        scored = map(score_pairs, chunks)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        scored = executor.map(score_pairs, chunks)
+
+    found = 0
+    try:
+        for results in scored:
+            candidates = [
+                DuplicateCandidate(
+                    customer_a_id=a,
+                    customer_b_id=b,
+                    score=score,
+                    matched_on=sorted(pairs[(a, b)]),
+                )
+                for a, b, score in results
+                if score >= min_score
+            ]
+            DuplicateCandidate.objects.bulk_create(candidates, ignore_conflicts=True, batch_size=1000)
+            found += len(candidates)
+    finally:
+        if workers != 1:
+            executor.shutdown()
+    logger.info("Duplicate scan found %s candidate pairs among %s customers", found, len(records))
+    return found
+
+
+def merge_customers(keep, duplicate, user=None):
+    """
+    Merge ``duplicate`` into ``keep``.
+
+    All of the duplicate's interactions move with a single UPDATE, blank
+    contact fields on ``keep`` are filled from the duplicate, and the
+    duplicate is deactivated rather than deleted. Returns the number of
+    interactions moved.
+
+    Raises ``ValueError`` if both are the same customer or either one is
+    no longer active (e.g. already merged into a third customer).
+    """
+    from interactions.models import Interaction
+
+    if keep.pk == duplicate.pk:
+        raise ValueError(f"Cannot merge customer {keep.pk} into itself")
+    with transaction.atomic():
+        # Evaluate the rows: count() would drop FOR UPDATE and lock nothing.
+        locked = list(
+            Customer.objects.select_for_update()
+            .filter(pk__in=[keep.pk, duplicate.pk], is_active=True)
+            .values_list('pk', flat=True)
+        )
+        if len(locked) != 2:
+            raise ValueError(f"Cannot merge customer {duplicate.pk} into {keep.pk}: both must be active")
+        moved_pks = list(duplicate.interactions.values_list('pk', flat=True))
+        moved = Interaction.objects.filter(customer=duplicate).update(customer=keep)
+        if moved_pks:
+            bulk_updated.send(
+                sender=Interaction,
+                pks=moved_pks,
+                values={'customer_id': keep.pk},
+                previous_customer_ids=[duplicate.pk],
+            )
+
+        if not keep.social_media and duplicate.social_media:
+            keep.social_media = duplicate.social_media
+            keep.save()
+        duplicate.soft_delete()
+
+        reviewer = getattr(user, 'username', '') or ''
+        pair = DuplicateCandidate.objects.filter(
+            customer_a_id=min(keep.pk, duplicate.pk), customer_b_id=max(keep.pk, duplicate.pk)
+        )
+        pair.update(status='merged', reviewed_by=reviewer, reviewed_at=timezone.now())
+        # Other open pairs involving the merged-away customer are moot.
+        DuplicateCandidate.objects.filter(status='pending').filter(
+            customer_a=duplicate
+        ).update(status='dismissed', reviewed_by=reviewer, reviewed_at=timezone.now())
+        DuplicateCandidate.objects.filter(status='pending').filter(
+            customer_b=duplicate
+        ).update(status='dismissed', reviewed_by=reviewer, reviewed_at=timezone.now())
+
+    logger.info("Merged customer %s into %s: %s interactions moved", duplicate.pk, keep.pk, moved)
+    return moved
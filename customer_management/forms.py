@@ -1,5 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from segments.models import Segment
 from .models import Customer
 
 
@@ -93,4 +94,14 @@ class CustomerSearchForm(forms.Form):
         widget=forms.CheckboxInput(attrs={
             'class': 'form-check-input'
         })
+    )
+    
+    segment = forms.ModelChoiceField(
+        queryset=Segment.objects.all(),
+        to_field_name='slug',
+        required=False,
+        empty_label='All customers',
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
     )
\ No newline at end of file
@@ -0,0 +1,335 @@
+"""
+Copying data out of the legacy ``customer360_customer`` and
+``customer360_interaction`` tables.
+
+The old app is no longer installed, so its tables are read with plain SQL.
+Rows are copied in legacy-id order, one batch per transaction, with
+``bulk_create``; every copied row gets a :class:`LegacyIdMap` entry in the
+same transaction, so a re-run resumes after the last mapped id. Legacy
+customers whose email already exists in the new table are mapped to that
+customer rather than copied.
+"""
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Customer, LegacyIdMap
+from .phone import to_e164
+from .signals import bulk_updated
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_TABLE = 'customer360_customer'
+INTERACTION_TABLE = 'customer360_interaction'
+CUSTOMER_COLUMNS = ['id', 'name', 'email', 'phone', 'address', 'social_media']
+INTERACTION_COLUMNS = ['id', 'customer_id', 'channel', 'direction', 'interaction_date', 'summary']
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def legacy_tables_exist():
+    tables = set(connection.introspection.table_names())
+    return {CUSTOMER_TABLE, INTERACTION_TABLE} <= tables
+
+
+def _fetch(table, columns, after_id, limit, where=''):
+    quote = connection.ops.quote_name
+    sql = (
+        f"SELECT {', '.join(quote(c) for c in columns)} FROM {quote(table)} "
+        f"WHERE {quote('id')} > %s {where} ORDER BY {quote('id')} LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [after_id, limit])
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _count(table, where=''):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)} WHERE 1 = 1 {where}")
+        return cursor.fetchone()[0]
+
+
+def _resume_point(source):
+    return LegacyIdMap.objects.filter(source=source).aggregate(last=Max('legacy_id'))['last'] or 0
+
+
+def _as_datetime(value):
+    """Legacy dates are plain dates (strings on SQLite); use local midnight."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def _first_interaction_dates(legacy_customer_ids):
+    """Earliest legacy interaction date per legacy customer id."""
+    if not legacy_customer_ids:
+        return {}
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(legacy_customer_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {quote('customer_id')}, MIN({quote('interaction_date')}) "
+            f"FROM {quote(INTERACTION_TABLE)} WHERE {quote('customer_id')} IN ({placeholders}) "
+            f"GROUP BY {quote('customer_id')}",
+            list(legacy_customer_ids),
+        )
+        return dict(cursor.fetchall())
+
+
+def _truncate(model, field, value):
+    return (value or '')[:model._meta.get_field(field).max_length]
+
+
+def migrate_customers(batch_size=DEFAULT_BATCH_SIZE, stdout=None):
+    """
+    Copy legacy customers not yet mapped. Returns ``(copied, matched)``.
+
+    ``created_at`` is backfilled from the customer's first legacy
+    interaction, since the old table never recorded it.
+    """
+    copied = matched = 0
+    last_id = _resume_point('customer')
+    while True:
+        rows = _fetch(CUSTOMER_TABLE, CUSTOMER_COLUMNS, last_id, batch_size)
+        if not rows:
+            return copied, matched
+        with transaction.atomic():
+            existing = dict(
+                Customer.objects.filter(email__in={row['email'] for row in rows}).values_list('email', 'pk')
+            )
+            first_seen = _first_interaction_dates([row['id'] for row in rows])
+            now = timezone.now()
+            new_customers, new_legacy_ids, mappings = [], [], []
+            for row in rows:
+                if row['email'] in existing:
+                    mappings.append(LegacyIdMap(
+                        source='customer', legacy_id=row['id'], new_id=existing[row['email']], created=False,
+                    ))
+                    continue
+                phone = _truncate(Customer, 'phone', row['phone'])
+                customer = Customer(
+                    name=_truncate(Customer, 'name', row['name']),
+                    email=row['email'],
+                    phone=phone,
+                    phone_normalized=to_e164(phone),
+                    address=_truncate(Customer, 'address', row['address']),
+                    social_media=_truncate(Customer, 'social_media', row['social_media']),
+                )
+                # Later legacy rows with the same email map to this one.
+                existing[row['email']] = customer
+                new_customers.append(customer)
+                new_legacy_ids.append(row['id'])
+
+            Customer.objects.bulk_create(new_customers)
+            # auto_now_add overwrites created_at in bulk_create; set it after.
+            for customer, legacy_id in zip(new_customers, new_legacy_ids):
+                seen = first_seen.get(legacy_id)
+                customer.created_at = _as_datetime(seen) if seen else now
+                mappings.append(LegacyIdMap(source='customer', legacy_id=legacy_id, new_id=customer.pk))
+            Customer.objects.bulk_update(new_customers, ['created_at'])
+            for mapping in mappings:
+                if isinstance(mapping.new_id, Customer):
+                    mapping.new_id = mapping.new_id.pk
+            LegacyIdMap.objects.bulk_create(mappings)
+            if new_customers:
+                # bulk_create skips post_save; let caches and segments catch up.
+                bulk_updated.send(sender=Customer, pks=[c.pk for c in new_customers], values={})
+
+        copied += len(new_customers)
+        matched += len(rows) - len(new_customers)
+        last_id = rows[-1]['id']
+        if stdout:
+            stdout.write(f"Customers: {copied} copied, {matched} matched (through legacy id {last_id})")
+
+
+def _unmapped_interactions(customer_ids):
+    """``{(customer_id, channel, direction, summary): [pk, ...]}`` not yet mapped."""
+    from interactions.models import Interaction
+
+    mapped = LegacyIdMap.objects.filter(source='interaction').values('new_id')
+    candidates = defaultdict(list)
+    rows = (
+        Interaction.objects.filter(customer_id__in=customer_ids)
+        .exclude(pk__in=mapped)
+        .order_by('pk')
+        .values_list('pk', 'customer_id', 'channel', 'direction', 'summary')
+    )
+    for pk, *key in rows:
+        candidates[tuple(key)].append(pk)
+    return candidates
+
+
+def migrate_interactions(batch_size=DEFAULT_BATCH_SIZE, stdout=None):
+    """
+    Copy legacy interactions not yet mapped, after their customers.
+
+    For customers that matched an existing record, an existing interaction
+    with the same channel, direction and summary is mapped instead of
+    copied again. Interactions whose legacy customer no longer exists are
+    skipped. Returns ``(copied, matched, skipped)``.
+    """
+    from interactions.models import Interaction
+
+    copied = matched = skipped = 0
+    last_id = _resume_point('interaction')
+    while True:
+        rows = _fetch(INTERACTION_TABLE, INTERACTION_COLUMNS, last_id, batch_size)
+        if not rows:
+            return copied, matched, skipped
+        with transaction.atomic():
+            customers = dict(
+                LegacyIdMap.objects.filter(source='customer', legacy_id__in={row['customer_id'] for row in rows})
+                .values_list('legacy_id', 'new_id')
+            )
+            candidates = _unmapped_interactions(customers.values())
+            new_interactions, new_legacy_ids, mappings = [], [], []
+            for row in rows:
+                customer_id = customers.get(row['customer_id'])
+                if customer_id is None:
+                    skipped += 1
+                    continue
+                existing = candidates.get((customer_id, row['channel'], row['direction'], row['summary']))
+                if existing:
+                    mappings.append(LegacyIdMap(
+                        source='interaction', legacy_id=row['id'], new_id=existing.pop(0), created=False,
+                    ))
+                    continue
+                new_interactions.append(Interaction(
+                    customer_id=customer_id,
+                    channel=row['channel'],
+                    direction=row['direction'],
+                    status='completed',
+                    summary=row['summary'],
+                    created_by='legacy import',
+                ))
+                new_legacy_ids.append(row['id'])
+
+            Interaction.objects.bulk_create(new_interactions)
+            by_legacy_id = {row['id']: row for row in rows}
+            # As with customers, interaction_date has to be set after the insert.
+            for interaction, legacy_id in zip(new_interactions, new_legacy_ids):
+                interaction.interaction_date = _as_datetime(by_legacy_id[legacy_id]['interaction_date'])
+                mappings.append(LegacyIdMap(source='interaction', legacy_id=legacy_id, new_id=interaction.pk))
+            Interaction.objects.bulk_update(new_interactions, ['interaction_date'])
+            LegacyIdMap.objects.bulk_create(mappings)
+            if new_interactions:
+                # Refreshes snapshots, worklist counts and segment bitmaps.
+                bulk_updated.send(sender=Interaction, pks=[i.pk for i in new_interactions], values={})
+
+        copied += len(new_interactions)
+        matched += len(mappings) - len(new_interactions)
+        last_id = rows[-1]['id']
+        if stdout:
+            stdout.write(
+                f"Interactions: {copied} copied, {matched} matched, {skipped} skipped "
+                f"(through legacy id {last_id})"
+            )
+
+
+def _checksum(rows):
+    digest = hashlib.sha256()
+    count = 0
+    for row in rows:
+        digest.update(repr(row).encode())
+        count += 1
+    return count, digest.hexdigest()
+
+
+def _legacy_rows(table, columns, batch_size, where='', transform=lambda row: row):
+    last_id = 0
+    while True:
+        rows = _fetch(table, columns, last_id, batch_size, where)
+        if not rows:
+            return
+        yield from (transform(row) for row in rows)
+        last_id = rows[-1]['id']
+
+
+def _copied_rows(source, queryset, fields, batch_size, transform):
+    """``transform(legacy_id, row)`` for each row the migration created, in legacy-id order."""
+    mappings = LegacyIdMap.objects.filter(source=source, created=True).order_by('legacy_id')
+    last_id = 0
+    while True:
+        batch = list(mappings.filter(legacy_id__gt=last_id).values_list('legacy_id', 'new_id')[:batch_size])
+        if not batch:
+            return
+        rows = {row['pk']: row for row in queryset.filter(pk__in=[n for _, n in batch]).values('pk', *fields)}
+        for legacy_id, new_id in batch:
+            row = rows.get(new_id)
+            yield transform(legacy_id, row) if row else (legacy_id, None)
+        last_id = batch[-1][0]
+
+
+def verify(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Compare the legacy tables with what was copied.
+
+    Returns a list of ``(source, check, legacy_value, new_value)`` for every
+    check that failed; an empty list means the migration is complete.
+    Checks are: every legacy row is mapped, and a SHA-256 over the copied
+    rows' content matches the same digest over their legacy rows. Rows
+    mapped to records that already existed are only counted.
+    """
+    from interactions.models import Interaction
+
+    quote = connection.ops.quote_name
+    problems = []
+    created = defaultdict(set)
+    for source, legacy_id in LegacyIdMap.objects.filter(created=True).values_list('source', 'legacy_id'):
+        created[source].add(legacy_id)
+
+    mapped_customers = LegacyIdMap.objects.filter(source='customer').count()
+    legacy_customers = _count(CUSTOMER_TABLE)
+    if mapped_customers != legacy_customers:
+        problems.append(('customer', 'rows', legacy_customers, mapped_customers))
+
+    customer_fields = ['name', 'email', 'phone', 'address', 'social_media']
+    legacy_digest = _checksum(
+        (row['id'], *(_truncate(Customer, f, row[f]) if f != 'email' else row[f] for f in customer_fields))
+        for row in _legacy_rows(CUSTOMER_TABLE, CUSTOMER_COLUMNS, batch_size)
+        if row['id'] in created['customer']
+    )
+    new_digest = _checksum(_copied_rows(
+        'customer', Customer.objects.all(), customer_fields, batch_size,
+        lambda legacy_id, row: (legacy_id, *(row[f] for f in customer_fields)),
+    ))
+    if legacy_digest != new_digest:
+        problems.append(('customer', 'checksum', legacy_digest, new_digest))
+
+    # Interactions of deleted legacy customers are never copied.
+    has_customer = (
+        f"AND {quote('customer_id')} IN (SELECT {quote('id')} FROM {quote(CUSTOMER_TABLE)})"
+    )
+    legacy_interactions = _count(INTERACTION_TABLE, has_customer)
+    mapped_interactions = LegacyIdMap.objects.filter(source='interaction').count()
+    if mapped_interactions != legacy_interactions:
+        problems.append(('interaction', 'rows', legacy_interactions, mapped_interactions))
+
+    customer_ids = dict(LegacyIdMap.objects.filter(source='customer').values_list('legacy_id', 'new_id'))
+    legacy_digest = _checksum(
+        (row['id'], customer_ids.get(row['customer_id']), row['channel'], row['direction'],
+         _as_datetime(row['interaction_date']).date().isoformat(), row['summary'])
+        for row in _legacy_rows(INTERACTION_TABLE, INTERACTION_COLUMNS, batch_size, has_customer)
+        if row['id'] in created['interaction']
+    )
+    new_digest = _checksum(_copied_rows(
+        'interaction', Interaction.objects.all(),
+        ['customer_id', 'channel', 'direction', 'interaction_date', 'summary'], batch_size,
+        lambda legacy_id, row: (
+            legacy_id, row['customer_id'], row['channel'], row['direction'],
+            timezone.localtime(row['interaction_date']).date().isoformat(), row['summary'],
+        ),
+    ))
+    if legacy_digest != new_digest:
+        problems.append(('interaction', 'checksum', legacy_digest, new_digest))
+
+    for problem in problems:
+        logger.warning("Legacy migration check failed: %s %s (legacy %s, new %s)", *problem)
+    return problems
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from customer_management.models import Customer
+from customer_management.phone import to_e164
+from customer_management.signals import bulk_updated
+
+
+class Command(BaseCommand):
+    help = "Fill Customer.phone_normalized for rows saved before it existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Customers per batch and UPDATE (default: 1000)",
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Recompute every row, not just rows without a normalized phone",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Customer.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(phone_normalized='')
+
+        updated = unparseable = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'phone', 'phone_normalized')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = []
+            for customer in batch:
+                normalized = to_e164(customer.phone)
+                if not normalized:
+                    unparseable += 1
+                    continue
+                if normalized != customer.phone_normalized:
+                    customer.phone_normalized = normalized
+                    changed.append(customer)
+            if changed:
+                with transaction.atomic():
+                    Customer.objects.bulk_update(changed, ['phone_normalized'])
+                    # bulk_update skips post_save; let caller-ID, caches and the change log catch up.
+                    bulk_updated.send(sender=Customer, pks=[c.pk for c in changed], values={})
+            updated += len(changed)
+            self.stdout.write(f"Normalized {updated} phones (through id {last_pk})")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {updated} customers; {unparseable} numbers could not be normalized"
+        ))
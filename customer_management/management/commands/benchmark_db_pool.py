@@ -0,0 +1,75 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from customer360.db.pool import pool_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request connection overhead against the configured "
+        "PostgreSQL database, with and without the in-process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per thread (default: 500)")
+        parser.add_argument('--threads', type=int, default=4, help="Concurrent threads (default: 4)")
+        parser.add_argument('--database', default='default', help="Database alias (default: default)")
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options['database']].settings_dict
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError("benchmark_db_pool needs a PostgreSQL database (set DATABASE_URL)")
+
+        modes = {
+            'no pool': 'django.db.backends.postgresql',
+            'pool': 'customer360.db.postgresql',
+        }
+        self.stdout.write(f"{'mode':<8} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for mode, engine in modes.items():
+            config = {
+                **settings_dict,
+                'ENGINE': engine,
+                'CONN_MAX_AGE': 0,
+                'POOL': {**settings.DATABASE_POOL_OPTIONS, 'max_size': options['threads']},
+            }
+            latencies = self._run(config, f'bench-{mode}', options)
+            latencies.sort()
+            n = len(latencies)
+            self.stdout.write(
+                f"{mode:<8} {sum(latencies) / n * 1000:>8.2f} {latencies[n // 2] * 1000:>8.2f} "
+                f"{latencies[int(n * 0.95)] * 1000:>8.2f} {latencies[int(n * 0.99)] * 1000:>8.2f}"
+            )
+        for key, stats in pool_stats().items():
+            if key[0].startswith('bench-'):
+                self.stdout.write(f"pool stats: {stats}")
+
+    def _run(self, config, alias, options):
+        backend = load_backend(config['ENGINE'])
+        latencies = []
+        lock = threading.Lock()
+
+        def client():
+            # Database wrappers are per thread, like request handlers.
+            wrapper = backend.DatabaseWrapper(config, alias=alias)
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                wrapper.close()
+                timings.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=client) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies
@@ -0,0 +1,106 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from customer360.db.sqlite3.base import apply_pragmas
+
+# Django's stock SQLite settings: rollback journal, 5s timeout, deferred BEGIN.
+DEFAULT_TIMEOUT = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite throughput under concurrent readers and writers, "
+        "comparing stock settings with the tuned SQLite mode."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent clients (default: 8)")
+        parser.add_argument('--seconds', type=float, default=5, help="Duration per mode (default: 5)")
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help="Share of operations that are read-then-write transactions (default: 0.2)",
+        )
+        parser.add_argument('--rows', type=int, default=20000, help="Rows in the test table (default: 20000)")
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in ('default', 'tuned'):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self._prepare(path, options['rows'])
+                results[mode] = self._run(path, mode, options)
+
+        self.stdout.write(f"{'mode':<8} {'ops/s':>10} {'locked':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for mode, (ops, locked, latencies) in results.items():
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+            self.stdout.write(
+                f"{mode:<8} {ops / options['seconds']:>10.0f} {locked:>8} {p50:>8.2f} {p99:>8.2f}"
+            )
+        default_ops, tuned_ops = results['default'][0], results['tuned'][0]
+        if default_ops:
+            self.stdout.write(self.style.SUCCESS(f"Tuned mode: {tuned_ops / default_ops:.1f}x throughput"))
+
+    def _prepare(self, path, rows):
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, counter INTEGER, payload TEXT)')
+        conn.executemany(
+            'INSERT INTO item (id, counter, payload) VALUES (?, 0, ?)',
+            ((i, 'x' * 100) for i in range(1, rows + 1)),
+        )
+        conn.commit()
+        conn.close()
+
+    def _run(self, path, mode, options):
+        deadline = time.monotonic() + options['seconds']
+        lock = threading.Lock()
+        totals = {'ops': 0, 'locked': 0, 'latencies': []}
+
+        def client():
+            conn = sqlite3.connect(path, timeout=DEFAULT_TIMEOUT, isolation_level=None)
+            begin = 'BEGIN'
+            if mode == 'tuned':
+                apply_pragmas(conn, settings.SQLITE_PRAGMAS)
+                begin = 'BEGIN IMMEDIATE'
+            ops = locked = 0
+            latencies = []
+            while time.monotonic() < deadline:
+                pk = random.randint(1, options['rows'])
+                started = time.monotonic()
+                try:
+                    if random.random() < options['write_ratio']:
+                        conn.execute(begin)
+                        conn.execute('SELECT counter FROM item WHERE id = ?', (pk,)).fetchone()
+                        conn.execute('UPDATE item SET counter = counter + 1 WHERE id = ?', (pk,))
+                        conn.execute('COMMIT')
+                    else:
+                        conn.execute(
+                            'SELECT SUM(counter), COUNT(*) FROM item WHERE id BETWEEN ? AND ?',
+                            (pk, pk + 500),
+                        ).fetchone()
+                    ops += 1
+                    latencies.append(time.monotonic() - started)
+                except sqlite3.OperationalError:
+                    locked += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                totals['ops'] += ops
+                totals['locked'] += locked
+                totals['latencies'].extend(latencies)
+
+        threads = [threading.Thread(target=client) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return totals['ops'], totals['locked'], totals['latencies']
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_management import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued webhook events to WEBHOOK_URL in batches. Runs until "
+        "interrupted unless --once is given; start one or more as workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Deliver what is due now and exit",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when no events are due (default: 1)",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.WEBHOOK_URL:
+            raise CommandError("WEBHOOK_URL is not set.")
+
+        dispatcher = outbox.Dispatcher()
+        try:
+            while True:
+                delivered, failed = dispatcher.run_once()
+                if delivered or failed:
+                    self.stdout.write(f"Delivered {delivered} events, {failed} failed")
+                if options['once']:
+                    break
+                if not delivered and not failed:
+                    outbox.purge_delivered(settings.WEBHOOK_RETENTION_DAYS)
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            dispatcher.close()
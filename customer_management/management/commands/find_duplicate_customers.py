@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from customer_management.dedupe import (
+    DEFAULT_MAX_BLOCK_SIZE, DEFAULT_MIN_SCORE, DEFAULT_WINDOW, find_duplicates,
+)
+
+
+class Command(BaseCommand):
+    help = "Find likely duplicate customers and queue them for review in the admin."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-score',
+            type=float,
+            default=DEFAULT_MIN_SCORE,
+            help=f"Lowest similarity score to record (default: {DEFAULT_MIN_SCORE})",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help="Scoring processes; 1 scores in-process (default: one per CPU)",
+        )
+        parser.add_argument(
+            '--max-block-size',
+            type=int,
+            default=DEFAULT_MAX_BLOCK_SIZE,
+            help=f"Compare larger blocks by name window only (default: {DEFAULT_MAX_BLOCK_SIZE})",
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=DEFAULT_WINDOW,
+            help=f"Neighbours compared within oversized blocks (default: {DEFAULT_WINDOW})",
+        )
+
+    def handle(self, *args, **options):
+        found = find_duplicates(
+            min_score=options['min_score'],
+            workers=options['workers'],
+            max_block_size=options['max_block_size'],
+            window=options['window'],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Found {found} candidate duplicate pairs"))
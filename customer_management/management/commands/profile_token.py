@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from customer360 import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed token for the X-Profile header. Requests carrying it "
+        "are profiled; see the captures at /admin/profiles/."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.make_token())
+        self.stderr.write(
+            f"Valid for {settings.PROFILE_TOKEN_MAX_AGE} seconds, e.g.\n"
+            f"  curl -H '{profiling.HEADER}: <token>' https://.../customers/42/"
+        )
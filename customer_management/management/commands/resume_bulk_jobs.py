@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from customer_management.bulk import run_job
+from customer_management.models import BulkActionJob
+
+
+class Command(BaseCommand):
+    help = "Run queued, failed or stalled chunked bulk action jobs to completion."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help="Only run the job with this id")
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=10,
+            help="Treat running jobs without progress for this long as stalled (default: 10)",
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        jobs = BulkActionJob.objects.filter(status__in=['queued', 'failed']) | \
+            BulkActionJob.objects.filter(status='running', updated_at__lt=stale_before)
+        if options['job']:
+            jobs = jobs.filter(pk=options['job'])
+
+        for job in jobs.order_by('created_at'):
+            self.stdout.write(f"Resuming job {job.pk}: {job.description} ({job.processed}/{job.total})")
+            run_job(job)
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(f"Job {job.pk} {job.status}: {job.processed} rows updated"))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from customer_management import slowlog
+
+
+class Command(BaseCommand):
+    help = "List the slowest query fingerprints recorded by the slow-query log."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--order',
+            choices=['total', 'max', 'count'],
+            default='total',
+            help="Rank by total time, slowest execution or count (default: total)",
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help="Number of fingerprints to show (default: 10)",
+        )
+        parser.add_argument(
+            '--plans',
+            action='store_true',
+            help="Also print the call site, example and EXPLAIN plan",
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help="Delete all recorded slow queries and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted = slowlog.reset()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} slow query fingerprints."))
+            return
+
+        queries = slowlog.top_queries(options['order'], options['limit'])
+        if not queries:
+            self.stdout.write("No slow queries recorded.")
+            return
+        for rank, query in enumerate(queries, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{rank}. {query.count}x, total {query.total_ms:.0f} ms, "
+                f"mean {query.mean_ms:.1f} ms, max {query.max_ms:.1f} ms ({query.alias})"
+            ))
+            self.stdout.write(f"   {query.normalized_sql}")
+            if options['plans']:
+                self.stdout.write(f"   Call site: {query.call_site or '-'}")
+                self.stdout.write(f"   Example: {query.example_sql}")
+                if query.example_params:
+                    self.stdout.write(f"   Params: {query.example_params}")
+                for line in (query.plan or 'No plan captured').splitlines():
+                    self.stdout.write(f"   | {line}")
+            self.stdout.write("")
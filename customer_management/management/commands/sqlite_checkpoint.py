@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint the WAL of every SQLite database so the -wal file doesn't "
+        "keep growing. Run from cron, or with --interval as a sidecar process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            default='TRUNCATE',
+            help="SQLite checkpoint mode (default: TRUNCATE)",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help="Repeat every N seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        aliases = [
+            alias for alias in settings.DATABASES
+            if connections[alias].vendor == 'sqlite' and alias not in settings.DATABASE_REPLICAS
+        ]
+        while True:
+            for alias in aliases:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(f"PRAGMA wal_checkpoint({options['mode']})")
+                    busy, log_frames, checkpointed = cursor.fetchone()
+                style = self.style.WARNING if busy else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{alias}: {checkpointed}/{log_frames} WAL frames checkpointed"
+                    f"{' (blocked by active readers)' if busy else ''}"
+                ))
+            if not options['interval']:
+                break
+            connections.close_all()
+            time.sleep(options['interval'])
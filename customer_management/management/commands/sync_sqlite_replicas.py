@@ -0,0 +1,48 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto each SQLite replica. "
+        "Stands in for replication when testing DATABASE_REPLICA_URLS locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help="Keep syncing every N seconds, simulating replication lag (default: once)",
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if 'sqlite3' not in primary['ENGINE']:
+            raise CommandError("The primary database is not SQLite")
+        replicas = [
+            settings.DATABASES[alias]['NAME']
+            for alias in settings.DATABASE_REPLICAS
+            if 'sqlite3' in settings.DATABASES[alias]['ENGINE']
+        ]
+        if not replicas:
+            raise CommandError("No SQLite replicas configured in DATABASE_REPLICA_URLS")
+
+        while True:
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for name in replicas:
+                    target = sqlite3.connect(name)
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f"Synced {len(replicas)} replica(s) from {primary['NAME']}")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
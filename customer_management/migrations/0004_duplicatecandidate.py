@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0003_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Similarity score between 0 and 1')),
+                ('matched_on', models.JSONField(default=list, help_text='Blocking keys the pair shares: phone, email and/or name')),
+                ('status', models.CharField(choices=[('pending', 'Pending Review'), ('merged', 'Merged'), ('dismissed', 'Not a Duplicate')], default='pending', max_length=10)),
+                ('reviewed_by', models.CharField(blank=True, max_length=150)),
+                ('reviewed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('customer_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customer_management.customer')),
+                ('customer_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='customer_management.customer')),
+            ],
+            options={
+                'verbose_name': 'Duplicate Candidate',
+                'verbose_name_plural': 'Duplicate Candidates',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='duplicate_review_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('customer_a', 'customer_b'), name='unique_duplicate_pair'),
+        ),
+    ]
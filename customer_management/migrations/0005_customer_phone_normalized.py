@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0004_duplicatecandidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Phone number in E.164 form, derived from phone on save', max_length=16),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0005_customer_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyIdMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('customer', 'Customer'), ('interaction', 'Interaction')], max_length=20)),
+                ('legacy_id', models.BigIntegerField()),
+                ('new_id', models.BigIntegerField()),
+                ('created', models.BooleanField(default=True, help_text='False when the legacy row matched an existing record instead of being copied')),
+                ('migrated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Legacy ID Mapping',
+                'verbose_name_plural': 'Legacy ID Mappings',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='legacyidmap',
+            constraint=models.UniqueConstraint(fields=('source', 'legacy_id'), name='unique_legacy_id'),
+        ),
+    ]
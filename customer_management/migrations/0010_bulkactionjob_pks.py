@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:41
+
+import pickle
+
+from django.db import migrations, models
+
+
+def store_selected_pks(apps, schema_editor):
+    """
+    Record the selection of unfinished jobs as primary keys.
+
+    This is the last time the pickled queries are read. A query that no
+    longer unpickles fails its job, which then has to be submitted again.
+    """
+    BulkActionJob = apps.get_model('customer_management', 'BulkActionJob')
+    for job in BulkActionJob.objects.exclude(status='completed'):
+        model = apps.get_model(job.model_label)
+        try:
+            queryset = model._base_manager.all()
+            queryset.query = pickle.loads(job.query)
+            job.pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        except Exception as e:
+            job.status = 'failed'
+            job.error = f"Selection could not be migrated, submit the action again: {e}"
+        job.save(update_fields=['pks', 'status', 'error'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0009_slowquery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='pks',
+            field=models.JSONField(default=list, help_text='Primary keys of the selected rows, ascending'),
+        ),
+        migrations.RunPython(store_selected_pks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkactionjob',
+            name='query',
+        ),
+    ]
@@ -1,9 +1,25 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator
 from django.urls import reverse
+from django.utils import timezone
 
+from .phone import to_e164
 
-class Customer(models.Model):
+
+class ChangeLoggedMixin:
+    """
+    Save inside a transaction, so the change log entry written by the
+    ``post_save`` receiver commits or rolls back together with the row.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
+class Customer(ChangeLoggedMixin, models.Model):
     """
     Customer model with enhanced validation and methods.
     """
@@ -25,6 +41,13 @@ class Customer(models.Model):
         max_length=17,
         help_text="Customer's phone number"
     )
+    phone_normalized = models.CharField(
+        max_length=16,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Phone number in E.164 form, derived from phone on save"
+    )
     address = models.CharField(
         max_length=200,
         help_text="Customer's address"
@@ -49,6 +72,19 @@ class Customer(models.Model):
     def get_absolute_url(self):
         return reverse('customer_management:customer_detail', kwargs={'pk': self.pk})
 
+    def save(self, *args, **kwargs):
+        self.phone_normalized = to_e164(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_normalized'}
+        super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        """Deactivate the customer instead of deleting their history."""
+        self.is_active = False
+        self._change_action = 'soft_delete'
+        self.save(update_fields=['is_active', 'updated_at'])
+
     @property
     def interaction_count(self):
         """Return the total number of interactions for this customer."""
@@ -57,4 +93,257 @@ class Customer(models.Model):
     @property
     def last_interaction(self):
         """Return the most recent interaction for this customer."""
-        return self.interactions.order_by('-interaction_date').first()
\ No newline at end of file
+        return self.interactions.order_by('-interaction_date').first()
+
+
+class BulkActionJob(models.Model):
+    """
+    Admin bulk action executed in primary-key ordered chunks.
+
+    The primary keys of the selection are stored in ascending order so the
+    job can be resumed from ``last_pk`` after a restart.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    model_label = models.CharField(
+        max_length=100,
+        help_text="Model the action applies to, e.g. 'interactions.Interaction'"
+    )
+    description = models.CharField(max_length=200)
+    values = models.JSONField(help_text="Field values applied to every selected row")
+    pks = models.JSONField(default=list, help_text="Primary keys of the selected rows, ascending")
+    chunk_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    last_pk = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Highest primary key already processed"
+    )
+    error = models.TextField(blank=True)
+    created_by = models.CharField(max_length=150, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Bulk Action Job'
+        verbose_name_plural = 'Bulk Action Jobs'
+
+    def __str__(self):
+        return f"{self.description} ({self.get_status_display()})"
+
+    def get_absolute_url(self):
+        return reverse('customer_management:bulk_job_progress', kwargs={'pk': self.pk})
+
+    @property
+    def percent_complete(self):
+        """Return progress as an integer percentage."""
+        if self.status == 'completed':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.processed * 100 / self.total))
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Pair of customers the dedupe job thinks may be the same person.
+
+    Pairs are stored with ``customer_a_id < customer_b_id`` so each pair
+    has exactly one row, and re-running the job keeps review decisions.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending Review'),
+        ('merged', 'Merged'),
+        ('dismissed', 'Not a Duplicate'),
+    ]
+
+    customer_a = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    customer_b = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text="Similarity score between 0 and 1")
+    matched_on = models.JSONField(
+        default=list,
+        help_text="Blocking keys the pair shares: phone, email and/or name"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    reviewed_by = models.CharField(max_length=150, blank=True)
+    reviewed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-score']
+        verbose_name = 'Duplicate Candidate'
+        verbose_name_plural = 'Duplicate Candidates'
+        constraints = [
+            models.UniqueConstraint(fields=['customer_a', 'customer_b'], name='unique_duplicate_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-score'], name='duplicate_review_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_a_id} ~ {self.customer_b_id} ({self.score:.2f})"
+
+
+class LegacyIdMap(models.Model):
+    """
+    Row copied from the legacy ``customer360_*`` tables and its new id.
+
+    Written in the same transaction as the copied rows, so the highest
+    ``legacy_id`` per source is where an interrupted migration resumes.
+    """
+    SOURCE_CHOICES = [
+        ('customer', 'Customer'),
+        ('interaction', 'Interaction'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    legacy_id = models.BigIntegerField()
+    new_id = models.BigIntegerField()
+    created = models.BooleanField(
+        default=True,
+        help_text="False when the legacy row matched an existing record instead of being copied"
+    )
+    migrated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Legacy ID Mapping'
+        verbose_name_plural = 'Legacy ID Mappings'
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'legacy_id'], name='unique_legacy_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.legacy_id} -> {self.new_id}"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Append-only record of a change to a customer or interaction.
+
+    ``sequence`` only grows, and entries are written in the transaction
+    that made the change, so downstream consumers can sync by asking for
+    everything after the last sequence they saw.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+        ('soft_delete', 'Soft delete'),
+    ]
+
+    sequence = models.BigAutoField(primary_key=True)
+    model = models.CharField(
+        max_length=100,
+        help_text="Changed model, e.g. 'customer_management.customer'"
+    )
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=15, choices=ACTION_CHOICES)
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text="Field values after the change; empty for deletes"
+    )
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['sequence']
+        indexes = [
+            models.Index(fields=['model', 'sequence'], name='changelog_model_seq_idx'),
+        ]
+        verbose_name = 'Change Log Entry'
+        verbose_name_plural = 'Change Log Entries'
+
+    def __str__(self):
+        return f"#{self.sequence} {self.action} {self.model} {self.object_id}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Webhook event waiting for delivery.
+
+    Written in the same transaction as the change it describes and
+    delivered afterwards by ``manage.py dispatch_outbox``, so a slow or
+    unreachable receiver never holds up a request.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('delivered', 'Delivered'),
+        ('dead', 'Dead letter'),
+    ]
+
+    event_type = models.CharField(max_length=50, help_text="e.g. 'interaction.created'")
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Not sent before this time; also the lease while a dispatcher holds it"
+    )
+    claimed_by = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Token of the dispatcher that last claimed the event"
+    )
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at', 'id'], name='outbox_due_idx'),
+        ]
+        verbose_name = 'Outbox Event'
+        verbose_name_plural = 'Outbox Events'
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.get_status_display()})"
+
+
+class SlowQuery(models.Model):
+    """
+    Slow SQL statements aggregated by fingerprint.
+
+    Filled by ``customer_management.slowlog`` from every statement slower
+    than ``SLOW_QUERY_THRESHOLD_MS``. The example, call site and plan are
+    those of the slowest execution seen.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField(help_text="Statement with literals and IN lists collapsed")
+    vendor = models.CharField(max_length=20)
+    alias = models.CharField(max_length=50)
+    count = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    example_sql = models.TextField()
+    example_params = models.TextField(blank=True)
+    call_site = models.CharField(max_length=255, blank=True, help_text="View code or template that ran the slowest execution")
+    plan = models.TextField(blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name = 'Slow Query'
+        verbose_name_plural = 'Slow Queries'
+
+    def __str__(self):
+        return f"{self.normalized_sql[:80]} ({self.count}x)"
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0
@@ -0,0 +1,234 @@
+"""
+Transactional outbox for webhook notifications.
+
+:func:`publish` turns change log entries into :class:`OutboxEvent` rows in
+the transaction that made the change, so an event exists exactly when
+the change committed. :class:`Dispatcher` later claims due events, POSTs
+them to ``WEBHOOK_URL`` in batches of ``{"events": [...]}`` and records
+the outcome:
+
+* up to ``WEBHOOK_CONCURRENCY`` batches are in flight at once, each
+  sender thread reusing one keep-alive connection;
+* a failed batch is retried with exponential backoff and jitter;
+* events that failed ``WEBHOOK_MAX_ATTEMPTS`` times, or that the
+  receiver rejected with a 4xx, become dead letters that can be requeued
+  from the admin.
+
+Delivery is at least once and batches may arrive out of order; receivers
+should de-duplicate on the event ``id`` and order by ``sequence``.
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# Change log actions that are published, per model.
+PUBLISHED_ACTIONS = {
+    'interactions.interaction': {'create': 'interaction.created'},
+    'customer_management.customer': {
+        'create': 'customer.created',
+        'update': 'customer.updated',
+        'soft_delete': 'customer.deactivated',
+        'delete': 'customer.deleted',
+    },
+}
+
+# Receiver errors worth retrying; any other 4xx won't succeed later.
+RETRYABLE_CLIENT_ERRORS = {408, 409, 425, 429}
+
+
+def publish(entries):
+    """Queue webhook events for ``entries`` (ChangeLogEntry rows)."""
+    if not settings.WEBHOOK_URL:
+        return
+    events = [
+        OutboxEvent(
+            event_type=event_type,
+            payload={
+                'type': event_type,
+                'sequence': entry.sequence,
+                'object_id': entry.object_id,
+                'data': entry.data,
+                'occurred_at': entry.changed_at,
+            },
+        )
+        for entry in entries
+        for event_type in [PUBLISHED_ACTIONS.get(entry.model, {}).get(entry.action)]
+        if event_type
+    ]
+    OutboxEvent.objects.bulk_create(events)
+
+
+def backoff(attempts):
+    """Seconds to wait after the ``attempts``-th failure, with jitter."""
+    delay = min(settings.WEBHOOK_BACKOFF_MAX, settings.WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class DeliveryError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class Dispatcher:
+    """
+    Deliver due outbox events; one instance per worker process.
+
+    Only the calling thread touches the database. The thread pool does
+    nothing but HTTP, which keeps database connections out of the sender
+    threads.
+    """
+
+    def __init__(self, url=None, batch_size=None, concurrency=None, timeout=None, secret=None):
+        self.url = url or settings.WEBHOOK_URL
+        self.batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+        self.concurrency = concurrency or settings.WEBHOOK_CONCURRENCY
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self.secret = settings.WEBHOOK_SECRET if secret is None else secret
+        self.token = uuid.uuid4().hex
+        self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='outbox')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    # Claiming -----------------------------------------------------------
+
+    def claim(self):
+        """
+        Lease up to ``concurrency`` batches of due events to this dispatcher.
+
+        Returns a list of event lists. The lease (``next_attempt_at`` moved
+        past the HTTP timeout) keeps other dispatchers off the events, and
+        lets them retry the events if this process dies mid-delivery.
+        """
+        now = timezone.now()
+        due = OutboxEvent.objects.filter(status='pending', next_attempt_at__lte=now).order_by('id')
+        with transaction.atomic():
+            ids = list(due.values_list('id', flat=True)[:self.batch_size * self.concurrency])
+            # The status/time conditions are re-checked by the UPDATE, so
+            # dispatchers racing for the same ids each get a disjoint share.
+            due.filter(id__in=ids).update(
+                claimed_by=self.token,
+                next_attempt_at=now + timedelta(seconds=self.timeout * 3),
+            )
+        events = list(OutboxEvent.objects.filter(id__in=ids, claimed_by=self.token, status='pending').order_by('id'))
+        return [events[i:i + self.batch_size] for i in range(0, len(events), self.batch_size)]
+
+    # Sending ------------------------------------------------------------
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            parts = urlsplit(self.url)
+            connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            connection = connection_class(parts.hostname, parts.port, timeout=self.timeout)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _path(self):
+        parts = urlsplit(self.url)
+        return (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+    def send(self, body):
+        """POST one batch over this thread's keep-alive connection."""
+        headers = {'Content-Type': 'application/json'}
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+            headers['X-Webhook-Signature'] = f'sha256={signature}'
+        connection = self._connection()
+        try:
+            connection.request('POST', self._path(), body=body, headers=headers)
+            response = connection.getresponse()
+            # Read the body so the connection can be reused.
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            raise DeliveryError(f'{type(e).__name__}: {e}')
+        if response.will_close:
+            connection.close()
+        if response.status >= 300:
+            retryable = response.status >= 500 or response.status in RETRYABLE_CLIENT_ERRORS
+            raise DeliveryError(f'HTTP {response.status} {response.reason}', retryable)
+
+    def _body(self, batch):
+        events = [{'id': event.pk, **event.payload} for event in batch]
+        return json.dumps({'events': events}, cls=DjangoJSONEncoder).encode()
+
+    # Recording ----------------------------------------------------------
+
+    def _delivered(self, batch):
+        OutboxEvent.objects.filter(id__in=[e.pk for e in batch], claimed_by=self.token).update(
+            status='delivered', delivered_at=timezone.now(), last_error='',
+        )
+
+    def _failed(self, batch, error):
+        now = timezone.now()
+        for event in batch:
+            event.attempts += 1
+            event.last_error = str(error)
+            if not error.retryable or event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+                event.status = 'dead'
+            else:
+                event.next_attempt_at = now + timedelta(seconds=backoff(event.attempts))
+        OutboxEvent.objects.bulk_update(batch, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+        logger.warning("Webhook batch of %s events failed: %s", len(batch), error)
+
+    def run_once(self):
+        """
+        Deliver one round of claimed batches.
+
+        Returns ``(delivered, failed)`` event counts.
+        """
+        batches = self.claim()
+        futures = [(batch, self._executor.submit(self.send, self._body(batch))) for batch in batches]
+        delivered = failed = 0
+        for batch, future in futures:
+            try:
+                future.result()
+            except DeliveryError as e:
+                self._failed(batch, e)
+                failed += len(batch)
+            else:
+                self._delivered(batch)
+                delivered += len(batch)
+        return delivered, failed
+
+    def close(self):
+        self._executor.shutdown()
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+def requeue(queryset):
+    """Send dead-lettered events again from scratch."""
+    return queryset.filter(status='dead').update(
+        status='pending', attempts=0, last_error='', next_attempt_at=timezone.now(),
+    )
+
+
+def purge_delivered(days):
+    """Delete events delivered more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboxEvent.objects.filter(status='delivered', delivered_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,43 @@
+"""
+Phone number normalization to E.164 (``+<country code><number>``).
+
+Numbers are typed in many shapes ("(555) 123-4567", "00 44 20 ...",
+"+1-555-..."). Storing one canonical form lets caller-ID and duplicate
+detection use an exact, indexed match instead of ``icontains``.
+"""
+import re
+
+from django.conf import settings
+
+MIN_DIGITS = 8
+MAX_DIGITS = 15
+
+
+def to_e164(raw, country_code=None):
+    """
+    Return ``raw`` as an E.164 string, or '' if it can't be normalized.
+
+    Numbers without an international prefix are assumed to belong to
+    ``country_code`` (default ``PHONE_DEFAULT_COUNTRY_CODE``); a leading
+    trunk ``0`` is dropped first.
+    """
+    raw = (raw or '').strip()
+    digits = re.sub(r'\D', '', raw)
+    if not digits:
+        return ''
+    country_code = country_code or settings.PHONE_DEFAULT_COUNTRY_CODE
+
+    if raw.startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    elif digits.startswith('0'):
+        number = country_code + digits.lstrip('0')
+    elif digits.startswith(country_code) and len(digits) > 10:
+        number = digits
+    else:
+        number = country_code + digits
+
+    if not MIN_DIGITS <= len(number) <= MAX_DIGITS:
+        return ''
+    return f'+{number}'
@@ -1,27 +1,54 @@
 from rest_framework import serializers
+
+from interactions.snapshots import get_snapshot
 from .models import Customer
 
 
+class CustomerSnapshotSerializer(serializers.Serializer):
+    """
+    Read-only representation of the precomputed Customer 360 profile.
+    """
+    total_interactions = serializers.IntegerField()
+    inbound_count = serializers.IntegerField()
+    outbound_count = serializers.IntegerField()
+    inbound_ratio = serializers.FloatField()
+    pending_count = serializers.IntegerField()
+    follow_up_count = serializers.IntegerField()
+    channel_mix = serializers.DictField(child=serializers.IntegerField())
+    first_contact = serializers.DictField(child=serializers.CharField())
+    last_contact = serializers.DictField(child=serializers.CharField())
+    last_interaction_at = serializers.DateTimeField()
+    last_agent = serializers.CharField()
+
+
 class CustomerSerializer(serializers.ModelSerializer):
     """
     Serializer for Customer model with additional computed fields.
     """
-    interaction_count = serializers.ReadOnlyField()
+    interaction_count = serializers.SerializerMethodField()
     last_interaction_date = serializers.SerializerMethodField()
+    profile = serializers.SerializerMethodField()
     
     class Meta:
         model = Customer
         fields = [
             'id', 'name', 'email', 'phone', 'address', 'social_media',
             'created_at', 'updated_at', 'is_active',
-            'interaction_count', 'last_interaction_date'
+            'interaction_count', 'last_interaction_date', 'profile'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+    def get_interaction_count(self, obj):
+        """Get the interaction count from the profile snapshot."""
+        return get_snapshot(obj).total_interactions
+
     def get_last_interaction_date(self, obj):
-        """Get the date of the last interaction."""
-        last_interaction = obj.last_interaction
-        return last_interaction.interaction_date if last_interaction else None
+        """Get the date of the last interaction from the profile snapshot."""
+        return get_snapshot(obj).last_interaction_at
+
+    def get_profile(self, obj):
+        """Get the full precomputed profile."""
+        return CustomerSnapshotSerializer(get_snapshot(obj)).data
 
     def validate_email(self, value):
         """Validate email uniqueness."""
@@ -40,8 +67,12 @@ class CustomerListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for customer lists.
     """
-    interaction_count = serializers.ReadOnlyField()
+    interaction_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Customer
-        fields = ['id', 'name', 'email', 'phone', 'interaction_count', 'is_active']
\ No newline at end of file
+        fields = ['id', 'name', 'email', 'phone', 'interaction_count', 'is_active']
+
+    def get_interaction_count(self, obj):
+        """Get the interaction count from the profile snapshot."""
+        return get_snapshot(obj).total_interactions
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Custom signals and receivers for the customer_management app.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import callerid, changelog
+from .cache import customers
+from .models import Customer
+
+
+# Sent after rows are changed with QuerySet.update(), which bypasses
+# pre_save/post_save. Receivers get ``sender`` (the model class), ``pks``
+# (list of primary keys touched) and ``values`` (the field/value mapping).
+# It is sent inside the transaction that performed the update, once per
+# chunk, so receivers should do set-based work rather than per-row work.
+# When a foreign key was moved, ``previous_customer_ids`` lists the
+# customers the rows were moved away from.
+bulk_updated = Signal()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_caller_id(sender, instance, **kwargs):
+    callerid.invalidate_customers([instance.pk])
+    if instance.phone_normalized:
+        callerid.invalidate_number(instance.phone_normalized)
+
+
+@receiver(bulk_updated, sender=Customer)
+def invalidate_caller_id_bulk(sender, pks, **kwargs):
+    callerid.invalidate_customers(pks)
+    # Cached lookups of the rows' current numbers may not include them yet.
+    callerid.invalidate_numbers(
+        Customer._base_manager.filter(pk__in=pks).exclude(phone_normalized='')
+        .values_list('phone_normalized', flat=True)
+    )
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_cached_customer(sender, instance, **kwargs):
+    customers.invalidate([instance.pk])
+
+
+@receiver(bulk_updated, sender=Customer)
+def invalidate_cached_customers_bulk(sender, pks, **kwargs):
+    customers.invalidate(pks)
+
+
+@receiver(post_save, sender=Customer)
+def log_customer_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    action = instance.__dict__.pop('_change_action', None) or ('create' if created else 'update')
+    changelog.record(instance, action)
+
+
+@receiver(post_delete, sender=Customer)
+def log_customer_delete(sender, instance, **kwargs):
+    changelog.record(instance, 'delete')
+
+
+@receiver(bulk_updated, sender=Customer)
+def log_customer_bulk_update(sender, pks, values, **kwargs):
+    # The admin "deactivate" action is a bulk soft delete.
+    changelog.record_bulk(sender, pks, 'soft_delete' if values == {'is_active': False} else 'update')
@@ -0,0 +1,292 @@
+"""
+Slow-query log with captured query plans.
+
+An execute wrapper on every database connection times each statement.
+Only queries and data changes (not transaction control) slower than
+``SLOW_QUERY_THRESHOLD_MS`` go further: the request thread notes where
+they came from (the template being rendered, else the innermost project
+frame) and puts them on a queue. A background thread then:
+
+* normalizes the SQL into a fingerprint, so one ORM query with different
+  values or ``IN`` list lengths is counted as one;
+* adds the execution to the :class:`SlowQuery` row of that fingerprint;
+* for a new fingerprint, or a new slowest execution, runs ``EXPLAIN``
+  (``EXPLAIN QUERY PLAN`` on SQLite) on its own connection and keeps the
+  plan with the statement and call site.
+
+``SLOW_QUERY_LOG_ASYNC = False`` does that work inline instead, for
+scripts and tests (:func:`guarded` keeps it from breaking the caller's
+transaction). See the top offenders with ``manage.py slow_queries`` or at
+``/slow-queries/``.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import django.db
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.template.base import Template
+from django.utils import timezone
+
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+THIS_FILE = os.path.realpath(__file__)
+DJANGO_DB_DIR = os.path.realpath(os.path.dirname(django.db.__file__))
+LIBRARY_DIRS = tuple({
+    path for path in sys.path if 'site-packages' in path or 'dist-packages' in path
+})
+EXPLAINABLE = ('SELECT', 'WITH')
+# Transaction control (BEGIN, SAVEPOINT, COMMIT, ...) is never recorded:
+# logging it inline would run the log's statements before the transaction
+# it opens is marked active.
+RECORDED = EXPLAINABLE + ('INSERT', 'UPDATE', 'DELETE')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+def normalize(sql):
+    """SQL with literals replaced by ``?`` and ``IN`` lists collapsed."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def _is_project_file(filename):
+    filename = os.path.realpath(filename) if os.path.isabs(filename) else ''
+    return filename.startswith(PROJECT_DIR) and not filename.startswith(LIBRARY_DIRS) and filename != THIS_FILE
+
+
+def _is_db_layer(frame):
+    return frame is not None and os.path.realpath(frame.f_code.co_filename).startswith(DJANGO_DB_DIR)
+
+
+def call_site(frame=None):
+    """
+    Describe where the current statement came from.
+
+    Queries run by a template (e.g. a lazy queryset iterated in a loop) are
+    attributed to the template; others to the innermost project frame.
+    """
+    frame = frame or sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code is Template.render.__code__:
+            name = frame.f_locals['self'].name
+            if name:
+                return f'template {name}'
+        # Skip other execute wrappers: project code called by django.db.
+        if _is_project_file(code.co_filename) and not _is_db_layer(frame.f_back):
+            path = os.path.relpath(code.co_filename, PROJECT_DIR)
+            return f'{path}:{frame.f_lineno} in {code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+def explain(alias, sql, params):
+    """Query plan of a SELECT as text, or '' if it can't be explained."""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return ''
+    connection = connections[alias]
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with guarded(alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        logger.warning("Could not explain slow query: %s", e)
+        return ''
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail): indent each step under its parent.
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return '\n'.join(lines)
+    return '\n'.join(' | '.join(str(value) for value in row) for row in rows)
+
+
+def store(alias, vendor, sql, params, ms, site):
+    """Add one slow execution to its :class:`SlowQuery` row."""
+    normalized = normalize(sql)
+    key = fingerprint(normalized)
+    using = router.db_for_write(SlowQuery)
+    now = timezone.now()
+    queries = SlowQuery.objects.using(using)
+
+    def add_execution():
+        return queries.filter(fingerprint=key).update(
+            count=F('count') + 1, total_ms=F('total_ms') + ms, max_ms=Greatest('max_ms', ms), last_seen=now,
+        )
+
+    if not add_execution():
+        # ON CONFLICT DO NOTHING: if another process created the row first
+        # this is a no-op rather than an IntegrityError, which on PostgreSQL
+        # would abort the transaction the query ran in.
+        queries.bulk_create([SlowQuery(
+            fingerprint=key, normalized_sql=normalized, vendor=vendor, alias=alias,
+            count=0, total_ms=0, max_ms=0, example_sql=sql, last_seen=now,
+        )], ignore_conflicts=True)
+        add_execution()
+    if queries.filter(fingerprint=key, max_ms=ms).exists():
+        # A new fingerprint or a new slowest execution.
+        queries.filter(fingerprint=key, max_ms=ms).update(
+            example_sql=sql,
+            example_params=repr(params)[:2000],
+            call_site=site[:255],
+            plan=explain(alias, sql, params),
+        )
+
+
+def guarded(alias):
+    """
+    Savepoint for the log's own statements when ``alias`` is in a transaction.
+
+    Inline logging runs inside the caller's transaction; on PostgreSQL a
+    failed statement there would abort it. SQLite transactions survive
+    failed statements, and SQLite refuses savepoints while the caller's
+    statement is still being read, so no savepoint is used there.
+    """
+    connection = connections[alias]
+    if connection.in_atomic_block and connection.vendor != 'sqlite':
+        return transaction.atomic(using=alias)
+    return nullcontext()
+
+
+@contextmanager
+def paused():
+    """Don't record statements run by this thread inside the block."""
+    previous = getattr(_local, 'ignore', False)
+    _local.ignore = True
+    try:
+        yield
+    finally:
+        _local.ignore = previous
+
+
+def _process(item):
+    with paused():
+        try:
+            with guarded(router.db_for_write(SlowQuery)):
+                store(*item)
+        except Exception:
+            logger.exception("Could not record slow query")
+
+
+def reset():
+    """Forget all recorded slow queries."""
+    with paused():
+        deleted, _ = SlowQuery.objects.all().delete()
+    return deleted
+
+
+class Writer:
+    """Background thread storing queued slow queries; restarted after a fork."""
+
+    def __init__(self):
+        self.queue = None
+        self.dropped = 0
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(settings.SLOW_QUERY_QUEUE_SIZE)
+            threading.Thread(target=self._run, args=(self.queue,), daemon=True, name='slow-query-log').start()
+            self._pid = os.getpid()
+
+    def _run(self, items):
+        while True:
+            item = items.get()
+            try:
+                if item is None:
+                    break
+                _process(item)
+            finally:
+                items.task_done()
+        connections.close_all()
+
+    def put(self, item):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # Never hold up a request to log it.
+            self.dropped += 1
+
+    def stop(self):
+        """Store what is queued and stop the thread."""
+        with self._lock:
+            if self._pid == os.getpid():
+                self.queue.put(None)
+                self.queue.join()
+            self._pid = None
+
+
+writer = Writer()
+
+
+class SlowQueryRecorder:
+    """``connection.execute_wrappers`` entry passing slow statements on."""
+
+    def __init__(self, connection):
+        self.alias = connection.alias
+        self.vendor = connection.vendor
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        ms = (time.perf_counter() - start) * 1000
+        if (
+            ms >= settings.SLOW_QUERY_THRESHOLD_MS
+            and not getattr(_local, 'ignore', False)
+            and sql.lstrip()[:6].upper().startswith(RECORDED)
+        ):
+            item = (self.alias, self.vendor, sql, None if many else params, ms, call_site())
+            if settings.SLOW_QUERY_LOG_ASYNC:
+                writer.put(item)
+            else:
+                _process(item)
+        return result
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver installing :class:`SlowQueryRecorder`."""
+    if not any(isinstance(wrapper, SlowQueryRecorder) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryRecorder(connection))
+
+
+def top_queries(order='total', limit=20):
+    """The worst fingerprints by total time, slowest execution or count."""
+    field = {'total': '-total_ms', 'max': '-max_ms', 'count': '-count'}[order]
+    return SlowQuery.objects.order_by(field, 'id')[:limit]
@@ -1,9 +1,46 @@
-from django.test import TestCase, Client
+import json
+import logging
+import os
+import pstats
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from .models import Customer
+from django.db import IntegrityError, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.test import RequestFactory
+from customer360.batch import BatchJob, BatchRunner, Checkpoint, chunk_bounds
+from customer360.db.pool import ConnectionPool, PoolTimeout
+from customer360.db.sqlite3.base import DatabaseWrapper as TunedSQLiteWrapper
+from customer360.db_router import ReplicaRouter, replica_reads, use_primary, use_replicas
+from customer360 import identity, metrics, objcache, profiling
+from customer360.log import JSONFormatter, QueueListenerHandler, SamplingFilter
+from customer360.middleware import ReplicaPinMiddleware
+from .bulk import run_job, submit_bulk_update
+from .cache import customers
+from . import callerid, changelog, outbox, slowlog
+from .dedupe import blocking_keys, candidate_pairs, find_duplicates, merge_customers, score_pairs, soundex
+from .models import (
+    BulkActionJob, ChangeLogEntry, Customer, DuplicateCandidate, LegacyIdMap, OutboxEvent, SlowQuery,
+)
 from .forms import CustomerForm
+from .phone import to_e164
+from .signals import bulk_updated
 
 
 class CustomerModelTest(TestCase):
@@ -192,4 +229,1268 @@ class CustomerViewTest(TestCase):
         data = response.json()
         self.assertIn('customers', data)
         self.assertEqual(len(data['customers']), 1)
-        self.assertEqual(data['customers'][0]['name'], 'John Doe')
\ No newline at end of file
+        self.assertEqual(data['customers'][0]['name'], 'John Doe')
+
+
+@override_settings(BULK_ACTION_BACKGROUND=False)
+class BulkActionJobTest(TestCase):
+    """Test cases for chunked admin bulk actions."""
+
+    def setUp(self):
+        self.customers = [
+            Customer.objects.create(
+                name=f'Customer {i}',
+                email=f'customer{i}@example.com',
+                phone='+1234567890',
+                address='123 Main St'
+            )
+            for i in range(5)
+        ]
+
+    def test_updates_in_chunks(self):
+        """Test that every row is updated and hooks fire once per chunk."""
+        chunks = []
+
+        def receiver(sender, pks, values, **kwargs):
+            chunks.append(pks)
+
+        bulk_updated.connect(receiver, sender=Customer)
+        try:
+            job = submit_bulk_update(
+                Customer.objects.all(), {'is_active': False}, 'Deactivate', chunk_size=2
+            )
+        finally:
+            bulk_updated.disconnect(receiver, sender=Customer)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.processed, 5)
+        self.assertEqual([len(pks) for pks in chunks], [2, 2, 1])
+        self.assertFalse(Customer.objects.filter(is_active=True).exists())
+
+    def test_resume_from_cursor(self):
+        """Test that a resumed job skips rows before its cursor."""
+        job = BulkActionJob.objects.create(
+            model_label='customer_management.Customer',
+            description='Deactivate',
+            values={'is_active': False},
+            pks=[c.pk for c in self.customers],
+            chunk_size=2,
+            total=5,
+            status='failed',
+            last_pk=self.customers[2].pk,
+        )
+
+        run_job(job)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(
+            set(Customer.objects.filter(is_active=False).values_list('pk', flat=True)),
+            {c.pk for c in self.customers[3:]}
+        )
+
+    def test_selection_is_fixed_when_submitted(self):
+        """Test that a queued job updates the rows selected then, not rows matching later."""
+        with self.settings(BULK_ACTION_BACKGROUND=True):
+            with self.captureOnCommitCallbacks(execute=False):
+                job = submit_bulk_update(
+                    Customer.objects.filter(name__startswith='Customer'), {'is_active': False}, 'Deactivate',
+                    chunk_size=2,
+                )
+        self.assertEqual(job.pks, [c.pk for c in self.customers])
+        late = Customer.objects.create(
+            name='Customer 5', email='customer5@example.com', phone='+1234567890', address='123 Main St'
+        )
+
+        run_job(BulkActionJob.objects.get(pk=job.pk))
+
+        self.assertEqual(Customer.objects.filter(is_active=False).count(), 5)
+        late.refresh_from_db()
+        self.assertTrue(late.is_active)
+
+    def test_admin_action_redirects_to_progress(self):
+        """Test that large admin selections become a job with a progress page."""
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin_user)
+        url = reverse('admin:customer_management_customer_changelist')
+        with self.settings(BULK_ACTION_CHUNK_SIZE=2, BULK_ACTION_BACKGROUND=True):
+            with self.captureOnCommitCallbacks(execute=False):
+                response = self.client.post(url, {
+                    'action': 'deactivate_customers',
+                    '_selected_action': [c.pk for c in self.customers],
+                })
+        job = BulkActionJob.objects.get()
+        self.assertRedirects(response, job.get_absolute_url())
+        self.assertEqual(job.total, 5)
+
+        response = self.client.get(job.get_absolute_url(), {'format': 'json'})
+        self.assertEqual(response.json()['status'], 'queued')
+
+
+class DuplicateDetectionTest(TestCase):
+    """Test cases for the dedupe job and customer merge."""
+
+    def create_customer(self, name, email, phone):
+        return Customer.objects.create(name=name, email=email, phone=phone, address='1 Main St')
+
+    def setUp(self):
+        self.john = self.create_customer('John Smith', 'john.smith@example.com', '+15551234567')
+        self.jon = self.create_customer('Jon Smith', 'johnsmith@example.org', '5551234567')
+        self.jane = self.create_customer('Jane Miller', 'jane@example.com', '+15559876543')
+
+    def test_blocking_keys(self):
+        self.assertEqual(soundex('Robert'), 'R163')
+        self.assertEqual(soundex('Rupert'), 'R163')
+        self.assertEqual(
+            blocking_keys('John Smith', 'John.Smith+crm@example.com', '+15551234567'),
+            [('phone', '+15551234567'), ('email', 'johnsmith'), ('name', 'J500-S530')],
+        )
+
+    def test_only_blocked_pairs_are_compared(self):
+        records = {c.pk: (c.name, c.email, c.phone_normalized) for c in Customer.objects.all()}
+        pairs = candidate_pairs(records)
+        self.assertEqual(list(pairs), [(self.john.pk, self.jon.pk)])
+        self.assertEqual(pairs[(self.john.pk, self.jon.pk)], {'phone', 'email', 'name'})
+
+    def test_oversized_blocks_use_window(self):
+        records = {pk: (f'Smith {pk:03d}', f'{pk}@example.com', '') for pk in range(1, 51)}
+        pairs = candidate_pairs(records, max_block_size=10, window=2)
+        self.assertEqual(len(pairs), 49 + 48)
+
+    def test_find_duplicates_keeps_review_decisions(self):
+        self.assertEqual(find_duplicates(workers=2), 1)
+        pair = DuplicateCandidate.objects.get()
+        self.assertEqual((pair.customer_a, pair.customer_b), (self.john, self.jon))
+        pair.status = 'dismissed'
+        pair.save()
+        find_duplicates(workers=1)
+        self.assertEqual(DuplicateCandidate.objects.get().status, 'dismissed')
+
+    def test_merge_moves_interactions_in_one_update(self):
+        from interactions.models import Interaction
+        for customer in (self.john, self.jon, self.jon):
+            Interaction.objects.create(customer=customer, channel='email', direction='inbound', summary='Hi')
+        find_duplicates(workers=1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            moved = merge_customers(self.john, self.jon)
+        reassigns = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "interactions_interaction"')]
+        self.assertEqual(len(reassigns), 1)
+        self.assertEqual(moved, 2)
+        self.assertEqual(self.john.interactions.count(), 3)
+        self.assertEqual(self.john.snapshot.total_interactions, 3)
+        self.jon.refresh_from_db()
+        self.assertFalse(self.jon.is_active)
+        self.assertEqual(self.jon.snapshot.total_interactions, 0)
+        self.assertEqual(DuplicateCandidate.objects.get().status, 'merged')
+
+    def test_merge_rejects_inactive_or_same_customer(self):
+        with self.assertRaises(ValueError):
+            merge_customers(self.john, self.john)
+        self.jon.soft_delete()
+        with self.assertRaises(ValueError):
+            merge_customers(self.john, self.jon)
+
+    def test_admin_merge_skips_pairs_made_moot_by_earlier_merges(self):
+        """Test that a chain (A, B), (B, C) doesn't merge C into a deactivated B."""
+        from interactions.models import Interaction
+        jonny = self.create_customer('Jonny Smith', 'jonny@example.net', '+15551234567')
+        Interaction.objects.create(customer=jonny, channel='email', direction='inbound', summary='Hi')
+        DuplicateCandidate.objects.create(customer_a=self.john, customer_b=self.jon, score=0.95)
+        DuplicateCandidate.objects.create(customer_a=self.jon, customer_b=jonny, score=0.9)
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:customer_management_duplicatecandidate_changelist'), {
+            'action': 'merge_pairs',
+            '_selected_action': list(DuplicateCandidate.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(
+            sorted(DuplicateCandidate.objects.values_list('status', flat=True)), ['dismissed', 'merged']
+        )
+        jonny.refresh_from_db()
+        self.assertTrue(jonny.is_active)
+        self.assertEqual(jonny.interactions.count(), 1)
+
+    def test_admin_merge_reports_rejected_pairs_and_continues(self):
+        """Test that a pair merge_customers refuses doesn't abort the rest of the action."""
+        DuplicateCandidate.objects.create(customer_a=self.john, customer_b=self.john, score=1.0)
+        DuplicateCandidate.objects.create(customer_a=self.john, customer_b=self.jon, score=0.95)
+
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        response = self.client.post(reverse('admin:customer_management_duplicatecandidate_changelist'), {
+            'action': 'merge_pairs',
+            '_selected_action': list(DuplicateCandidate.objects.values_list('pk', flat=True)),
+        }, follow=True)
+        messages = [str(m) for m in response.context['messages']]
+        self.assertIn(f"Cannot merge customer {self.john.pk} into itself", messages)
+        self.assertIn('1 pairs merged, 0 interactions reassigned.', messages)
+        self.jon.refresh_from_db()
+        self.assertFalse(self.jon.is_active)
+
+    def test_merge_locks_rows_with_an_evaluated_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            merge_customers(self.john, self.jon)
+        locks = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "customer_management_customer"' in q['sql']
+        ]
+        self.assertTrue(locks)
+        self.assertFalse(any('COUNT(' in sql for sql in locks))
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', locks[0])
+
+    def test_score_pairs(self):
+        records = {
+            1: ('John Smith', 'johnsmith', '+15551234567'),
+            2: ('Jon Smith', 'johnsmith', '+15551234567'),
+            3: ('Jane Miller', '', ''),
+            4: ('Jane Miller', '', ''),
+        }
+        scores = {(a, b): score for a, b, score in score_pairs(
+            [(a, records[a], b, records[b]) for a, b in ((1, 2), (1, 3), (3, 4))]
+        )}
+        john, jon = ({text[i:i + 3] for i in range(len(text) - 2)} for text in ('  john smith ', '  jon smith '))
+        name = len(john & jon) / len(john | jon)
+        self.assertEqual(scores[(1, 2)], round(0.5 * name + 0.5, 4))
+        self.assertLess(scores[(1, 3)], 0.1)
+        # Blank emails and phones don't count as matching.
+        self.assertEqual(scores[(3, 4)], 0.5)
+        self.assertEqual(score_pairs([]), [])
+
+
+
+class LegacyMigrationTest(TestCase):
+    """Test cases for copying data out of the legacy customer360 tables."""
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE customer360_customer (id integer PRIMARY KEY, name varchar(100), "
+                "email varchar(100), phone varchar(20), address varchar(200), social_media varchar(100))"
+            )
+            cursor.execute(
+                "CREATE TABLE customer360_interaction (id integer PRIMARY KEY, customer_id integer, "
+                "channel varchar(15), direction varchar(10), interaction_date date, summary text)"
+            )
+            cursor.executemany("INSERT INTO customer360_customer VALUES (%s, %s, %s, %s, %s, %s)", [
+                (1, 'Ann Lee', 'ann@example.com', '5550001111', '1 Main St', ''),
+                (2, 'Bob Ray', 'bob@example.com', '5550002222', '2 Main St', '@bob'),
+                (3, 'Cy Dunn', 'cy@example.com', '5550003333', '3 Main St', ''),
+            ])
+            cursor.executemany("INSERT INTO customer360_interaction VALUES (%s, %s, %s, %s, %s, %s)", [
+                (1, 1, 'phone', 'inbound', '2024-01-05', 'First call'),
+                (2, 1, 'email', 'outbound', '2024-02-01', 'Follow-up'),
+                (3, 2, 'sms', 'inbound', '2024-03-01', 'Already copied'),
+                (4, 9, 'sms', 'inbound', '2024-03-02', 'Orphan'),
+            ])
+        # Bob and his interaction were copied by an earlier migration.
+        from interactions.models import Interaction
+        self.bob = Customer.objects.create(
+            name='Bob Ray', email='bob@example.com', phone='5550002222', address='2 Main St'
+        )
+        Interaction.objects.create(customer=self.bob, channel='sms', direction='inbound', summary='Already copied')
+
+    def test_copies_maps_and_verifies(self):
+        call_command('migrate_legacy_data', batch_size=2, stdout=StringIO())
+
+        ann = Customer.objects.get(email='ann@example.com')
+        self.assertEqual(ann.created_at.date().isoformat(), '2024-01-05')
+        self.assertEqual(ann.phone_normalized, '+15550001111')
+        self.assertEqual(
+            list(ann.interactions.order_by('interaction_date').values_list('summary', flat=True)),
+            ['First call', 'Follow-up'],
+        )
+        self.assertEqual(ann.snapshot.total_interactions, 2)
+        self.assertEqual(self.bob.interactions.count(), 1)
+        self.assertEqual(Customer.objects.count(), 3)
+        self.assertFalse(LegacyIdMap.objects.get(source='customer', legacy_id=2).created)
+        self.assertFalse(LegacyIdMap.objects.filter(source='interaction', legacy_id=4).exists())
+
+    def test_rerun_resumes_and_detects_changes(self):
+        call_command('migrate_legacy_data', stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO customer360_interaction VALUES (5, 3, 'letter', 'outbound', '2024-04-01', 'Late')"
+            )
+        call_command('migrate_legacy_data', stdout=StringIO())
+        self.assertEqual(LegacyIdMap.objects.filter(source='interaction').count(), 4)
+
+        Customer.objects.filter(email='cy@example.com').update(name='Someone Else')
+        with self.assertRaises(CommandError):
+            call_command('migrate_legacy_data', verify_only=True, stdout=StringIO(), stderr=StringIO())
+
+class CallerIdTest(TestCase):
+    """Test cases for E.164 normalization and caller-ID lookup."""
+
+    def setUp(self):
+        callerid._cache.clear()
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='(555) 123-4567', address='1 Main St'
+        )
+
+    def test_to_e164(self):
+        self.assertEqual(to_e164('(555) 123-4567'), '+15551234567')
+        self.assertEqual(to_e164('1-555-123-4567'), '+15551234567')
+        self.assertEqual(to_e164('+44 20 7946 0958'), '+442079460958')
+        self.assertEqual(to_e164('0044 20 7946 0958'), '+442079460958')
+        self.assertEqual(to_e164('020 7946 0958', country_code='44'), '+442079460958')
+        self.assertEqual(to_e164('12345'), '')
+        self.assertEqual(to_e164(''), '')
+
+    def test_normalized_on_save(self):
+        self.assertEqual(self.customer.phone_normalized, '+15551234567')
+        self.customer.phone = '+1 555 000 1111'
+        self.customer.save(update_fields=['phone'])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.phone_normalized, '+15550001111')
+
+    def test_backfill_command(self):
+        Customer.objects.update(phone_normalized='')
+        # A lookup cached while the column was empty found nobody.
+        self.assertEqual(callerid.lookup('+15551234567')[1], [])
+        call_command('backfill_phone_normalized', stdout=StringIO())
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.phone_normalized, '+15551234567')
+        self.assertEqual(callerid.lookup('+15551234567')[1][0]['id'], self.customer.pk)
+        entry = ChangeLogEntry.objects.filter(object_id=self.customer.pk).latest('sequence')
+        self.assertEqual(entry.data['phone_normalized'], '+15551234567')
+
+        out = StringIO()
+        call_command('backfill_phone_normalized', '--all', stdout=out)
+        self.assertIn('Backfilled 0 customers', out.getvalue())
+
+    def test_lookup_returns_recent_interactions_in_one_query(self):
+        from interactions.models import Interaction
+        for i in range(7):
+            Interaction.objects.create(
+                customer=self.customer, channel='phone', direction='inbound', summary=f'Call {i}'
+            )
+        with self.assertNumQueries(1):
+            number, customers = callerid.lookup('555.123.4567')
+        self.assertEqual(number, '+15551234567')
+        self.assertEqual(len(customers), 1)
+        summaries = [i['summary'] for i in customers[0]['recent_interactions']]
+        self.assertEqual(summaries, ['Call 6', 'Call 5', 'Call 4', 'Call 3', 'Call 2'])
+
+        # Repeat callers are served from the LRU until something changes.
+        with self.assertNumQueries(0):
+            callerid.lookup('+15551234567')
+        Interaction.objects.create(customer=self.customer, channel='sms', direction='inbound', summary='Text')
+        with self.assertNumQueries(1):
+            _, customers = callerid.lookup('+15551234567')
+        self.assertEqual(customers[0]['recent_interactions'][0]['summary'], 'Text')
+
+    def test_caller_id_api(self):
+        url = reverse('customer_management:caller_id_api')
+        response = self.client.get(url, {'number': '5551234567'})
+        self.assertEqual(response.json()['customers'][0]['id'], self.customer.pk)
+        self.assertEqual(response.json()['customers'][0]['recent_interactions'], [])
+        self.assertEqual(self.client.get(url, {'number': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'number': '+15550000000'}).json()['customers'], [])
+
+    def test_list_search_matches_other_formats(self):
+        response = self.client.get(reverse('customer_management:customer_list'), {'search_query': '555-123-4567'})
+        self.assertEqual(list(response.context['customers']), [self.customer])
+
+
+@override_settings(BULK_ACTION_BACKGROUND=False)
+class ChangeLogTest(TestCase):
+    """Test cases for the change log and the delta-sync API."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='+1234567890', address='1 Main St'
+        )
+
+    def entries(self, since=0):
+        return [(e.model.split('.')[1], e.object_id, e.action) for e in changelog.changes_since(since)]
+
+    def test_saves_deletes_and_soft_deletes_are_logged(self):
+        from interactions.models import Interaction
+
+        interaction = Interaction.objects.create(
+            customer=self.customer, channel='email', direction='inbound', summary='Asked about invoices'
+        )
+        self.customer.name = 'John Updated'
+        self.customer.save()
+        response = self.client.post(reverse('customer_management:customer_delete', kwargs={'pk': self.customer.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Customer.objects.filter(pk=self.customer.pk, is_active=False).exists())
+        interaction_pk = interaction.pk
+        interaction.delete()
+
+        self.assertEqual(self.entries(), [
+            ('customer', self.customer.pk, 'create'),
+            ('interaction', interaction_pk, 'create'),
+            ('customer', self.customer.pk, 'update'),
+            ('customer', self.customer.pk, 'soft_delete'),
+            ('interaction', interaction_pk, 'delete'),
+        ])
+        entry = ChangeLogEntry.objects.get(action='update')
+        self.assertEqual(entry.data['name'], 'John Updated')
+
+    def test_bulk_actions_are_logged_per_row(self):
+        other = Customer.objects.create(
+            name='Jane Roe', email='jane@example.com', phone='+1234567891', address='2 Main St'
+        )
+        since = ChangeLogEntry.objects.latest('sequence').sequence
+        with CaptureQueriesContext(connection) as ctx:
+            submit_bulk_update(Customer.objects.all(), {'is_active': False}, 'Deactivate', chunk_size=2)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "customer_management_changelogentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.entries(since), [
+            ('customer', self.customer.pk, 'soft_delete'), ('customer', other.pk, 'soft_delete'),
+        ])
+        self.assertIs(ChangeLogEntry.objects.last().data['is_active'], False)
+
+    def test_log_rolls_back_with_the_change(self):
+        with self.assertRaises(IntegrityError):
+            Customer.objects.create(
+                name='Dup', email='john@example.com', phone='+1234567890', address='1 Main St'
+            )
+        self.assertEqual(ChangeLogEntry.objects.count(), 1)
+
+    def test_changes_api_pages_after_since(self):
+        for i in range(3):
+            Customer.objects.create(
+                name=f'Customer {i}', email=f'c{i}@example.com', phone='+1234567890', address='1 Main St'
+            )
+        url = reverse('customer_management:changes_api')
+        page = self.client.get(url, {'since': 0, 'limit': 3}).json()
+        self.assertEqual(len(page['changes']), 3)
+        self.assertTrue(page['has_more'])
+        page = self.client.get(url, {'since': page['next_since'], 'limit': 3}).json()
+        self.assertEqual([c['data']['name'] for c in page['changes']], ['Customer 2'])
+        self.assertFalse(page['has_more'])
+        empty = self.client.get(url, {'since': page['next_since']}).json()
+        self.assertEqual((empty['changes'], empty['next_since']), ([], page['next_since']))
+        self.assertEqual(self.client.get(url, {'since': 'x'}).status_code, 400)
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """Records webhook requests and answers with the queued status codes."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        server.requests.append((self.client_address[1], dict(self.headers), json.loads(body)))
+        status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(WEBHOOK_SECRET='s3cret', WEBHOOK_BATCH_SIZE=2, WEBHOOK_MAX_ATTEMPTS=2)
+class OutboxTest(TestCase):
+    """Test cases for the webhook outbox against a local stub server."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/hooks'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.statuses = []
+        self.settings_override = self.settings(WEBHOOK_URL=self.url)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.dispatcher = outbox.Dispatcher(concurrency=1)
+        self.addCleanup(self.dispatcher.close)
+
+    def create_customers(self, count, start=0):
+        return [
+            Customer.objects.create(
+                name=f'Customer {i}', email=f'c{i}@example.com', phone='+1234567890', address='1 Main St'
+            )
+            for i in range(start, start + count)
+        ]
+
+    def test_events_are_written_with_the_change(self):
+        from interactions.models import Interaction
+
+        customer, = self.create_customers(1)
+        Interaction.objects.create(customer=customer, channel='sms', direction='inbound', summary='Asked for a callback')
+        with self.assertRaises(IntegrityError):
+            self.create_customers(1)
+        self.assertEqual(
+            list(OutboxEvent.objects.values_list('event_type', flat=True)),
+            ['customer.created', 'interaction.created'],
+        )
+        with self.settings(WEBHOOK_URL=''):
+            self.create_customers(2, start=1)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_batches_reuse_one_connection(self):
+        self.create_customers(5)
+        rounds = [self.dispatcher.run_once() for _ in range(4)]
+        self.assertEqual(rounds, [(2, 0), (2, 0), (1, 0), (0, 0)])
+
+        requests = self.server.requests
+        self.assertEqual([len(body['events']) for _, _, body in requests], [2, 2, 1])
+        self.assertEqual(len({port for port, _, _ in requests}), 1)
+        self.assertEqual(requests[0][2]['events'][0]['type'], 'customer.created')
+        self.assertTrue(requests[0][1]['X-Webhook-Signature'].startswith('sha256='))
+        self.assertFalse(OutboxEvent.objects.exclude(status='delivered').exists())
+
+    def test_failures_back_off_then_dead_letter(self):
+        self.create_customers(1)
+        self.server.statuses = [503]
+        self.assertEqual(self.dispatcher.run_once(), (0, 1))
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), ('pending', 1))
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        # Not due yet, so nothing is sent.
+        self.assertEqual(self.dispatcher.run_once(), (0, 0))
+
+        OutboxEvent.objects.update(next_attempt_at=timezone.now())
+        self.server.statuses = [500]
+        self.dispatcher.run_once()
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts, event.last_error), ('dead', 2, 'HTTP 500 Internal Server Error'))
+
+        self.assertEqual(outbox.requeue(OutboxEvent.objects.all()), 1)
+        self.assertEqual(self.dispatcher.run_once(), (1, 0))
+
+    def test_client_errors_dead_letter_immediately(self):
+        self.create_customers(1)
+        self.server.statuses = [400]
+        self.dispatcher.run_once()
+        self.assertEqual(OutboxEvent.objects.get().status, 'dead')
+
+    def test_claims_are_exclusive(self):
+        self.create_customers(3)
+        wide = outbox.Dispatcher(concurrency=2)
+        self.addCleanup(wide.close)
+        first, second = wide.claim(), self.dispatcher.claim()
+        self.assertEqual([len(batch) for batch in first], [2, 1])
+        self.assertEqual(second, [])
+
+
+class FlakyChunkJob(BatchJob):
+    """Test job failing the chunk containing ``fail_pk`` ``failures`` times."""
+    chunk_size = 2
+
+    def __init__(self, fail_pk=None, failures=0):
+        self.fail_pk = fail_pk
+        self.failures = failures
+        self.chunks = []
+
+    def get_queryset(self):
+        return Customer.objects.all()
+
+    def process_chunk(self, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
+        if self.fail_pk in pks and self.failures:
+            self.failures -= 1
+            raise RuntimeError('chunk failed')
+        self.chunks.append(pks)
+        return queryset.update(social_media='@batched')
+
+
+# Run in a child process against a file database, which (unlike the
+# in-memory test database) really closes its connections.
+CONNECTION_JOB_SCRIPT = """
+import os, sys
+import django
+django.setup()
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.signals import connection_created
+from customer360.batch import BatchJob, BatchRunner
+from customer_management.models import Customer
+
+opened_by = {}
+
+def record_pid(sender, connection, **kwargs):
+    opened_by[id(connection.connection)] = os.getpid()
+
+connection_created.connect(record_pid)
+
+class ConnectionJob(BatchJob):
+    chunk_size = 2
+
+    def get_queryset(self):
+        return Customer.objects.all()
+
+    def process_chunk(self, queryset):
+        count = queryset.count()
+        opener = opened_by.get(id(connections['default'].connection))
+        with open(sys.argv[1], 'a') as f:
+            f.write('own\\n' if opener == os.getpid() else 'inherited\\n')
+        return count
+
+call_command('migrate', verbosity=0)
+for i in range(6):
+    Customer.objects.create(name=f'Customer {i}', email=f'c{i}@example.com', phone='+1234567890', address='x')
+result = BatchRunner(ConnectionJob(), workers=2).run()
+assert result.processed == 6, result
+"""
+
+
+class BatchRunnerTest(TestCase):
+    """Test cases for the chunked batch-job runner."""
+
+    def setUp(self):
+        self.customers = [
+            Customer.objects.create(
+                name=f'Customer {i}', email=f'c{i}@example.com', phone='+1234567890', address='1 Main St'
+            )
+            for i in range(5)
+        ]
+        self.customers[1].delete()
+        self.pks = [c.pk for c in self.customers if c.pk]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Checkpoint(os.path.join(directory.name, 'job.json'))
+
+    def test_chunks_are_exact_pk_ranges(self):
+        pks = self.pks
+        self.assertEqual(
+            list(chunk_bounds(Customer.objects.all(), 2)),
+            [(None, pks[1]), (pks[1], pks[3])],
+        )
+        job = FlakyChunkJob()
+        result = BatchRunner(job).run()
+        self.assertEqual((result.processed, result.chunks), (4, 2))
+        self.assertEqual(job.chunks, [pks[:2], pks[2:]])
+
+    def test_failed_chunks_are_retried(self):
+        job = FlakyChunkJob(fail_pk=self.pks[2], failures=1)
+        result = BatchRunner(job, retry_delay=0).run()
+        self.assertEqual((result.processed, result.failed), (4, []))
+
+    def test_checkpoint_resumes_after_last_contiguous_chunk(self):
+        job = FlakyChunkJob(fail_pk=self.pks[2], failures=5)
+        result = BatchRunner(job, retries=1, retry_delay=0, checkpoint=self.checkpoint).run()
+        self.assertEqual(len(result.failed), 1)
+        self.assertEqual(self.checkpoint.load(), self.pks[1])
+
+        progress = []
+        job = FlakyChunkJob()
+        result = BatchRunner(job, checkpoint=self.checkpoint, progress=lambda r, total: progress.append(total)).run()
+        self.assertEqual(result.resumed_after, self.pks[1])
+        self.assertEqual(job.chunks, [self.pks[2:]])
+        self.assertEqual(progress, [2])
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_workers_open_their_own_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, 'connections.txt')
+            env = {**os.environ, 'DATABASE_URL': f'sqlite:///{directory}/db.sqlite3'}
+            subprocess.run(
+                [sys.executable, '-c', CONNECTION_JOB_SCRIPT, log_path],
+                env=env, check=True, cwd=settings.BASE_DIR,
+            )
+            with open(log_path) as f:
+                self.assertEqual(f.read().split(), ['own'] * 3)
+
+
+def sample(name, **labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+
+# Run in a child process with PROMETHEUS_MULTIPROC_DIR set, like a worker.
+WORKER_SCRIPT = """
+from customer360 import identity, metrics, objcache, profiling
+metrics.INTERACTIONS_CREATED.labels('email').inc()
+metrics.sample_memory(force=True)
+"""
+
+
+class MetricsTest(TestCase):
+    """Test cases for the Prometheus metrics endpoint."""
+
+    def setUp(self):
+        callerid._cache.clear()
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='(555) 123-4567', address='1 Main St'
+        )
+
+    def test_request_latency_labelled_by_url_name(self):
+        labels = {'view': 'customer_management:customer_list', 'method': 'GET', 'status': '200'}
+        before = sample('django_http_request_duration_seconds_count', **labels)
+        self.client.get(reverse('customer_management:customer_list'))
+        self.assertEqual(sample('django_http_request_duration_seconds_count', **labels), before + 1)
+
+        before = sample('django_http_request_duration_seconds_count', view='<unresolved>', method='GET', status='404')
+        self.client.get('/no-such-page/')
+        self.assertEqual(
+            sample('django_http_request_duration_seconds_count', view='<unresolved>', method='GET', status='404'),
+            before + 1,
+        )
+
+    def test_queries_and_cache_lookups_counted(self):
+        url = reverse('customer_management:caller_id_api')
+        queries = sample('django_db_queries_total', alias='default', vendor=connection.vendor)
+        hits = sample('cache_requests_total', cache='caller_id', result='hit')
+        misses = sample('cache_requests_total', cache='caller_id', result='miss')
+        self.client.get(url, {'number': '555-123-4567'})
+        self.client.get(url, {'number': '555-123-4567'})
+        self.assertGreater(sample('django_db_queries_total', alias='default', vendor=connection.vendor), queries)
+        self.assertEqual(sample('cache_requests_total', cache='caller_id', result='hit'), hits + 1)
+        self.assertEqual(sample('cache_requests_total', cache='caller_id', result='miss'), misses + 1)
+
+    def test_interactions_counted_on_commit(self):
+        from interactions.models import Interaction
+        before = sample('interactions_created_total', channel='phone')
+        with self.captureOnCommitCallbacks(execute=True):
+            Interaction.objects.create(customer=self.customer, channel='phone', direction='inbound', summary='Hi')
+            self.assertEqual(sample('interactions_created_total', channel='phone'), before)
+        self.assertEqual(sample('interactions_created_total', channel='phone'), before + 1)
+
+    def test_scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('django_http_request_duration_seconds_bucket', body)
+        self.assertIn('worker_resident_memory_bytes', body)
+
+    @override_settings(METRICS_TOKEN='t0ken')
+    def test_scrape_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer t0ken').status_code, 200)
+
+    def test_worker_processes_aggregated(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory.name}
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', WORKER_SCRIPT], env=env, check=True, cwd=settings.BASE_DIR)
+
+        body = metrics.render(directory.name)[0].decode()
+        self.assertIn('interactions_created_total{channel="email"} 2.0', body)
+        self.assertEqual(body.count('worker_resident_memory_bytes{pid='), 2)
+
+
+class ProfilerTest(TestCase):
+    """Test cases for on-demand request profiling."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(PROFILE_DIR=directory.name, PROFILE_SAMPLE_INTERVAL=0.001)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.user = User.objects.create_user('agent', password='pw')
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='+1234567890', address='1 Main St'
+        )
+
+    def test_untriggered_requests_not_profiled(self):
+        url = reverse('customer_management:customer_detail', args=[self.customer.pk])
+        self.assertNotIn('X-Profile-Id', self.client.get(url))
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Profile-Id', self.client.get(url, {'_profile': '1'}))
+        self.assertNotIn('X-Profile-Id', self.client.get(url, HTTP_X_PROFILE='forged'))
+        self.assertEqual(profiling.list_profiles(), [])
+
+    def test_staff_query_param_captures_profile(self):
+        self.client.force_login(self.staff)
+        url = reverse('customer_management:customer_detail', args=[self.customer.pk])
+        response = self.client.get(url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        [profile] = profiling.list_profiles()
+        self.assertEqual(profile['id'], profile_id)
+        self.assertEqual((profile['path'], profile['user'], profile['status']), (f'{url}?_profile=1', 'staff', 200))
+        self.assertGreater(profile['query_count'], 0)
+
+        pstats_file = profiling.profile_path(profile_id, 'prof')
+        self.assertTrue(pstats.Stats(str(pstats_file)).total_calls)
+        details = json.loads(profiling.profile_path(profile_id, 'json').read_text())
+        self.assertTrue(any('customer_management_customer' in q['sql'] for q in details['queries']))
+        for line in profiling.profile_path(profile_id, 'collapsed').read_text().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(int(count) > 0 and stack)
+
+    def test_query_param_hidden_from_admin_changelist(self):
+        self.staff.is_superuser = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('admin:customer_management_customer_changelist'), {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('X-Profile-Id', response)
+
+    def test_signed_header_captures_profile(self):
+        response = self.client.get(reverse('customer_management:customer_list'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertIn('X-Profile-Id', response)
+        with override_settings(PROFILE_TOKEN_MAX_AGE=-1):
+            response = self.client.get(reverse('customer_management:customer_list'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertNotIn('X-Profile-Id', response)
+
+    @override_settings(PROFILE_KEEP=1)
+    def test_staff_list_download_and_pruning(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('customer_management:customer_list'), {'_profile': '1'})
+        profile_id = self.client.get(reverse('customer_management:customer_list'), {'_profile': '1'})['X-Profile-Id']
+        self.assertEqual([p['id'] for p in profiling.list_profiles()], [profile_id])
+
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, profile_id)
+        response = self.client.get(reverse('profile_download', args=[profile_id, 'collapsed']))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'{profile_id}.collapsed', response['Content-Disposition'])
+        self.assertEqual(self.client.get(reverse('profile_download', args=[profile_id, 'py'])).status_code, 404)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 302)
+        self.assertEqual(self.client.get(reverse('profile_download', args=[profile_id, 'prof'])).status_code, 302)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_ASYNC=False)
+class SlowQueryLogTest(TestCase):
+    """Test cases for the slow-query log."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        for i in range(3):
+            Customer.objects.create(
+                name=f'Customer {i}', email=f'c{i}@example.com', phone='+1234567890', address='1 Main St'
+            )
+        slowlog.reset()
+
+    def customer_queries(self):
+        return SlowQuery.objects.filter(normalized_sql__contains='FROM "customer_management_customer"')
+
+    def test_normalize(self):
+        self.assertEqual(
+            slowlog.normalize("SELECT * FROM t1 WHERE a = 'x''y' AND b IN (%s, %s,%s) LIMIT 21"),
+            'SELECT * FROM t1 WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            slowlog.fingerprint(slowlog.normalize('SELECT a FROM t WHERE id IN (%s)')),
+            slowlog.fingerprint(slowlog.normalize('SELECT a FROM t WHERE id IN (%s, %s, %s)')),
+        )
+
+    def test_executions_aggregated_by_fingerprint(self):
+        list(Customer.objects.filter(pk__in=[1]))
+        list(Customer.objects.filter(pk__in=[1, 2, 3]))
+        [query] = self.customer_queries().filter(normalized_sql__contains='IN (...)')
+        self.assertEqual(query.count, 2)
+        self.assertGreaterEqual(query.total_ms, query.max_ms)
+        self.assertIn('SEARCH', query.plan)
+        self.assertTrue(query.call_site.startswith('customer_management/tests.py:'))
+        # The log's own bookkeeping is never recorded.
+        self.assertFalse(SlowQuery.objects.filter(normalized_sql__startswith='UPDATE "customer_management_slowquery"').exists())
+
+    def test_inline_logging_keeps_callers_transaction(self):
+        with transaction.atomic():
+            with self.assertLogs('customer_management.slowlog', 'WARNING'):
+                slowlog.store('default', 'sqlite', 'SELECT missing FROM nowhere', None, 5.0, '')
+            slowlog.store('default', 'sqlite', 'SELECT missing FROM nowhere', None, 7.0, '')
+            self.assertEqual(Customer.objects.count(), 3)
+        query = SlowQuery.objects.get(normalized_sql='SELECT missing FROM nowhere')
+        self.assertEqual((query.count, query.total_ms, query.max_ms), (2, 12.0, 7.0))
+
+    def test_call_site_is_view_or_template(self):
+        self.client.get(reverse('customer_management:customer_list'))
+        sites = set(self.customer_queries().values_list('call_site', flat=True))
+        self.assertIn('template customer_management/customer_list.html', sites)
+        self.assertTrue(any(site.startswith('customer_management/views.py:') for site in sites))
+
+    def test_staff_page_and_command(self):
+        list(Customer.objects.filter(name__icontains='customer'))
+        self.assertEqual(self.client.get(reverse('customer_management:slow_query_list')).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('customer_management:slow_query_list'), {'order': 'max'})
+        self.assertContains(response, 'LIKE ?')
+
+        out = StringIO()
+        call_command('slow_queries', '--plans', '--limit', '50', stdout=out)
+        self.assertIn('LIKE ?', out.getvalue())
+        self.assertIn('Call site: customer_management/tests.py:', out.getvalue())
+        call_command('slow_queries', '--reset', stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_ASYNC=False)
+class SlowQueryLogTransactionTest(TransactionTestCase):
+    """Test cases for inline slow-query logging around transaction control."""
+
+    def test_slow_begin_is_not_recorded(self):
+        """Test that a slow BEGIN IMMEDIATE doesn't make the log open a second transaction."""
+        with self.assertNoLogs('customer_management.slowlog', 'ERROR'):
+            with transaction.atomic():
+                Customer.objects.create(name='John Doe', email='john@example.com', phone='+1234567890',
+                                        address='1 Main St')
+        self.assertTrue(SlowQuery.objects.filter(normalized_sql__startswith='INSERT').exists())
+        self.assertFalse(SlowQuery.objects.exclude(
+            normalized_sql__regex=r'^(SELECT|WITH|INSERT|UPDATE|DELETE)'
+        ).exists())
+
+
+class ObjectCacheTest(TestCase):
+    """Test cases for the two-tier customer cache."""
+
+    def setUp(self):
+        cache.clear()
+        customers.local.clear()
+        customers.l1_hits = customers.l2_hits = customers.misses = 0
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='+1234567890', address='1 Main St'
+        )
+
+    def test_read_through_tiers(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(customers.get(self.customer.pk).name, 'John Doe')
+        with self.assertNumQueries(0):
+            customers.get(str(self.customer.pk))
+            customers.local.clear()
+            customers.get(self.customer.pk)
+        self.assertEqual(customers.stats(), {'l1_hits': 1, 'l2_hits': 1, 'misses': 1, 'hit_ratio': 2 / 3})
+
+    def test_copies_handed_out(self):
+        customers.get(self.customer.pk).name = 'Changed'
+        self.assertEqual(customers.get(self.customer.pk).name, 'John Doe')
+
+    def test_writes_invalidate(self):
+        customers.get(self.customer.pk)
+        self.customer.name = 'Jane Doe'
+        self.customer.save()
+        self.assertEqual(customers.get(self.customer.pk).name, 'Jane Doe')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            submit_bulk_update(Customer.objects.filter(pk=self.customer.pk), {'is_active': False}, 'Deactivate')
+        self.assertFalse(customers.get(self.customer.pk).is_active)
+
+        pk = self.customer.pk
+        self.customer.delete()
+        with self.assertRaises(Customer.DoesNotExist):
+            customers.get(pk)
+        with self.assertRaises(Http404):
+            customers.get_or_404(pk)
+        with self.assertRaises(Http404):
+            customers.get_or_404('abc')
+
+    def test_evictions_broadcast_to_other_processes(self):
+        stale = customers.get(self.customer.pk)
+        objcache.sync_evictions(force=True)
+        # Another worker commits a change...
+        Customer.objects.filter(pk=self.customer.pk).update(name='Jane Doe')
+        customers._evict([self.customer.pk])
+        # ...while this one still holds the old row in L1.
+        customers.local.set(self.customer.pk, stale)
+        objcache.sync_evictions(force=True)
+        self.assertEqual(customers.get(self.customer.pk).name, 'Jane Doe')
+
+    def test_lagging_process_clears_l1(self):
+        customers.get(self.customer.pk)
+        objcache.sync_evictions(force=True)
+        seen = cache.get(objcache.EVICTION_SEQ_KEY, 0)
+        cache.set(objcache.EVICTION_SEQ_KEY, seen + objcache.EVICTION_BACKLOG + 1, None)
+        objcache.sync_evictions(force=True)
+        self.assertIsNone(customers.local.get(self.customer.pk))
+
+    def test_interaction_pages_use_cache(self):
+        from interactions.models import Interaction
+        interaction = Interaction.objects.create(
+            customer=self.customer, channel='phone', direction='inbound', summary='Asked about billing'
+        )
+        self.client.get(reverse('interactions:interaction_create_for_customer', args=[self.customer.pk]))
+        response = self.client.get(reverse('interactions:interaction_detail', args=[interaction.pk]))
+        self.assertContains(response, 'John Doe')
+        # Loaded once for the create page, then from L1 on the detail page.
+        self.assertEqual(customers.stats()['misses'], 1)
+        self.assertEqual(customers.stats()['l1_hits'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ObjectCacheReplicaTest(TransactionTestCase):
+    """Test that the object cache is never filled from a replica."""
+
+    def test_misses_read_the_primary(self):
+        # Outside a transaction, so the router would pick the replica.
+        customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='+1234567890', address='1 Main St'
+        )
+        cache.clear()
+        customers.local.clear()
+        with use_replicas():
+            self.assertEqual(ReplicaRouter().db_for_read(Customer), 'replica1')
+            with self.assertNumQueries(1, using='default'):
+                self.assertEqual(customers.get(customer.pk).name, 'John Doe')
+
+
+def row_loads(queries, table):
+    """SELECTs in ``queries`` fetching rows of ``table`` by primary key."""
+    return sum(
+        1 for query in queries
+        if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']
+        and f'WHERE "{table}"."id" =' in query['sql']
+    )
+
+
+class IdentityMapTest(TestCase):
+    """Test cases for the request-scoped identity map."""
+
+    def setUp(self):
+        from interactions.models import Interaction
+        cache.clear()
+        customers.local.clear()
+        self.customer = Customer.objects.create(
+            name='John Doe', email='john@example.com', phone='+1234567890', address='1 Main St'
+        )
+        self.interaction = Interaction.objects.create(
+            customer=self.customer, channel='phone', direction='inbound', summary='Asked about billing'
+        )
+
+    def test_same_instance_within_scope(self):
+        with identity.scope():
+            with self.assertNumQueries(1):
+                first = identity.get(Customer.objects.all(), self.customer.pk)
+                self.assertIs(identity.get(Customer, str(self.customer.pk)), first)
+            # Filtering querysets are never answered from the map.
+            with self.assertNumQueries(1):
+                self.assertEqual(identity.get(Customer.objects.filter(is_active=True), self.customer.pk), first)
+        with self.assertNumQueries(2):
+            identity.get(Customer.objects.all(), self.customer.pk)
+            identity.get(Customer.objects.all(), self.customer.pk)
+        with self.assertRaises(Http404):
+            identity.get_or_404(Customer, 'abc')
+
+    def test_customer_detail_loads_customer_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('customer_management:customer_detail', args=[self.customer.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(row_loads(queries, 'customer_management_customer'), 1)
+
+    def test_interaction_create_loads_customer_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('interactions:interaction_create_for_customer', args=[self.customer.pk])
+            )
+        self.assertContains(response, 'John Doe')
+        self.assertEqual(row_loads(queries, 'customer_management_customer'), 1)
+
+    def test_delete_views_load_object_once(self):
+        url = reverse('customer_management:customer_delete', args=[self.customer.pk])
+        for method in (self.client.get, self.client.post):
+            with CaptureQueriesContext(connection) as queries:
+                method(url)
+            self.assertEqual(row_loads(queries, 'customer_management_customer'), 1)
+
+        url = reverse('interactions:interaction_delete', args=[self.interaction.pk])
+        for method in (self.client.get, self.client.post):
+            with CaptureQueriesContext(connection) as queries:
+                method(url)
+            self.assertEqual(row_loads(queries, 'interactions_interaction'), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    """Test cases for read-replica routing and read-your-writes pinning."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_replica_only_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Customer), 'default')
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Customer), 'replica1')
+            self.assertEqual(self.router.db_for_write(Customer), 'default')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Customer), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'customer_management'))
+        self.assertTrue(self.router.allow_migrate('default', 'customer_management'))
+
+    def test_post_pins_client_to_primary(self):
+        factory = RequestFactory()
+        routed = []
+
+        @replica_reads
+        def view(request):
+            routed.append(self.router.db_for_read(Customer))
+            return HttpResponse()
+
+        middleware = ReplicaPinMiddleware(view)
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+
+        middleware(factory.get('/'))
+        pinned = factory.get('/')
+        pinned.COOKIES['db_pin'] = '1'
+        middleware(pinned)
+        self.assertEqual(routed, ['default', 'replica1', 'default'])
+
+
+class TunedSQLiteTest(SimpleTestCase):
+    """Test cases for the high-concurrency SQLite backend."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'tuned.sqlite3')
+        settings_dict = {**connections['default'].settings_dict, 'NAME': self.path}
+        self.wrapper = TunedSQLiteWrapper(settings_dict, alias='tuned')
+        self.addCleanup(self.wrapper.close)
+
+    def test_connections_get_pragmas(self):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_transactions_take_write_lock_up_front(self):
+        self.wrapper.ensure_connection()
+        self.wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute('BEGIN IMMEDIATE')
+        self.wrapper.connection.rollback()
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Test cases for the in-process connection pool."""
+
+    def connect(self):
+        return sqlite3.connect(':memory:', check_same_thread=False)
+
+    def test_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(self.connect), first)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use']), (1, 2, 1))
+
+    def test_waits_for_release_then_times_out(self):
+        pool = ConnectionPool(max_size=1, timeout=0.5)
+        held = pool.acquire(self.connect)
+        threading.Timer(0.05, pool.release, args=[held]).start()
+        self.assertIs(pool.acquire(self.connect), held)
+        self.assertEqual(pool.stats()['waits'], 1)
+        self.assertGreater(pool.stats()['wait_time_max'], 0)
+
+        pool.timeout = 0.01
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_broken_and_expired_connections_are_replaced(self):
+        pool = ConnectionPool(max_size=1, max_lifetime=0)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+        self.assertIsNot(second, first)
+        pool.release(second, discard=True)
+        self.assertEqual(pool.stats()['closed'], 2)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_dead_idle_connections_are_replaced(self):
+        pool = ConnectionPool(max_size=1)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        # The server drops the connection while it sits idle.
+        first.close()
+        second = pool.acquire(self.connect, check=lambda c: c.execute('SELECT 1'))
+        self.assertIsNot(second, first)
+        second.execute('SELECT 1')
+        stats = pool.stats()
+        self.assertEqual((stats['failed_checks'], stats['size'], stats['in_use']), (1, 1, 1))
+
+    def test_failed_connect_frees_the_slot(self):
+        pool = ConnectionPool(max_size=1)
+
+        def fail():
+            raise sqlite3.OperationalError('unreachable')
+
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.acquire(fail)
+        pool.acquire(self.connect)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+
+class StaticAssetsTest(SimpleTestCase):
+    """Test cases for the self-hosted static asset pipeline."""
+
+    def test_base_template_uses_no_external_assets(self):
+        html = render_to_string('customer_management/base.html')
+        self.assertNotIn('cdn.jsdelivr.net', html)
+        self.assertNotIn('fonts.googleapis.com', html)
+        self.assertIn('/static/vendor/bootstrap/css/bootstrap.min.css', html)
+        self.assertIn('/static/js/main.js', html)
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        storages = {
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+        }
+        # Only the project's own static tree; admin assets would just slow this down.
+        finders = ['django.contrib.staticfiles.finders.FileSystemFinder']
+        with override_settings(STATIC_ROOT=directory.name, STORAGES=storages, STATICFILES_FINDERS=finders):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = static('js/main.js')
+
+        self.assertRegex(url, r'^/static/js/main\.[0-9a-f]{12}\.js$')
+        hashed = os.path.join(directory.name, url[len('/static/'):])
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue(os.path.exists(hashed + suffix), hashed + suffix)
+
+
+class LoggingPipelineTest(SimpleTestCase):
+    """Test cases for the queued JSON logging helpers."""
+
+    def make_record(self, name='customer360.views', level=logging.INFO, msg='hello %s', args=('world',), **extra):
+        record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_sampling_keeps_every_nth_info_record(self):
+        sampler = SamplingFilter('customer360=0.25')
+        kept = [sampler.filter(self.make_record('customer360.views')) for _ in range(8)]
+        self.assertEqual(kept.count(True), 2)
+        self.assertTrue(sampler.filter(self.make_record(level=logging.WARNING)))
+        self.assertTrue(sampler.filter(self.make_record('interactions.views')))
+
+    def test_json_formatter_includes_extra_fields_and_traceback(self):
+        try:
+            raise ValueError('bad')
+        except ValueError:
+            record = self.make_record(customer_id=7)
+            record.exc_info = sys.exc_info()
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry['message'], 'hello world')
+        self.assertEqual(entry['customer_id'], 7)
+        self.assertIn('ValueError: bad', entry['exc_info'])
+
+    def test_queue_handler_writes_from_background_thread(self):
+        written = []
+
+        class Target(logging.Handler):
+            def emit(self, record):
+                written.append((self.format(record), threading.current_thread()))
+
+        target = Target()
+        target.name = 'logging-pipeline-test'
+        handler = QueueListenerHandler([target.name])
+        self.addCleanup(handler.close)
+        handler.handle(self.make_record())
+        handler.stop()
+
+        self.assertEqual(len(written), 1)
+        self.assertEqual(written[0][0], 'hello world')
+        self.assertIsNot(written[0][1], threading.current_thread())
@@ -10,9 +10,16 @@ urlpatterns = [
     path('<int:pk>/', views.CustomerDetailView.as_view(), name='customer_detail'),
     path('<int:pk>/edit/', views.CustomerUpdateView.as_view(), name='customer_update'),
     path('<int:pk>/delete/', views.CustomerDeleteView.as_view(), name='customer_delete'),
+    path('export/', views.customer_export, name='customer_export'),
     
     # API endpoints
     path('api/search/', views.customer_search_api, name='customer_search_api'),
+    path('api/caller-id/', views.caller_id_api, name='caller_id_api'),
+    path('api/changes/', views.changes_api, name='changes_api'),
+    
+    # Admin bulk action jobs
+    path('bulk-jobs/<int:pk>/', views.bulk_job_progress, name='bulk_job_progress'),
+    path('slow-queries/', views.slow_query_list, name='slow_query_list'),
     
     # Legacy URLs for backward compatibility
     path('legacy/', views.index, name='legacy_index'),
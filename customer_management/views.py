@@ -1,20 +1,31 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.db.models import Q, Count
-from django.http import JsonResponse
+from django.db.models import Q, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
 from django.core.paginator import Paginator
-from django.utils import timezone
+import csv
 import logging
 
-from .models import Customer
+from customer360.daterange import month_range
+from customer360.db_router import ReplicaReadMixin, replica_reads
+from customer360.identity import IdentityMapMixin
+from interactions.models import Interaction
+from interactions.snapshots import get_snapshot
+from segments.engine import filter_by_bitmap
+from . import callerid, changelog, slowlog
+from .models import BulkActionJob, Customer
+from .phone import to_e164
 from .forms import CustomerForm, CustomerSearchForm
 
 logger = logging.getLogger(__name__)
 
 
-class CustomerListView(ListView):
+class CustomerListView(ReplicaReadMixin, ListView):
     """
     Display list of customers with search and pagination.
     """
@@ -24,35 +35,29 @@ class CustomerListView(ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = Customer.objects.all().annotate(
-            total_interactions=Count('interactions')
+        # Customers without a snapshot yet are counted live.
+        live_count = (
+            Interaction.objects.filter(customer=OuterRef('pk')).order_by()
+            .values('customer').annotate(count=Count('id')).values('count')
         )
-        
-        # Handle Active Only filter
-        is_active_filter = self.request.GET.get('is_active')
-        if is_active_filter == 'on':  # Checkbox is checked
-            queryset = queryset.filter(is_active=True)
-        elif is_active_filter is None:  # Default behavior - show active only
-            queryset = queryset.filter(is_active=True)
-        # If is_active_filter == '' (unchecked), show all customers
-        
-        search_query = self.request.GET.get('search_query')
-        if search_query:
-            queryset = queryset.filter(
-                Q(name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(phone__icontains=search_query)
+        queryset = Customer.objects.all().annotate(
+            total_interactions=Coalesce(
+                'snapshot__total_interactions', Subquery(live_count), 0, output_field=IntegerField()
             )
-        
-        return queryset.order_by('name')
+        )
+        self.search_form = CustomerSearchForm(self.request.GET)
+        return filter_customers(queryset, self.request.GET, self.search_form).order_by('name')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['search_form'] = CustomerSearchForm(self.request.GET)
+        context['search_form'] = self.search_form
+        context['segment'] = self.search_form.cleaned_data.get('segment')
         
         # Calculate total customers based on current filter
         is_active_filter = self.request.GET.get('is_active')
-        if is_active_filter == 'on' or is_active_filter is None:
+        if context['segment']:
+            context['total_customers'] = context['paginator'].count
+        elif is_active_filter == 'on' or is_active_filter is None:
             context['total_customers'] = Customer.objects.filter(is_active=True).count()
         else:
             context['total_customers'] = Customer.objects.count()
@@ -60,7 +65,42 @@ class CustomerListView(ListView):
         return context
 
 
-class CustomerDetailView(DetailView):
+def filter_customers(queryset, params, search_form=None):
+    """
+    Apply the customer list filters in ``params`` to ``queryset``.
+
+    Shared by the list view and the CSV export so both select the same rows.
+    """
+    # Handle Active Only filter
+    is_active_filter = params.get('is_active')
+    if is_active_filter == 'on':  # Checkbox is checked
+        queryset = queryset.filter(is_active=True)
+    elif is_active_filter is None:  # Default behavior - show active only
+        queryset = queryset.filter(is_active=True)
+    # If is_active_filter == '' (unchecked), show all customers
+    
+    search_query = params.get('search_query')
+    if search_query:
+        search = (
+            Q(name__icontains=search_query) |
+            Q(email__icontains=search_query) |
+            Q(phone__icontains=search_query)
+        )
+        # Also match numbers typed in a different format than stored
+        normalized = to_e164(search_query) if any(c.isdigit() for c in search_query) else ''
+        if normalized:
+            search |= Q(phone_normalized=normalized)
+        queryset = queryset.filter(search)
+    
+    search_form = search_form or CustomerSearchForm(params)
+    segment = search_form.cleaned_data.get('segment') if search_form.is_valid() else None
+    if segment:
+        queryset = filter_by_bitmap(queryset, segment.get_bitmap())
+    
+    return queryset
+
+
+class CustomerDetailView(IdentityMapMixin, DetailView):
     """
     Display detailed view of a customer with their interactions.
     """
@@ -68,19 +108,25 @@ class CustomerDetailView(DetailView):
     template_name = 'customer_management/customer_detail.html'
     context_object_name = 'customer'
 
+    def get_queryset(self):
+        return Customer.objects.select_related('snapshot')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        customer = self.get_object()
+        customer = self.object
         
-        # Get recent interactions
-        recent_interactions = customer.interactions.all()[:10]
+        # Get recent interactions (the full history is on the timeline page)
+        recent_interactions = customer.interactions.order_by('-interaction_date', '-id')[:10]
         context['recent_interactions'] = recent_interactions
         
-        # Get interaction statistics
+        # Aggregates come from the precomputed profile snapshot
+        snapshot = get_snapshot(customer)
+        context['snapshot'] = snapshot
+        month_start, next_month = month_range()
         context['interaction_stats'] = {
-            'total': customer.interactions.count(),
+            'total': snapshot.total_interactions,
             'this_month': customer.interactions.filter(
-                interaction_date__month=timezone.now().month
+                interaction_date__gte=month_start, interaction_date__lt=next_month
             ).count(),
         }
         
@@ -97,12 +143,12 @@ class CustomerCreateView(CreateView):
     success_url = reverse_lazy('customer_management:customer_list')
 
     def form_valid(self, form):
-        logger.info(f"Creating new customer: {form.cleaned_data['name']}")
+        logger.info("Creating new customer: %s", form.cleaned_data['name'])
         messages.success(self.request, f"Customer '{form.cleaned_data['name']}' created successfully!")
         return super().form_valid(form)
 
     def form_invalid(self, form):
-        logger.warning(f"Invalid customer form submission: {form.errors}")
+        logger.warning("Invalid customer form submission: %s", form.errors)
         messages.error(self.request, "Please correct the errors below.")
         return super().form_invalid(form)
 
@@ -117,12 +163,12 @@ class CustomerUpdateView(UpdateView):
     success_url = reverse_lazy('customer_management:customer_list')
 
     def form_valid(self, form):
-        logger.info(f"Updating customer: {form.cleaned_data['name']} (ID: {self.object.pk})")
+        logger.info("Updating customer: %s (ID: %s)", form.cleaned_data['name'], self.object.pk)
         messages.success(self.request, f"Customer '{form.cleaned_data['name']}' updated successfully!")
         return super().form_valid(form)
 
 
-class CustomerDeleteView(DeleteView):
+class CustomerDeleteView(IdentityMapMixin, DeleteView):
     """
     Soft delete a customer (mark as inactive).
     """
@@ -136,18 +182,18 @@ class CustomerDeleteView(DeleteView):
         context['interaction_count'] = self.object.interactions.count()
         return context
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
+    def form_valid(self, form):
+        # Django 4 routes the confirmation POST here, not through delete().
         # Soft delete - mark as inactive instead of actual deletion
-        self.object.is_active = False
-        self.object.save()
-        
-        logger.info(f"Soft deleted customer: {self.object.name} (ID: {self.object.pk})")
-        messages.success(request, f"Customer '{self.object.name}' has been deactivated.")
+        self.object.soft_delete()
+
+        logger.info("Soft deleted customer: %s (ID: %s)", self.object.name, self.object.pk)
+        messages.success(self.request, f"Customer '{self.object.name}' has been deactivated.")
         return redirect(self.success_url)
 
 
 # API Views for AJAX requests
+@replica_reads
 def customer_search_api(request):
     """
     API endpoint for customer search (for AJAX autocomplete).
@@ -157,23 +203,144 @@ def customer_search_api(request):
         return JsonResponse({'customers': []})
     
     customers = Customer.objects.filter(
-        Q(name__icontains=query) | Q(email__icontains=query),
-        is_active=True
-    )[:10]
+        Q(name__icontains=query) | Q(email__icontains=query)
+    )
+    if not request.GET.get('include_inactive'):
+        customers = customers.filter(is_active=True)
     
-    customer_data = [
-        {
-            'id': customer.id,
-            'name': customer.name,
-            'email': customer.email,
-            'phone': customer.phone
-        }
-        for customer in customers
-    ]
+    customer_data = list(customers.values('id', 'name', 'email', 'phone')[:10])
     
     return JsonResponse({'customers': customer_data})
 
 
+def caller_id_api(request):
+    """
+    API endpoint for the phone system: customers matching an incoming number
+    with their most recent interactions.
+    """
+    try:
+        limit = max(1, min(int(request.GET.get('limit', callerid.RECENT_INTERACTIONS)), 20))
+        number, customers = callerid.lookup(request.GET.get('number', ''), limit=limit)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({'number': number, 'customers': customers})
+
+
+@replica_reads
+def changes_api(request):
+    """
+    API endpoint for delta sync: change log entries after ``since``.
+
+    Consumers store ``next_since`` and pass it back until ``has_more`` is
+    false. ``model`` (repeatable) restricts the feed, e.g.
+    ``model=customer_management.customer``.
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET.get('limit', changelog.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': 'since and limit must be integers'}, status=400)
+
+    entries = changelog.changes_since(since, limit, request.GET.getlist('model'))
+    return JsonResponse({
+        'changes': [
+            {
+                'sequence': entry.sequence,
+                'model': entry.model,
+                'id': entry.object_id,
+                'action': entry.action,
+                'data': entry.data,
+                'changed_at': entry.changed_at,
+            }
+            for entry in entries
+        ],
+        'next_since': entries[-1].sequence if entries else since,
+        'has_more': len(entries) == max(1, min(limit, changelog.MAX_PAGE_SIZE)),
+    })
+
+
+class Echo:
+    """Pseudo-buffer handing each CSV row straight back to the response."""
+
+    def write(self, value):
+        return value
+
+
+EXPORT_FIELDS = [
+    ('ID', 'id'),
+    ('Name', 'name'),
+    ('Email', 'email'),
+    ('Phone', 'phone'),
+    ('Address', 'address'),
+    ('Social Media', 'social_media'),
+    ('Active', 'is_active'),
+    ('Created', 'created_at'),
+    ('Total Interactions', 'snapshot__total_interactions'),
+    ('Last Interaction', 'snapshot__last_interaction_at'),
+]
+
+
+@replica_reads
+def customer_export(request):
+    """
+    Stream the filtered customer list as CSV.
+
+    Accepts the same search, active and segment parameters as the list view.
+    Rows are streamed from a server-side iterator, so memory use doesn't
+    grow with the export size.
+    """
+    queryset = filter_customers(Customer.objects.all(), request.GET).order_by('name', 'id')
+    # Rows are read after the view returns, so choose the database now.
+    queryset = queryset.using(queryset.db)
+    rows = queryset.values_list(*[field for _, field in EXPORT_FIELDS]).iterator(chunk_size=2000)
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow([label for label, _ in EXPORT_FIELDS])
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="customers.csv"'
+    return response
+
+
+@staff_member_required
+def bulk_job_progress(request, pk):
+    """
+    Progress page for a chunked admin bulk action (JSON with ?format=json).
+    """
+    job = get_object_or_404(BulkActionJob, pk=pk)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': job.pk,
+            'description': job.description,
+            'status': job.status,
+            'total': job.total,
+            'processed': job.processed,
+            'percent_complete': job.percent_complete,
+            'last_pk': job.last_pk,
+            'error': job.error,
+        })
+    return render(request, 'customer_management/bulk_job_progress.html', {'job': job})
+
+
+@staff_member_required
+def slow_query_list(request):
+    """
+    Top slow-query fingerprints with their plans, by total time by default.
+    """
+    order = request.GET.get('order', 'total')
+    if order not in ('total', 'max', 'count'):
+        order = 'total'
+    return render(request, 'customer_management/slow_query_list.html', {
+        'queries': slowlog.top_queries(order, limit=50),
+        'order': order,
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+    })
+
+
 # Legacy function-based views for backward compatibility
 def index(request):
     """Legacy view - redirects to new customer list view."""
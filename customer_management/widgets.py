@@ -0,0 +1,52 @@
+from django import forms
+from django.urls import reverse
+
+
+class CustomerAutocompleteWidget(forms.Select):
+    """
+    Customer picker that renders only the selected option.
+
+    A plain Select over a ModelChoiceField iterates the whole customer
+    table on every render. This widget keeps the ``<select>`` for form
+    submission and no-JS fallback, but only emits the chosen customer;
+    ``js/customer-autocomplete.js`` searches the rest through
+    ``customer_search_api``.
+    """
+
+    class Media:
+        js = ('js/customer-autocomplete.js',)
+
+    def __init__(self, attrs=None, include_inactive=False):
+        super().__init__(attrs)
+        self.include_inactive = include_inactive
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        url = reverse('customer_management:customer_search_api')
+        if self.include_inactive:
+            url += '?include_inactive=1'
+        context['widget']['attrs']['data-autocomplete-url'] = url
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        """Build options for the empty choice and the selected customer only."""
+        default = (None, [], 0)
+        groups = [default]
+        field = self.choices.field
+
+        if field.empty_label is not None:
+            default[1].append(self.create_option(name, '', field.empty_label, False, 0))
+
+        selected = [v for v in value if str(v).isdigit()]
+        if not selected:
+            return groups
+
+        for customer in field.queryset.filter(pk__in=selected):
+            default[1].append(self.create_option(
+                name,
+                str(customer.pk),
+                field.label_from_instance(customer),
+                True,
+                len(default[1]),
+            ))
+        return groups
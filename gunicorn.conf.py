@@ -0,0 +1,27 @@
+"""
+Gunicorn settings (picked up automatically from the working directory).
+
+For /metrics to cover every worker, export ``PROMETHEUS_MULTIPROC_DIR``
+before starting gunicorn, pointing at a directory only this server uses:
+
+    PROMETHEUS_MULTIPROC_DIR=/run/customer360-metrics gunicorn customer360.wsgi
+
+Workers write their metrics to mmap'd files there; the hooks below
+start each server with an empty directory and drop the live gauges of
+workers that exit.
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.utils.html import format_html
+from customer_management.admin import ChunkedBulkActionMixin
 from .models import Interaction
 
 
 @admin.register(Interaction)
-class InteractionAdmin(admin.ModelAdmin):
+class InteractionAdmin(ChunkedBulkActionMixin, admin.ModelAdmin):
     """
     Enhanced admin interface for Interaction model.
     """
@@ -95,22 +96,28 @@ class InteractionAdmin(admin.ModelAdmin):
 
     def mark_as_completed(self, request, queryset):
         """Bulk mark interactions as completed."""
-        updated = queryset.update(status='completed')
-        self.message_user(request, f'{updated} interactions marked as completed.')
+        return self.chunked_update(
+            request, queryset, {'status': 'completed'},
+            "Mark as completed", '{count} interactions marked as completed.'
+        )
     
     mark_as_completed.short_description = "Mark as completed"
 
     def mark_as_pending(self, request, queryset):
         """Bulk mark interactions as pending."""
-        updated = queryset.update(status='pending')
-        self.message_user(request, f'{updated} interactions marked as pending.')
+        return self.chunked_update(
+            request, queryset, {'status': 'pending'},
+            "Mark as pending", '{count} interactions marked as pending.'
+        )
     
     mark_as_pending.short_description = "Mark as pending"
 
     def mark_as_follow_up(self, request, queryset):
         """Bulk mark interactions as requiring follow-up."""
-        updated = queryset.update(status='follow_up')
-        self.message_user(request, f'{updated} interactions marked as requiring follow-up.')
+        return self.chunked_update(
+            request, queryset, {'status': 'follow_up'},
+            "Mark as follow-up required", '{count} interactions marked as requiring follow-up.'
+        )
     
     mark_as_follow_up.short_description = "Mark as follow-up required"
 
@@ -1,7 +1,13 @@
+from datetime import timedelta
+
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Interaction
 from customer_management.models import Customer
+from customer_management.widgets import CustomerAutocompleteWidget
+from customer360 import identity
+from customer360.daterange import range_lookups
 
 
 class InteractionForm(forms.ModelForm):
@@ -13,10 +19,10 @@ class InteractionForm(forms.ModelForm):
         model = Interaction
         fields = ['customer', 'channel', 'direction', 'status', 'summary', 'notes', 'created_by']
         widgets = {
-            'customer': forms.Select(attrs={
+            'customer': CustomerAutocompleteWidget(attrs={
                 'class': 'form-control',
                 'required': True
-            }),
+            }, include_inactive=True),
             'channel': forms.Select(attrs={
                 'class': 'form-control',
                 'required': True
@@ -52,7 +58,7 @@ class InteractionForm(forms.ModelForm):
         # If customer_id is provided, set it as initial and hide the field
         if customer_id:
             try:
-                customer = Customer.objects.get(id=customer_id)
+                customer = identity.get(Customer, customer_id)
                 self.fields['customer'].initial = customer
                 self.fields['customer'].widget = forms.HiddenInput()
             except Customer.DoesNotExist:
@@ -76,7 +82,7 @@ class InteractionFilterForm(forms.Form):
         queryset=Customer.objects.filter(is_active=True),
         required=False,
         empty_label="All Customers",
-        widget=forms.Select(attrs={'class': 'form-control'})
+        widget=CustomerAutocompleteWidget(attrs={'class': 'form-control'})
     )
     
     channel = forms.ChoiceField(
@@ -111,4 +117,94 @@ class InteractionFilterForm(forms.Form):
             'class': 'form-control',
             'type': 'date'
         })
-    )
\ No newline at end of file
+    )
+
+    def date_lookups(self):
+        """
+        Range lookups on interaction_date for the chosen days (inclusive).
+
+        Call after ``is_valid()``; a date that failed to clean is left out.
+        """
+        return range_lookups(
+            'interaction_date', self.cleaned_data.get('date_from'), self.cleaned_data.get('date_to')
+        )
+
+
+class TrendsForm(forms.Form):
+    """
+    Range, bucket size, grouping and filters for the interaction trends.
+    """
+    MAX_DAYS = 366 * 5
+
+    start = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    end = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    granularity = forms.ChoiceField(
+        choices=[('day', 'Daily'), ('week', 'Weekly'), ('month', 'Monthly')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    group_by = forms.ChoiceField(
+        choices=[('', 'No grouping'), ('channel', 'Channel'), ('direction', 'Direction'), ('status', 'Status')],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    window = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=90,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Moving average'})
+    )
+
+    channel = forms.ChoiceField(
+        choices=[('', 'All Channels')] + Interaction.CHANNEL_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    direction = forms.ChoiceField(
+        choices=[('', 'All Directions')] + Interaction.DIRECTION_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    status = forms.ChoiceField(
+        choices=[('', 'All Statuses')] + Interaction.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        end = cleaned_data.get('end') or timezone.localdate()
+        start = cleaned_data.get('start') or end - timedelta(days=89)
+        if start > end:
+            raise ValidationError("Start date must be on or before the end date.")
+        if (end - start).days >= self.MAX_DAYS:
+            raise ValidationError(f"Date range can span at most {self.MAX_DAYS} days.")
+        cleaned_data['start'] = start
+        cleaned_data['end'] = end
+        cleaned_data['granularity'] = cleaned_data.get('granularity') or 'day'
+        cleaned_data['group_by'] = cleaned_data.get('group_by') or None
+        return cleaned_data
+
+    def trend_params(self):
+        """Keyword arguments for :func:`interactions.trends.get_trends`."""
+        data = self.cleaned_data
+        return {
+            'start': data['start'],
+            'end': data['end'],
+            'granularity': data['granularity'],
+            'group_by': data['group_by'],
+            'window': data.get('window'),
+            'filters': {field: data.get(field) for field in ('channel', 'direction', 'status')},
+        }
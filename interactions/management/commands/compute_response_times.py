@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from interactions.sla import compute_response_times
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute response-time percentiles per day, channel and agent for "
+        "recent inbound contacts. Run it on a schedule, e.g. hourly from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help="Recompute contacts from this many days back (default: 30)",
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Recompute the whole interaction history",
+        )
+
+    def handle(self, *args, **options):
+        start = None if options['all'] else timezone.localdate() - timedelta(days=options['days'])
+        written = compute_response_times(start=start)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} response time summaries"))
@@ -0,0 +1,66 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer360.batch import Checkpoint
+from interactions.snapshots import SnapshotRebuildJob, rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every customer's profile snapshot from interaction history, "
+        "in parallel pk-range chunks. An interrupted run resumes from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Customers per grouped query and transaction (default: 1000)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.BATCH_WORKERS,
+            help=f"Worker processes; 1 runs in-process (default: {settings.BATCH_WORKERS})",
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help="Maximum customers per second across all workers",
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help="Ignore the checkpoint of an earlier interrupted run",
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint.for_job(SnapshotRebuildJob())
+        if options['restart']:
+            checkpoint.clear()
+        started = time.monotonic()
+
+        def progress(result, total):
+            rate = result.processed / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"Rebuilt {result.processed}/{total} snapshots ({rate:.0f}/s)")
+
+        result = rebuild_snapshots(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            rate=options['rate'],
+            checkpoint=checkpoint,
+            progress=progress,
+        )
+        if result.resumed_after is not None:
+            self.stdout.write(f"Resumed after customer {result.resumed_after}")
+        if result.failed:
+            for after, last, error in result.failed:
+                self.stderr.write(f"Customers ({after}, {last}] failed: {error}")
+            raise CommandError(
+                f"{len(result.failed)} chunks failed; re-run to resume from the checkpoint."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {result.processed} customer snapshots"))
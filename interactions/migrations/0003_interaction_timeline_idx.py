@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0002_auto_20251106_1323'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(fields=['customer', '-interaction_date', '-id'], name='interaction_timeline_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0003_bulkactionjob'),
+        ('interactions', '0003_interaction_timeline_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSnapshot',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='customer_management.customer')),
+                ('total_interactions', models.PositiveIntegerField(default=0)),
+                ('inbound_count', models.PositiveIntegerField(default=0)),
+                ('outbound_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('follow_up_count', models.PositiveIntegerField(default=0)),
+                ('channel_mix', models.JSONField(default=dict, help_text='Interaction count per channel')),
+                ('first_contact', models.JSONField(default=dict, help_text='Earliest interaction datetime per channel (ISO 8601)')),
+                ('last_contact', models.JSONField(default=dict, help_text='Latest interaction datetime per channel (ISO 8601)')),
+                ('last_interaction_at', models.DateTimeField(blank=True, null=True)),
+                ('last_agent', models.CharField(blank=True, help_text='created_by of the most recent interaction', max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Customer Snapshot',
+                'verbose_name_plural': 'Customer Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0004_customersnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interaction',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='interaction',
+            name='claimed_by',
+            field=models.CharField(blank=True, help_text='Agent currently working this item on the worklist', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'follow_up'])), fields=['interaction_date', 'id'], name='interaction_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'follow_up'])), fields=['created_by', 'interaction_date', 'id'], name='interaction_open_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'follow_up'])), fields=['channel', 'interaction_date', 'id'], name='interaction_open_channel_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0005_worklist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseTimeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Local date of the inbound contact')),
+                ('channel', models.CharField(choices=[('phone', 'Phone'), ('sms', 'SMS'), ('email', 'Email'), ('letter', 'Letter'), ('social_media', 'Social Media'), ('in_person', 'In Person'), ('chat', 'Live Chat')], help_text='Channel of the inbound contact', max_length=15)),
+                ('agent', models.CharField(blank=True, help_text='created_by of the reply; empty for all agents', max_length=100)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('mean_seconds', models.FloatField()),
+                ('p50_seconds', models.FloatField()),
+                ('p90_seconds', models.FloatField()),
+                ('p95_seconds', models.FloatField()),
+                ('max_seconds', models.FloatField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Response Time Summary',
+                'verbose_name_plural': 'Response Time Summaries',
+                'ordering': ['-day', 'channel', 'agent'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='responsetimesummary',
+            constraint=models.UniqueConstraint(fields=('day', 'channel', 'agent'), name='response_time_summary_unique'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
-from customer_management.models import Customer
+from customer_management.models import ChangeLoggedMixin, Customer
 
 
-class Interaction(models.Model):
+class Interaction(ChangeLoggedMixin, models.Model):
     """
     Interaction model to track customer communications.
     """
@@ -28,6 +29,9 @@ class Interaction(models.Model):
         ('follow_up', 'Follow-up Required'),
     ]
 
+    # Statuses that keep an interaction on the follow-up worklist
+    OPEN_STATUSES = ['pending', 'follow_up']
+
     customer = models.ForeignKey(
         Customer,
         on_delete=models.CASCADE,
@@ -61,9 +65,39 @@ class Interaction(models.Model):
         blank=True,
         help_text="User who created this interaction"
     )
+    claimed_by = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Agent currently working this item on the worklist"
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['-interaction_date']
+        indexes = [
+            # Serves the keyset-paginated per-customer timeline.
+            models.Index(
+                fields=['customer', '-interaction_date', '-id'],
+                name='interaction_timeline_idx',
+            ),
+            # Partial indexes covering only open items, so the worklist
+            # stays small and ordered however large the table grows.
+            models.Index(
+                fields=['interaction_date', 'id'],
+                name='interaction_open_idx',
+                condition=Q(status__in=['pending', 'follow_up']),
+            ),
+            models.Index(
+                fields=['created_by', 'interaction_date', 'id'],
+                name='interaction_open_agent_idx',
+                condition=Q(status__in=['pending', 'follow_up']),
+            ),
+            models.Index(
+                fields=['channel', 'interaction_date', 'id'],
+                name='interaction_open_channel_idx',
+                condition=Q(status__in=['pending', 'follow_up']),
+            ),
+        ]
         verbose_name = 'Interaction'
         verbose_name_plural = 'Interactions'
 
@@ -71,4 +105,104 @@ class Interaction(models.Model):
         return f"{self.customer.name} - {self.get_channel_display()} ({self.interaction_date.strftime('%Y-%m-%d')})"
 
     def get_absolute_url(self):
-        return reverse('interactions:interaction_detail', kwargs={'pk': self.pk})
\ No newline at end of file
+        return reverse('interactions:interaction_detail', kwargs={'pk': self.pk})
+
+
+class CustomerSnapshot(models.Model):
+    """
+    Precomputed Customer 360 profile, one row per customer.
+
+    Kept current by the receivers in ``interactions.signals`` and rebuilt
+    in bulk with ``manage.py rebuild_customer_snapshots``.
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot'
+    )
+    total_interactions = models.PositiveIntegerField(default=0)
+    inbound_count = models.PositiveIntegerField(default=0)
+    outbound_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    follow_up_count = models.PositiveIntegerField(default=0)
+    channel_mix = models.JSONField(
+        default=dict,
+        help_text="Interaction count per channel"
+    )
+    first_contact = models.JSONField(
+        default=dict,
+        help_text="Earliest interaction datetime per channel (ISO 8601)"
+    )
+    last_contact = models.JSONField(
+        default=dict,
+        help_text="Latest interaction datetime per channel (ISO 8601)"
+    )
+    last_interaction_at = models.DateTimeField(null=True, blank=True)
+    last_agent = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="created_by of the most recent interaction"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Customer Snapshot'
+        verbose_name_plural = 'Customer Snapshots'
+
+    def __str__(self):
+        return f"Snapshot for customer {self.customer_id}"
+
+    @property
+    def inbound_ratio(self):
+        """Share of interactions that were inbound, between 0 and 1."""
+        if not self.total_interactions:
+            return 0
+        return self.inbound_count / self.total_interactions
+
+    @property
+    def open_count(self):
+        return self.pending_count + self.follow_up_count
+
+
+class ResponseTimeSummary(models.Model):
+    """
+    Precomputed response-time percentiles for one day and channel.
+
+    A response is the time from the first inbound interaction a customer
+    is waiting on to our next outbound interaction with them. Rows with
+    an empty ``agent`` cover all agents; the others cover the agent who
+    sent the reply. Written by ``manage.py compute_response_times``.
+    """
+    day = models.DateField(help_text="Local date of the inbound contact")
+    channel = models.CharField(
+        max_length=15,
+        choices=Interaction.CHANNEL_CHOICES,
+        help_text="Channel of the inbound contact"
+    )
+    agent = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="created_by of the reply; empty for all agents"
+    )
+    responses = models.PositiveIntegerField(default=0)
+    mean_seconds = models.FloatField()
+    p50_seconds = models.FloatField()
+    p90_seconds = models.FloatField()
+    p95_seconds = models.FloatField()
+    max_seconds = models.FloatField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-day', 'channel', 'agent']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'channel', 'agent'],
+                name='response_time_summary_unique',
+            ),
+        ]
+        verbose_name = 'Response Time Summary'
+        verbose_name_plural = 'Response Time Summaries'
+
+    def __str__(self):
+        return f"{self.day} {self.channel} {self.agent or 'all agents'}: p50 {self.p50_seconds:.0f}s"
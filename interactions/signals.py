@@ -0,0 +1,119 @@
+"""
+Signal receivers keeping derived interaction data in sync.
+"""
+from django.apps import apps as global_apps
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from customer360 import metrics
+from customer_management import callerid, changelog
+from customer_management.models import Customer
+from customer_management.signals import bulk_updated
+from .models import CustomerSnapshot, Interaction
+from .snapshots import apply_new_interaction, backfill_snapshots, refresh_snapshots
+from .worklist import invalidate_queue_counts
+
+
+@receiver(pre_save, sender=Interaction)
+def remember_previous_customer(sender, instance, **kwargs):
+    """Note the stored customer so a reassignment refreshes both snapshots."""
+    if instance.pk and not instance._state.adding:
+        instance._previous_customer_id = (
+            Interaction.objects.filter(pk=instance.pk)
+            .values_list('customer_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Interaction)
+def update_snapshot_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_new_interaction(instance)
+        return
+    customer_ids = {instance.customer_id}
+    previous = getattr(instance, '_previous_customer_id', None)
+    if previous:
+        customer_ids.add(previous)
+    refresh_snapshots(customer_ids)
+
+
+@receiver(post_delete, sender=Interaction)
+def update_snapshot_on_delete(sender, instance, origin=None, **kwargs):
+    # Cascades from a customer delete take the snapshot with them.
+    if isinstance(origin, Customer) or getattr(origin, 'model', None) is Customer:
+        return
+    refresh_snapshots([instance.customer_id])
+
+
+@receiver(bulk_updated, sender=Interaction)
+def update_snapshots_on_bulk_update(sender, pks, values, previous_customer_ids=(), **kwargs):
+    """Refresh every customer touched by one bulk-update chunk at once."""
+    customer_ids = (
+        Interaction.objects.filter(pk__in=pks)
+        .order_by()
+        .values_list('customer_id', flat=True)
+        .distinct()
+    )
+    refresh_snapshots(set(customer_ids) | set(previous_customer_ids))
+
+
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+@receiver(bulk_updated, sender=Interaction)
+def invalidate_worklist_counts(sender, **kwargs):
+    invalidate_queue_counts()
+
+
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+def invalidate_caller_id(sender, instance, **kwargs):
+    callerid.invalidate_customers([instance.customer_id])
+
+
+@receiver(bulk_updated, sender=Interaction)
+def invalidate_caller_id_bulk(sender, pks, previous_customer_ids=(), **kwargs):
+    customer_ids = set(
+        Interaction.objects.filter(pk__in=pks).order_by().values_list('customer_id', flat=True).distinct()
+    )
+    callerid.invalidate_customers(customer_ids | set(previous_customer_ids))
+
+
+@receiver(post_save, sender=Interaction)
+def log_interaction_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    changelog.record(instance, 'create' if created else 'update')
+
+
+@receiver(post_delete, sender=Interaction)
+def log_interaction_delete(sender, instance, **kwargs):
+    changelog.record(instance, 'delete')
+
+
+@receiver(bulk_updated, sender=Interaction)
+def log_interaction_bulk_update(sender, pks, **kwargs):
+    changelog.record_bulk(sender, pks)
+
+
+@receiver(post_save, sender=Interaction)
+def count_created_interaction(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        channel = instance.channel
+        transaction.on_commit(lambda: metrics.INTERACTIONS_CREATED.labels(channel).inc())
+
+
+def backfill_snapshots_after_migrate(sender, using, apps=global_apps, verbosity=1, **kwargs):
+    """``post_migrate`` receiver giving existing customers their snapshot."""
+    try:
+        apps.get_model('interactions', 'CustomerSnapshot')
+    except LookupError:
+        # Migrated back to before the snapshot table existed.
+        return
+    if using != router.db_for_write(CustomerSnapshot):
+        return
+    built = backfill_snapshots()
+    if built and verbosity >= 1:
+        print(f"  Built {built} customer snapshots.")
@@ -0,0 +1,119 @@
+"""
+Response-time (SLA) analytics.
+
+A customer's inbound contacts are answered by our next outbound
+interaction with them; consecutive inbounds before that reply count as
+one wait, timed from the first. Where the database supports window
+functions, ``LAG(direction)`` over each customer's history keeps only the
+rows that start a wait or end one, so little more than two rows per reply
+leave the database. Otherwise every interaction is streamed in customer
+order. Either way the rows are paired in a single pass and reduced to
+per-day, per-channel percentiles stored in :class:`ResponseTimeSummary`.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import connections, router, transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from customer360.daterange import range_lookups
+from .models import Interaction, ResponseTimeSummary
+
+PERCENTILES = [50, 90, 95]
+UNASSIGNED = '(unassigned)'
+ROW_FIELDS = ['customer_id', 'direction', 'interaction_date', 'channel', 'created_by']
+ORDERING = ['customer_id', 'interaction_date', 'id']
+
+
+def _supports_window_functions():
+    connection = connections[router.db_for_read(Interaction)]
+    return connection.features.supports_over_clause
+
+
+def response_rows(start=None):
+    """
+    Customer-ordered interaction rows needed to time responses.
+
+    Interactions before ``start`` are not considered, so a wait that began
+    earlier is timed from its first inbound on or after ``start``.
+    """
+    queryset = Interaction.objects.filter(**range_lookups('interaction_date', start)).order_by(*ORDERING)
+    if _supports_window_functions():
+        queryset = queryset.annotate(
+            previous_direction=Window(
+                Lag('direction'),
+                partition_by=[F('customer_id')],
+                order_by=[F('interaction_date').asc(), F('id').asc()],
+            )
+        ).filter(
+            # Inbounds that start a wait and outbounds that end one.
+            Q(direction='inbound') & (Q(previous_direction__isnull=True) | Q(previous_direction='outbound'))
+            | Q(direction='outbound', previous_direction='inbound')
+        )
+    return queryset.values_list(*ROW_FIELDS).iterator(chunk_size=2000)
+
+
+def pair_responses(rows):
+    """
+    Yield ``(channel, agent, inbound_at, replied_at)`` per answered wait.
+
+    ``rows`` are ``ROW_FIELDS`` tuples ordered by customer and date. Extra
+    inbound rows inside a wait and outbound rows nobody was waiting on are
+    skipped, so the full history and the pre-filtered rows give the same
+    result.
+    """
+    customer = waiting = None
+    for customer_id, direction, at, channel, created_by in rows:
+        if customer_id != customer:
+            customer, waiting = customer_id, None
+        if direction == 'inbound':
+            if waiting is None:
+                waiting = (at, channel)
+        elif waiting is not None:
+            yield waiting[1], created_by or UNASSIGNED, waiting[0], at
+            waiting = None
+
+
+def summarize(responses):
+    """Group response pairs into unsaved summaries per (day, channel, agent)."""
+    groups = defaultdict(list)
+    for channel, agent, inbound_at, replied_at in responses:
+        day = timezone.localdate(inbound_at)
+        seconds = (replied_at - inbound_at).total_seconds()
+        groups[day, channel, ''].append(seconds)
+        groups[day, channel, agent].append(seconds)
+
+    summaries = []
+    for (day, channel, agent), values in groups.items():
+        values = np.array(values)
+        p50, p90, p95 = np.percentile(values, PERCENTILES)
+        summaries.append(ResponseTimeSummary(
+            day=day, channel=channel, agent=agent, responses=len(values),
+            mean_seconds=float(values.mean()), p50_seconds=float(p50),
+            p90_seconds=float(p90), p95_seconds=float(p95), max_seconds=float(values.max()),
+        ))
+    return summaries
+
+
+def compute_response_times(start=None, end=None):
+    """
+    Recompute the summaries for inbound contacts on days ``start``..``end``.
+
+    Replies after ``end`` still count for waits that began inside the
+    range. Returns the number of summary rows written.
+    """
+    summaries = [
+        summary for summary in summarize(pair_responses(response_rows(start)))
+        if (start is None or summary.day >= start) and (end is None or summary.day <= end)
+    ]
+    stale = ResponseTimeSummary.objects.all()
+    if start:
+        stale = stale.filter(day__gte=start)
+    if end:
+        stale = stale.filter(day__lte=end)
+    with transaction.atomic():
+        stale.delete()
+        ResponseTimeSummary.objects.bulk_create(summaries, batch_size=1000)
+    return len(summaries)
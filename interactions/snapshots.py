@@ -0,0 +1,180 @@
+"""
+Maintenance of CustomerSnapshot rows.
+
+New interactions are applied as deltas to the existing row. Edits,
+deletes and bulk updates recompute the affected customers from one
+grouped query, and ``rebuild_snapshots`` does the same for whole ranges
+of customers. Customers without a snapshot get one after ``migrate`` or
+on first access through :func:`get_snapshot`.
+"""
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+
+from customer360.batch import BatchJob, BatchRunner
+from customer360.db_router import use_primary
+from customer_management.models import Customer
+from .models import CustomerSnapshot, Interaction
+
+SNAPSHOT_FIELDS = [
+    'total_interactions', 'inbound_count', 'outbound_count', 'pending_count',
+    'follow_up_count', 'channel_mix', 'first_contact', 'last_contact',
+    'last_interaction_at', 'last_agent',
+]
+
+
+def _apply_group(snapshot, channel, direction, status, count, first, last):
+    """Fold one (channel, direction, status) group into ``snapshot``."""
+    snapshot.total_interactions += count
+    if direction == 'inbound':
+        snapshot.inbound_count += count
+    else:
+        snapshot.outbound_count += count
+    if status == 'pending':
+        snapshot.pending_count += count
+    elif status == 'follow_up':
+        snapshot.follow_up_count += count
+
+    snapshot.channel_mix[channel] = snapshot.channel_mix.get(channel, 0) + count
+    first_iso, last_iso = first.isoformat(), last.isoformat()
+    if channel not in snapshot.first_contact or first_iso < snapshot.first_contact[channel]:
+        snapshot.first_contact[channel] = first_iso
+    if channel not in snapshot.last_contact or last_iso > snapshot.last_contact[channel]:
+        snapshot.last_contact[channel] = last_iso
+    if snapshot.last_interaction_at is None or last > snapshot.last_interaction_at:
+        snapshot.last_interaction_at = last
+
+
+def build_snapshots(customer_ids):
+    """
+    Compute fresh (unsaved) snapshots for ``customer_ids``.
+
+    Runs two queries regardless of how many customers are passed: one
+    grouped aggregate over their interactions and one for the last agent.
+    """
+    snapshots = {pk: CustomerSnapshot(customer_id=pk) for pk in customer_ids}
+    if not snapshots:
+        return snapshots
+
+    groups = (
+        Interaction.objects.filter(customer_id__in=snapshots)
+        .order_by()
+        .values('customer_id', 'channel', 'direction', 'status')
+        .annotate(count=Count('id'), first=Min('interaction_date'), last=Max('interaction_date'))
+    )
+    for group in groups:
+        _apply_group(
+            snapshots[group['customer_id']], group['channel'], group['direction'],
+            group['status'], group['count'], group['first'], group['last'],
+        )
+
+    latest = Interaction.objects.filter(customer=OuterRef('pk')).order_by('-interaction_date', '-id')
+    agents = (
+        Customer.objects.filter(pk__in=snapshots)
+        .annotate(last_agent=Subquery(latest.values('created_by')[:1]))
+        .values_list('pk', 'last_agent')
+    )
+    for pk, last_agent in agents:
+        snapshots[pk].last_agent = last_agent or ''
+    return snapshots
+
+
+def save_snapshots(snapshots):
+    """Insert or overwrite snapshot rows in one statement."""
+    CustomerSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=SNAPSHOT_FIELDS + ['updated_at'],
+    )
+
+
+def refresh_snapshots(customer_ids):
+    """Recompute and store snapshots for the given customers."""
+    # Read from the primary even in replica-read views: a snapshot built
+    # from a lagging replica would stay wrong until the next recompute.
+    with use_primary():
+        snapshots = build_snapshots(set(customer_ids))
+    save_snapshots(list(snapshots.values()))
+    return snapshots
+
+
+def apply_new_interaction(interaction):
+    """
+    Fold a newly created interaction into its customer's snapshot.
+
+    Falls back to a full recompute when the customer has no snapshot yet,
+    since the delta alone would ignore any earlier history.
+    """
+    with transaction.atomic():
+        snapshot = (
+            CustomerSnapshot.objects.select_for_update()
+            .filter(customer_id=interaction.customer_id)
+            .first()
+        )
+        if snapshot is None:
+            refresh_snapshots([interaction.customer_id])
+            return
+
+        _apply_group(
+            snapshot, interaction.channel, interaction.direction, interaction.status,
+            1, interaction.interaction_date, interaction.interaction_date,
+        )
+        if snapshot.last_interaction_at == interaction.interaction_date:
+            snapshot.last_agent = interaction.created_by
+        snapshot.save()
+
+
+def get_snapshot(customer):
+    """
+    Return the customer's snapshot, building it on first access.
+
+    Use ``select_related('snapshot')`` on querysets whose customers all go
+    through here, so only customers without a snapshot cost a query.
+    """
+    try:
+        return customer.snapshot
+    except CustomerSnapshot.DoesNotExist:
+        snapshot = refresh_snapshots([customer.pk])[customer.pk]
+        customer.snapshot = snapshot
+        return snapshot
+
+
+def backfill_snapshots(batch_size=1000):
+    """
+    Build snapshots for every customer that has none yet.
+
+    Covers customers created before snapshots existed; run after each
+    ``migrate``. Returns the number of snapshots built.
+    """
+    missing = Customer.objects.filter(snapshot__isnull=True).order_by('pk').values_list('pk', flat=True)
+    built = 0
+    while True:
+        pks = list(missing[:batch_size])
+        if not pks:
+            return built
+        built += len(refresh_snapshots(pks))
+
+
+class SnapshotRebuildJob(BatchJob):
+    """Recompute the snapshots of every customer, one pk range per chunk."""
+    name = 'rebuild_customer_snapshots'
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+
+    def get_queryset(self):
+        return Customer.objects.all()
+
+    def process_chunk(self, queryset):
+        return len(refresh_snapshots(queryset.values_list('pk', flat=True)))
+
+
+def rebuild_snapshots(batch_size=1000, **runner_options):
+    """
+    Rebuild every customer's snapshot in pk-ordered batches.
+
+    ``runner_options`` go to :class:`~customer360.batch.BatchRunner`
+    (workers, checkpoint, progress, ...). Returns the number of snapshots
+    written.
+    """
+    return BatchRunner(SnapshotRebuildJob(batch_size), **runner_options).run()
@@ -1,3 +1,463 @@
-from django.test import TestCase
+import tempfile
+import zoneinfo
+from datetime import date, datetime, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from customer360.daterange import day_range
+from customer_management.models import Customer
+from customer_management.serializers import CustomerListSerializer
+from .forms import InteractionFilterForm, InteractionForm
+from customer_management.bulk import submit_bulk_update
+from . import sla, trends, worklist
+from .models import CustomerSnapshot, Interaction, ResponseTimeSummary
+from .timeline import get_timeline_page
+
+
+class InteractionTestMixin:
+    """Shared fixtures for interaction tests."""
+
+    def create_customer(self, name='John Doe', email='john.doe@example.com', **kwargs):
+        return Customer.objects.create(
+            name=name,
+            email=email,
+            phone=kwargs.pop('phone', '+1234567890'),
+            address=kwargs.pop('address', '123 Main St, City, State'),
+            **kwargs
+        )
+
+    def create_interaction(self, customer, **kwargs):
+        data = {
+            'channel': 'email',
+            'direction': 'inbound',
+            'status': 'completed',
+            'summary': 'Asked about the invoice for last month',
+        }
+        data.update(kwargs)
+        return Interaction.objects.create(customer=customer, **data)
+
+
+class CustomerPickerTest(InteractionTestMixin, TestCase):
+    """Test cases for the autocomplete customer picker."""
+
+    def setUp(self):
+        self.customers = [
+            self.create_customer(name=f'Customer {c}', email=f'{c}@example.com')
+            for c in 'abcde'
+        ]
+
+    def test_filter_form_renders_only_selected_customer(self):
+        """Test that the filter form doesn't render every customer."""
+        selected = self.customers[2]
+        form = InteractionFilterForm({'customer': selected.pk})
+        with self.assertNumQueries(1):
+            html = str(form['customer'])
+        self.assertIn(selected.name, html)
+        self.assertNotIn(self.customers[0].name, html)
+        self.assertIn('data-autocomplete-url', html)
+
+    def test_unbound_form_renders_without_queries(self):
+        """Test that an empty picker doesn't touch the customer table."""
+        form = InteractionForm()
+        with self.assertNumQueries(0):
+            html = str(form['customer'])
+        self.assertNotIn(self.customers[0].name, html)
+
+    def test_validation_looks_up_chosen_customer(self):
+        """Test that validation accepts any existing customer by pk."""
+        inactive = self.create_customer(name='Old Customer', email='old@example.com', is_active=False)
+        form = InteractionForm(data={
+            'customer': inactive.pk,
+            'channel': 'phone',
+            'direction': 'outbound',
+            'status': 'completed',
+            'summary': 'Called back about their order',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['customer'], inactive)
+
+    def test_search_api_include_inactive(self):
+        """Test that the search API can include inactive customers."""
+        self.create_customer(name='Old Customer', email='old@example.com', is_active=False)
+        url = reverse('customer_management:customer_search_api')
+        self.assertEqual(len(self.client.get(url, {'q': 'Old'}).json()['customers']), 0)
+        response = self.client.get(url, {'q': 'Old', 'include_inactive': '1'})
+        self.assertEqual(len(response.json()['customers']), 1)
+
+
+
+class CustomerTimelineTest(InteractionTestMixin, TestCase):
+    """Test cases for the keyset-paginated customer timeline."""
+
+    def setUp(self):
+        self.customer = self.create_customer()
+        self.other = self.create_customer(name='Jane Doe', email='jane@example.com')
+        channels = ['email', 'phone', 'sms']
+        self.interactions = [
+            self.create_interaction(self.customer, channel=channels[i % 3])
+            for i in range(7)
+        ]
+        self.create_interaction(self.other)
+        # Force identical timestamps so the id tie-breaker is exercised.
+        Interaction.objects.filter(pk__in=[i.pk for i in self.interactions[2:5]]).update(
+            interaction_date=self.interactions[2].interaction_date
+        )
+
+    def walk(self, **filters):
+        seen, cursor = [], None
+        while True:
+            page = get_timeline_page(self.customer.pk, cursor=cursor, limit=3, **filters)
+            seen.extend(item['id'] for item in page.items)
+            if not page.has_more:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_history_once_in_order(self):
+        """Test that walking the cursor returns every row exactly once."""
+        expected = list(
+            Interaction.objects.filter(customer=self.customer)
+            .order_by('-interaction_date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.walk(), expected)
+
+    def test_channel_filter(self):
+        """Test filtering the timeline by channel."""
+        ids = self.walk(channel='phone')
+        self.assertEqual(
+            set(ids), {i.pk for i in self.interactions if i.channel == 'phone'}
+        )
+
+    def test_api_fixed_query_count(self):
+        """Test that every API page costs the same number of queries."""
+        url = reverse('interactions:customer_timeline_api', kwargs={'customer_id': self.customer.pk})
+        with self.assertNumQueries(2):
+            first = self.client.get(url, {'limit': 3}).json()
+        with self.assertNumQueries(2):
+            second = self.client.get(url, {'limit': 3, 'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['results']), 3)
+        self.assertTrue(second['has_more'])
+
+    def test_api_rejects_bad_cursor(self):
+        """Test that a malformed cursor returns 400."""
+        url = reverse('interactions:customer_timeline_api', kwargs={'customer_id': self.customer.pk})
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_timeline_page(self):
+        """Test the timeline page renders."""
+        url = reverse('interactions:customer_timeline', kwargs={'customer_id': self.customer.pk})
+        response = self.client.get(url, {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Older')
+
+
+class CustomerSnapshotTest(InteractionTestMixin, TestCase):
+    """Test cases for precomputed customer profile snapshots."""
+
+    def setUp(self):
+        self.customer = self.create_customer()
+
+    def test_snapshot_follows_new_interactions(self):
+        """Test that creating interactions updates the snapshot incrementally."""
+        self.create_interaction(self.customer, channel='email', direction='inbound', status='pending')
+        latest = self.create_interaction(
+            self.customer, channel='phone', direction='outbound', created_by='agent-7'
+        )
+
+        snapshot = CustomerSnapshot.objects.get(customer=self.customer)
+        self.assertEqual(snapshot.total_interactions, 2)
+        self.assertEqual(snapshot.channel_mix, {'email': 1, 'phone': 1})
+        self.assertEqual(snapshot.inbound_ratio, 0.5)
+        self.assertEqual(snapshot.pending_count, 1)
+        self.assertEqual(snapshot.last_agent, 'agent-7')
+        self.assertEqual(snapshot.last_interaction_at, latest.interaction_date)
+
+    def test_snapshot_follows_edits_and_deletes(self):
+        """Test that edits and deletes recompute the snapshot."""
+        interaction = self.create_interaction(self.customer, status='pending')
+        interaction.status = 'follow_up'
+        interaction.save()
+        snapshot = CustomerSnapshot.objects.get(customer=self.customer)
+        self.assertEqual((snapshot.pending_count, snapshot.follow_up_count), (0, 1))
+
+        interaction.delete()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.total_interactions, 0)
+        self.assertEqual(snapshot.channel_mix, {})
+
+    @override_settings(BULK_ACTION_BACKGROUND=False)
+    def test_snapshot_follows_bulk_actions(self):
+        """Test that chunked admin updates refresh snapshots once per chunk."""
+        for _ in range(3):
+            self.create_interaction(self.customer, status='pending')
+        submit_bulk_update(
+            Interaction.objects.all(), {'status': 'completed'}, 'Complete', chunk_size=2
+        )
+        snapshot = CustomerSnapshot.objects.get(customer=self.customer)
+        self.assertEqual(snapshot.pending_count, 0)
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command recreates missing snapshots."""
+        self.create_interaction(self.customer)
+        other = self.create_customer(name='Jane Doe', email='jane@example.com')
+        CustomerSnapshot.objects.all().delete()
+
+        with tempfile.TemporaryDirectory() as checkpoints, self.settings(BATCH_CHECKPOINT_DIR=checkpoints):
+            call_command('rebuild_customer_snapshots', batch_size=1, workers=1, stdout=StringIO())
+
+        self.assertEqual(CustomerSnapshot.objects.get(customer=self.customer).total_interactions, 1)
+        self.assertEqual(CustomerSnapshot.objects.get(customer=other).total_interactions, 0)
+
+    def test_customers_without_snapshot(self):
+        """Test that pre-existing customers show live counts and are backfilled."""
+        for _ in range(2):
+            self.create_interaction(self.customer)
+        CustomerSnapshot.objects.all().delete()
+
+        response = self.client.get(reverse('customer_management:customer_list'))
+        self.assertEqual(response.context['customers'][0].total_interactions, 2)
+        self.assertEqual(CustomerListSerializer(self.customer).data['interaction_count'], 2)
+
+        CustomerSnapshot.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(CustomerSnapshot.objects.get(customer=self.customer).total_interactions, 2)
+
+    def test_detail_page_reads_snapshot(self):
+        """Test that the customer detail page shows snapshot data."""
+        self.create_interaction(self.customer, created_by='agent-7')
+        url = reverse('customer_management:customer_detail', kwargs={'pk': self.customer.pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'agent-7')
+
+
+class WorklistTest(InteractionTestMixin, TestCase):
+    """Test cases for the follow-up worklist."""
+
+    def setUp(self):
+        self.customer = self.create_customer()
+        self.oldest = self.create_interaction(self.customer, status='pending', created_by='alice')
+        self.middle = self.create_interaction(
+            self.customer, status='follow_up', channel='phone', created_by='bob'
+        )
+        self.done = self.create_interaction(self.customer, status='completed', created_by='alice')
+        self.newest = self.create_interaction(self.customer, status='pending', created_by='alice')
+
+    def test_queue_is_open_items_oldest_first(self):
+        """Test that the worklist lists only open items, oldest first."""
+        self.assertEqual(worklist.get_queue(), [self.oldest, self.middle, self.newest])
+        self.assertEqual(worklist.get_queue(agent='alice'), [self.oldest, self.newest])
+        self.assertEqual(worklist.get_queue(channel='phone'), [self.middle])
+
+    def test_claim_is_exclusive(self):
+        """Test that only the first agent can claim an item."""
+        self.assertTrue(worklist.claim(self.oldest.pk, 'carol'))
+        self.assertFalse(worklist.claim(self.oldest.pk, 'dave'))
+        self.oldest.refresh_from_db()
+        self.assertEqual(self.oldest.claimed_by, 'carol')
+        self.assertEqual(worklist.get_queue(unclaimed=True), [self.middle, self.newest])
+
+    def test_complete_updates_counts_and_snapshot(self):
+        """Test that completing an item refreshes cached counts and the snapshot."""
+        self.assertEqual(worklist.get_queue_counts()['by_agent'], {'alice': 2, 'bob': 1})
+        self.assertTrue(worklist.complete(self.oldest.pk, 'alice'))
+        self.assertFalse(worklist.complete(self.oldest.pk, 'alice'))
+
+        counts = worklist.get_queue_counts()
+        self.assertEqual(counts['total'], 2)
+        self.assertEqual(counts['by_agent'], {'alice': 1, 'bob': 1})
+        self.assertEqual(CustomerSnapshot.objects.get(customer=self.customer).pending_count, 1)
+
+    def test_claim_view(self):
+        """Test claiming through the view with a JSON response."""
+        url = reverse('interactions:interaction_claim', kwargs={'pk': self.middle.pk})
+        response = self.client.post(url, {'agent': 'carol'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'ok': True})
+        response = self.client.post(url, {'agent': 'dave'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_only_claim_holder_can_complete_or_release(self):
+        """Test that another agent, or no agent, can't close a claimed item."""
+        worklist.claim(self.middle.pk, 'carol')
+        self.assertFalse(worklist.complete(self.middle.pk, 'dave'))
+        self.assertFalse(worklist.release(self.oldest.pk, ''))
+
+        url = reverse('interactions:interaction_complete', kwargs={'pk': self.middle.pk})
+        response = self.client.post(url, {}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'agent': 'dave'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.post(url, {'agent': 'carol'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'ok': True})
+
+    def test_next_must_be_local(self):
+        """Test that the post-action redirect ignores off-site ``next`` URLs."""
+        url = reverse('interactions:interaction_claim', kwargs={'pk': self.middle.pk})
+        response = self.client.post(url, {'agent': 'carol', 'next': 'https://evil.example/'})
+        self.assertRedirects(response, reverse('interactions:worklist'), fetch_redirect_response=False)
+        response = self.client.post(url, {'agent': 'carol', 'next': '/interactions/worklist/?agent=bob'})
+        self.assertEqual(response['Location'], '/interactions/worklist/?agent=bob')
+
+    def test_worklist_page_and_api(self):
+        """Test the worklist page and API render."""
+        response = self.client.get(reverse('interactions:worklist'))
+        self.assertContains(response, 'Follow-up Worklist')
+        data = self.client.get(reverse('interactions:worklist_api'), {'agent': 'bob'}).json()
+        self.assertEqual([row['id'] for row in data['results']], [self.middle.pk])
+        self.assertEqual(data['counts']['total'], 3)
+
+@override_settings(TIME_ZONE='America/New_York')
+class DateRangeFilterTest(InteractionTestMixin, TestCase):
+    """Test cases for index-friendly date range filtering."""
+
+    def setUp(self):
+        self.customer = self.create_customer()
+        tz = zoneinfo.ZoneInfo('America/New_York')
+        for day, hour in [(1, 0), (1, 23), (2, 23), (3, 0)]:
+            interaction = self.create_interaction(self.customer, summary=f'{day} {hour}')
+            Interaction.objects.filter(pk=interaction.pk).update(
+                interaction_date=datetime(2024, 3, day, hour, 30, tzinfo=tz)
+            )
+
+    def test_day_range_is_half_open_in_local_time(self):
+        since, until = day_range(date(2024, 3, 1), date(2024, 3, 2))
+        self.assertEqual(since.isoformat(), '2024-03-01T00:00:00-05:00')
+        self.assertEqual(until.isoformat(), '2024-03-03T00:00:00-05:00')
+
+    def test_list_filter_uses_range_without_date_cast(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(
+                reverse('interactions:interaction_list'), {'date_from': '2024-03-01', 'date_to': '2024-03-02'}
+            )
+        summaries = sorted(i.summary for i in response.context['interactions'])
+        self.assertEqual(summaries, ['1 0', '1 23', '2 23'])
+        self.assertFalse([q for q in ctx.captured_queries if 'cast_date' in q['sql']])
+
+    def test_invalid_dates_are_ignored(self):
+        response = self.client.get(reverse('interactions:interaction_list'), {'date_from': 'soon'})
+        self.assertEqual(len(response.context['interactions']), 4)
+        self.assertTrue(response.context['filter_form'].errors)
+
+    def test_valid_date_applies_when_other_is_invalid(self):
+        response = self.client.get(
+            reverse('interactions:interaction_list'), {'date_from': '2024-03-02', 'date_to': '2024-03-99'}
+        )
+        summaries = sorted(i.summary for i in response.context['interactions'])
+        self.assertEqual(summaries, ['2 23', '3 0'])
+        self.assertContains(response, 'Some filters were not applied')
+        self.assertContains(response, 'Date to: Enter a valid date.')
+
+
+@override_settings(TIME_ZONE='America/New_York')
+class TrendsTest(InteractionTestMixin, TestCase):
+    """Test cases for the interaction trend series."""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = self.create_customer()
+        tz = zoneinfo.ZoneInfo('America/New_York')
+        for day, channel in [((3, 1), 'email'), ((3, 1), 'phone'), ((3, 3), 'email'),
+                             ((3, 4), 'email'), ((4, 2), 'phone')]:
+            interaction = self.create_interaction(self.customer, channel=channel)
+            Interaction.objects.filter(pk=interaction.pk).update(
+                interaction_date=datetime(2024, *day, 23, 30, tzinfo=tz)
+            )
+
+    def test_daily_series_is_gap_filled_with_moving_average(self):
+        result = trends.compute_trends(date(2024, 3, 1), date(2024, 3, 5), window=2)
+        self.assertEqual(result['labels'], ['2024-03-01', '2024-03-02', '2024-03-03', '2024-03-04', '2024-03-05'])
+        self.assertEqual(result['total'], [2, 0, 1, 1, 0])
+        self.assertEqual(result['series'][0]['moving_average'], [2.0, 1.0, 0.5, 1.0, 0.5])
+
+    def test_weekly_and_monthly_buckets(self):
+        weekly = trends.compute_trends(date(2024, 3, 1), date(2024, 3, 11), 'week')
+        self.assertEqual(weekly['labels'], ['2024-02-26', '2024-03-04', '2024-03-11'])
+        self.assertEqual(weekly['total'], [3, 1, 0])
+        monthly = trends.compute_trends(date(2024, 2, 15), date(2024, 4, 30), 'month', group_by='channel')
+        self.assertEqual(monthly['labels'], ['2024-02-01', '2024-03-01', '2024-04-01'])
+        self.assertEqual(
+            [(s['key'], s['counts']) for s in monthly['series']],
+            [('email', [0, 3, 0]), ('phone', [0, 1, 1])],
+        )
+
+    def test_filters_and_single_query(self):
+        with self.assertNumQueries(1):
+            result = trends.compute_trends(
+                date(2024, 3, 1), date(2024, 4, 30), group_by='direction', filters={'channel': 'phone'}
+            )
+        self.assertEqual([(s['key'], s['total']) for s in result['series']], [('inbound', 2)])
+
+    def test_api_caches_and_validates(self):
+        url = reverse('interactions:trends_api')
+        params = {'start': '2024-03-01', 'end': '2024-03-31', 'granularity': 'week'}
+        self.assertEqual(self.client.get(url, params).json()['total'], [3, 1, 0, 0, 0])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, params).json()['total'], [3, 1, 0, 0, 0])
+        response = self.client.get(url, {'start': '2024-03-31', 'end': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_trends_page(self):
+        response = self.client.get(reverse('interactions:trends'), {'start': '2024-03-01', 'end': '2024-03-31'})
+        self.assertContains(response, 'Interaction Trends')
+        self.assertContains(response, 'id="trend-data"')
+
+
+@override_settings(TIME_ZONE='America/New_York')
+class ResponseTimeTest(InteractionTestMixin, TestCase):
+    """Test cases for response-time (SLA) summaries."""
+
+    def setUp(self):
+        customer = self.create_customer()
+        other = self.create_customer(name='Jane Roe', email='jane@example.com')
+        start = datetime(2024, 3, 1, 9, 0, tzinfo=zoneinfo.ZoneInfo('America/New_York'))
+        history = [
+            (customer, 0, 'inbound', 'email', ''),
+            (customer, 10, 'inbound', 'email', ''),
+            (customer, 60, 'outbound', 'email', 'alice'),
+            (customer, 90, 'outbound', 'email', 'alice'),
+            (customer, 120, 'inbound', 'phone', ''),
+            (customer, 150, 'outbound', 'phone', 'bob'),
+            (other, 5, 'inbound', 'chat', ''),
+        ]
+        for owner, minutes, direction, channel, agent in history:
+            interaction = self.create_interaction(owner, direction=direction, channel=channel, created_by=agent)
+            Interaction.objects.filter(pk=interaction.pk).update(
+                interaction_date=start + timedelta(minutes=minutes)
+            )
+
+    def test_window_rows_pair_like_full_history(self):
+        full_history = Interaction.objects.order_by(*sla.ORDERING).values_list(*sla.ROW_FIELDS)
+        expected = [(channel, agent, (replied - inbound).total_seconds())
+                    for channel, agent, inbound, replied in sla.pair_responses(full_history)]
+        self.assertEqual(expected, [('email', 'alice', 3600.0), ('phone', 'bob', 1800.0)])
+        self.assertEqual(len(list(sla.response_rows())), 5)
+        self.assertEqual(
+            [(channel, agent, (replied - inbound).total_seconds())
+             for channel, agent, inbound, replied in sla.pair_responses(sla.response_rows())],
+            expected,
+        )
+
+    def test_compute_stores_daily_summaries(self):
+        self.assertEqual(sla.compute_response_times(), 4)
+        summary = ResponseTimeSummary.objects.get(channel='email', agent='')
+        self.assertEqual((summary.day, summary.responses, summary.p50_seconds), (date(2024, 3, 1), 1, 3600.0))
+        self.assertTrue(ResponseTimeSummary.objects.filter(channel='phone', agent='bob').exists())
+        # Recomputing replaces rows instead of duplicating them.
+        call_command('compute_response_times', '--all', stdout=StringIO())
+        self.assertEqual(ResponseTimeSummary.objects.count(), 4)
+
+    def test_page_reads_summaries(self):
+        sla.compute_response_times()
+        ResponseTimeSummary.objects.update(day=timezone.localdate())
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('interactions:response_times'))
+            self.assertContains(response, 'Response Times')
+        self.assertEqual([row['name'] for row in response.context['by_agent']], ['alice', 'bob'])
+        self.assertEqual(response.context['by_channel'][0]['mean_minutes'], 60)
@@ -0,0 +1,92 @@
+"""
+Keyset-paginated interaction timeline for a single customer.
+
+Pages are addressed by an opaque cursor holding the (interaction_date, id)
+of the last row shown, so fetching page N costs the same as page 1 and
+is served by the (customer, interaction_date, id) index no matter how
+long the customer's history is.
+"""
+import base64
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Interaction
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+TIMELINE_FIELDS = [
+    'id', 'channel', 'direction', 'status', 'interaction_date', 'summary', 'created_by'
+]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a timeline cursor can't be decoded."""
+
+
+@dataclass
+class TimelinePage:
+    items: list
+    next_cursor: str = None
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(interaction_date, pk):
+    raw = f"{interaction_date.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_part, pk_part = base64.urlsafe_b64decode(padded).decode().split('|')
+        interaction_date = parse_datetime(date_part)
+        pk = int(pk_part)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+    if interaction_date is None:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return interaction_date, pk
+
+
+def get_timeline_page(customer_id, cursor=None, limit=DEFAULT_PAGE_SIZE, channel=None, status=None):
+    """
+    Return one page of a customer's interactions, newest first.
+
+    Always runs exactly one query. Rows are plain dicts with the fields in
+    ``TIMELINE_FIELDS`` plus display labels.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    queryset = Interaction.objects.filter(customer_id=customer_id)
+    if channel:
+        queryset = queryset.filter(channel=channel)
+    if status:
+        queryset = queryset.filter(status=status)
+    if cursor:
+        last_date, last_pk = decode_cursor(cursor)
+        # The redundant __lte bound keeps this a single index range scan.
+        queryset = queryset.filter(interaction_date__lte=last_date).filter(
+            Q(interaction_date__lt=last_date) | Q(interaction_date=last_date, id__lt=last_pk)
+        )
+
+    rows = list(
+        queryset.order_by('-interaction_date', '-id').values(*TIMELINE_FIELDS)[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['interaction_date'], rows[-1]['id'])
+
+    channels = dict(Interaction.CHANNEL_CHOICES)
+    directions = dict(Interaction.DIRECTION_CHOICES)
+    statuses = dict(Interaction.STATUS_CHOICES)
+    for row in rows:
+        row['channel_display'] = channels.get(row['channel'], row['channel'])
+        row['direction_display'] = directions.get(row['direction'], row['direction'])
+        row['status_display'] = statuses.get(row['status'], row['status'])
+    return TimelinePage(items=rows, next_cursor=next_cursor)
@@ -0,0 +1,146 @@
+"""
+Interaction trend series: counts per day, week or month.
+
+The database returns one row per (local day, group) from a single grouped
+query over an indexed ``interaction_date`` range. Everything after that,
+gap-filling, re-bucketing into weeks or months and the moving averages, is
+done on NumPy arrays, so the Python-level work doesn't grow with the
+number of days. Results are cached per parameter set for
+``TRENDS_CACHE_TIMEOUT`` seconds.
+"""
+import hashlib
+import json
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from customer360 import metrics
+from customer360.daterange import range_lookups
+from .models import Interaction
+
+GRANULARITIES = ['day', 'week', 'month']
+GROUP_BY_FIELDS = ['channel', 'direction', 'status']
+FILTER_FIELDS = ['channel', 'direction', 'status']
+DEFAULT_WINDOWS = {'day': 7, 'week': 4, 'month': 3}
+CACHE_PREFIX = 'trends:'
+
+
+def _bucket_keys(days, granularity):
+    """Start date of the bucket each day falls in, as datetime64[D]."""
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday.
+        weekday = (days.astype('int64') + 3) % 7
+        return days - weekday.astype('timedelta64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def moving_average(counts, window):
+    """
+    Trailing mean over ``window`` buckets along the last axis.
+
+    The first ``window - 1`` points average over the buckets available so
+    far rather than being dropped.
+    """
+    window = max(1, int(window))
+    cumulative = np.cumsum(counts, axis=-1, dtype='float64')
+    shifted = np.zeros_like(cumulative)
+    shifted[..., window:] = cumulative[..., :-window]
+    sizes = np.minimum(np.arange(1, counts.shape[-1] + 1), window)
+    return (cumulative - shifted) / sizes
+
+
+def _daily_rows(start, end, group_by, filters):
+    lookups = range_lookups('interaction_date', start, end)
+    lookups.update({field: value for field, value in filters.items() if value})
+    fields = ['day'] + ([group_by] if group_by else [])
+    return (
+        Interaction.objects.filter(**lookups)
+        .annotate(day=TruncDate('interaction_date', tzinfo=timezone.get_current_timezone()))
+        .order_by()
+        .values(*fields)
+        .annotate(count=Count('id'))
+        .values_list(*fields, 'count')
+    )
+
+
+def compute_trends(start, end, granularity='day', group_by=None, filters=None, window=None):
+    """
+    Return the trend series for days ``start``..``end`` (inclusive).
+
+    ``group_by`` is one of ``GROUP_BY_FIELDS`` or ``None`` for a single
+    total series; ``filters`` maps ``FILTER_FIELDS`` to required values.
+    Buckets without interactions are present with a count of zero.
+    """
+    filters = filters or {}
+    window = window or DEFAULT_WINDOWS[granularity]
+    rows = list(_daily_rows(start, end, group_by, filters))
+
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    if group_by:
+        day_values, group_values, counts = zip(*rows) if rows else ((), (), ())
+        keys = sorted(set(group_values))
+    else:
+        day_values, counts = zip(*rows) if rows else ((), ())
+        group_values, keys = [None] * len(counts), [None]
+
+    # Scatter the sparse rows into a dense (series x day) matrix; days with
+    # no rows simply stay zero.
+    daily = np.zeros((len(keys), len(days)), dtype='int64')
+    if rows:
+        day_index = (np.array(day_values, dtype='datetime64[D]') - days[0]).astype('int64')
+        if group_by:
+            series_index = np.searchsorted(np.array(keys), np.array(group_values))
+        else:
+            series_index = np.zeros(len(counts), dtype='int64')
+        np.add.at(daily, (series_index, day_index), np.array(counts, dtype='int64'))
+
+    bucket_keys = _bucket_keys(days, granularity)
+    starts = np.flatnonzero(np.r_[True, bucket_keys[1:] != bucket_keys[:-1]])
+    bucketed = np.add.reduceat(daily, starts, axis=1) if len(days) else daily
+    averages = moving_average(bucketed, window)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'group_by': group_by,
+        'filters': {field: value for field, value in filters.items() if value},
+        'window': window,
+        'labels': [str(label) for label in bucket_keys[starts]],
+        'series': [
+            {
+                'key': key if group_by else 'total',
+                'counts': bucketed[i].tolist(),
+                'moving_average': np.round(averages[i], 2).tolist(),
+                'total': int(bucketed[i].sum()),
+            }
+            for i, key in enumerate(keys)
+        ],
+        'total': bucketed.sum(axis=0).tolist(),
+    }
+
+
+def cache_key(**params):
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return CACHE_PREFIX + hashlib.sha1(payload.encode()).hexdigest()
+
+
+def get_trends(start, end, granularity='day', group_by=None, filters=None, window=None):
+    """:func:`compute_trends` behind the cache."""
+    filters = {field: value for field, value in (filters or {}).items() if value}
+    key = cache_key(
+        start=start, end=end, granularity=granularity, group_by=group_by,
+        filters=filters, window=window, tz=timezone.get_current_timezone_name(),
+    )
+    result = cache.get(key)
+    metrics.record_cache('trends', result is not None)
+    if result is None:
+        result = compute_trends(start, end, granularity, group_by, filters, window)
+        cache.set(key, result, settings.TRENDS_CACHE_TIMEOUT)
+    return result
@@ -12,8 +12,22 @@ urlpatterns = [
     path('<int:pk>/edit/', views.InteractionUpdateView.as_view(), name='interaction_update'),
     path('<int:pk>/delete/', views.InteractionDeleteView.as_view(), name='interaction_delete'),
     
+    # Per-customer timeline
+    path('customer/<int:customer_id>/timeline/', views.customer_timeline, name='customer_timeline'),
+    path('api/customer/<int:customer_id>/timeline/', views.customer_timeline_api, name='customer_timeline_api'),
+    
+    # Follow-up worklist
+    path('worklist/', views.worklist_view, name='worklist'),
+    path('api/worklist/', views.worklist_api, name='worklist_api'),
+    path('<int:pk>/claim/', views.interaction_claim, name='interaction_claim'),
+    path('<int:pk>/release/', views.interaction_release, name='interaction_release'),
+    path('<int:pk>/complete/', views.interaction_complete, name='interaction_complete'),
+    
     # Analytics and reporting
     path('summary/', views.summary_view, name='summary'),
+    path('trends/', views.trends_view, name='trends'),
+    path('api/trends/', views.trends_api, name='trends_api'),
+    path('response-times/', views.response_times_view, name='response_times'),
     
     # Legacy URLs for backward compatibility
     path('legacy/<int:cid>/', views.interact, name='legacy_interact'),
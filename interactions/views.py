@@ -1,21 +1,30 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.db.models import Count, F, FloatField, Max, Q, Sum
+from django.http import JsonResponse, Http404
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_datetime
 from django.utils import timezone
-from datetime import date, timedelta
+from django.utils.http import url_has_allowed_host_and_scheme
+from datetime import timedelta
 import logging
 
-from .models import Interaction
-from .forms import InteractionForm, InteractionFilterForm
+from .models import Interaction, ResponseTimeSummary
+from .forms import InteractionForm, InteractionFilterForm, TrendsForm
+from .timeline import DEFAULT_PAGE_SIZE, InvalidCursor, get_timeline_page
+from . import trends, worklist
 from customer_management.models import Customer
+from customer360.daterange import days_ago
+from customer360 import identity
+from customer360.db_router import ReplicaReadMixin, replica_reads
+from customer360.identity import IdentityMapMixin
 
 logger = logging.getLogger(__name__)
 
 
-class InteractionListView(ListView):
+class InteractionListView(ReplicaReadMixin, ListView):
     """
     Display list of interactions with filtering and pagination.
     """
@@ -44,24 +53,21 @@ class InteractionListView(ListView):
         if status:
             queryset = queryset.filter(status=status)
         
-        date_from = self.request.GET.get('date_from')
-        if date_from:
-            queryset = queryset.filter(interaction_date__date__gte=date_from)
-        
-        date_to = self.request.GET.get('date_to')
-        if date_to:
-            queryset = queryset.filter(interaction_date__date__lte=date_to)
+        # Apply each date that is valid; the form shows errors for the rest.
+        self.filter_form = InteractionFilterForm(self.request.GET)
+        self.filter_form.is_valid()
+        queryset = queryset.filter(**self.filter_form.date_lookups())
         
         return queryset.order_by('-interaction_date')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['filter_form'] = InteractionFilterForm(self.request.GET)
+        context['filter_form'] = self.filter_form
         context['total_interactions'] = Interaction.objects.count()
         return context
 
 
-class InteractionDetailView(DetailView):
+class InteractionDetailView(IdentityMapMixin, DetailView):
     """
     Display detailed view of an interaction.
     """
@@ -69,6 +75,11 @@ class InteractionDetailView(DetailView):
     template_name = 'interactions/interaction_detail.html'
     context_object_name = 'interaction'
 
+    def get_object(self, queryset=None):
+        interaction = super().get_object(queryset)
+        interaction.customer = identity.get(Customer, interaction.customer_id)
+        return interaction
+
 
 class InteractionCreateView(CreateView):
     """
@@ -89,11 +100,11 @@ class InteractionCreateView(CreateView):
         context = super().get_context_data(**kwargs)
         customer_id = self.kwargs.get('customer_id')
         if customer_id:
-            context['customer'] = get_object_or_404(Customer, id=customer_id)
+            context['customer'] = identity.get_or_404(Customer, customer_id)
         return context
 
     def form_valid(self, form):
-        logger.info(f"Creating new interaction for customer: {form.cleaned_data['customer'].name}")
+        logger.info("Creating new interaction for customer: %s", form.cleaned_data['customer'].name)
         messages.success(self.request, "Interaction recorded successfully!")
         return super().form_valid(form)
 
@@ -108,12 +119,12 @@ class InteractionUpdateView(UpdateView):
     success_url = reverse_lazy('interactions:interaction_list')
 
     def form_valid(self, form):
-        logger.info(f"Updating interaction ID: {self.object.pk}")
+        logger.info("Updating interaction ID: %s", self.object.pk)
         messages.success(self.request, "Interaction updated successfully!")
         return super().form_valid(form)
 
 
-class InteractionDeleteView(DeleteView):
+class InteractionDeleteView(IdentityMapMixin, DeleteView):
     """
     Delete an interaction.
     """
@@ -121,33 +132,35 @@ class InteractionDeleteView(DeleteView):
     template_name = 'interactions/interaction_confirm_delete.html'
     success_url = reverse_lazy('interactions:interaction_list')
 
-    def delete(self, request, *args, **kwargs):
-        logger.info(f"Deleting interaction ID: {self.get_object().pk}")
-        messages.success(request, "Interaction deleted successfully!")
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        # Django 4 routes the confirmation POST here, not through delete().
+        logger.info("Deleting interaction ID: %s", self.object.pk)
+        messages.success(self.request, "Interaction deleted successfully!")
+        return super().form_valid(form)
 
 
+@replica_reads
 def summary_view(request):
     """
     Display interaction summary and analytics.
     """
     try:
         # Date range for analysis
-        thirty_days_ago = date.today() - timedelta(days=30)
-        seven_days_ago = date.today() - timedelta(days=7)
+        thirty_days_ago = days_ago(30)
+        seven_days_ago = days_ago(7)
         
         # Basic statistics
         total_interactions = Interaction.objects.count()
         interactions_30_days = Interaction.objects.filter(
-            interaction_date__date__gte=thirty_days_ago
+            interaction_date__gte=thirty_days_ago
         ).count()
         interactions_7_days = Interaction.objects.filter(
-            interaction_date__date__gte=seven_days_ago
+            interaction_date__gte=seven_days_ago
         ).count()
         
         # Channel breakdown (last 30 days)
         channel_stats = Interaction.objects.filter(
-            interaction_date__date__gte=thirty_days_ago
+            interaction_date__gte=thirty_days_ago
         ).values('channel', 'direction').annotate(
             count=Count('id')
         ).order_by('channel', 'direction')
@@ -159,7 +172,7 @@ def summary_view(request):
         
         # Top customers by interaction count (last 30 days)
         top_customers = Customer.objects.filter(
-            interactions__interaction_date__date__gte=thirty_days_ago
+            interactions__interaction_date__gte=thirty_days_ago
         ).annotate(
             interaction_count=Count('interactions')
         ).order_by('-interaction_count')[:10]
@@ -171,14 +184,14 @@ def summary_view(request):
             'channel_stats': channel_stats,
             'status_stats': status_stats,
             'top_customers': top_customers,
-            'date_range': f"{thirty_days_ago.strftime('%Y-%m-%d')} to {date.today().strftime('%Y-%m-%d')}"
+            'date_range': f"{thirty_days_ago:%Y-%m-%d} to {timezone.localdate():%Y-%m-%d}"
         }
         
-        logger.info(f"Generated summary with {total_interactions} total interactions")
+        logger.info("Generated summary with %s total interactions", total_interactions)
         return render(request, 'interactions/summary.html', context)
         
     except Exception as e:
-        logger.error(f"Error generating summary: {str(e)}")
+        logger.error("Error generating summary: %s", e)
         messages.error(request, "An error occurred while generating the summary.")
         return render(request, 'interactions/summary.html', {
             'total_interactions': 0,
@@ -190,6 +203,262 @@ def summary_view(request):
         })
 
 
+def _timeline_params(request):
+    """Extract timeline filters and paging parameters from the query string."""
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return {
+        'cursor': request.GET.get('cursor') or None,
+        'limit': limit,
+        'channel': request.GET.get('channel') or None,
+        'status': request.GET.get('status') or None,
+    }
+
+
+@replica_reads
+def customer_timeline(request, customer_id):
+    """
+    Display a customer's full interaction history one page at a time.
+    """
+    customer = identity.get_or_404(Customer, customer_id)
+    params = _timeline_params(request)
+    try:
+        page = get_timeline_page(customer.pk, **params)
+    except InvalidCursor:
+        raise Http404("Invalid timeline cursor")
+
+    context = {
+        'customer': customer,
+        'page': page,
+        'channel': params['channel'] or '',
+        'status': params['status'] or '',
+        'channel_choices': Interaction.CHANNEL_CHOICES,
+        'status_choices': Interaction.STATUS_CHOICES,
+        'is_first_page': params['cursor'] is None,
+    }
+    return render(request, 'interactions/customer_timeline.html', context)
+
+
+@replica_reads
+def customer_timeline_api(request, customer_id):
+    """
+    API endpoint returning one keyset page of a customer's interactions.
+    """
+    if not Customer.objects.filter(id=customer_id).exists():
+        return JsonResponse({'error': 'Customer not found'}, status=404)
+    try:
+        page = get_timeline_page(customer_id, **_timeline_params(request))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'customer': customer_id,
+        'results': page.items,
+        'next_cursor': page.next_cursor,
+        'has_more': page.has_more,
+    })
+
+
+def _worklist_params(request):
+    """Extract queue selection from the query string."""
+    params = {
+        'agent': request.GET.get('agent'),
+        'channel': request.GET.get('channel') or None,
+        'status': request.GET.get('status') or None,
+        'unclaimed': request.GET.get('unclaimed') == '1',
+    }
+    after_date = parse_datetime(request.GET.get('after_date', ''))
+    after_id = request.GET.get('after_id', '')
+    if after_date and after_id.isdigit():
+        params['after'] = (after_date, int(after_id))
+    return params
+
+
+def worklist_view(request):
+    """
+    Display open (pending / follow-up) interactions oldest first, by queue.
+    """
+    params = _worklist_params(request)
+    items = worklist.get_queue(**params)
+    counts = worklist.get_queue_counts()
+    channel_labels = dict(Interaction.CHANNEL_CHOICES)
+    context = {
+        'items': items,
+        'counts': counts,
+        'channel_queues': [
+            (name, channel_labels.get(name, name), count)
+            for name, count in sorted(counts['by_channel'].items())
+        ],
+        'agent': params['agent'],
+        'channel': params['channel'] or '',
+        'last_item': items[-1] if len(items) == worklist.DEFAULT_QUEUE_SIZE else None,
+    }
+    return render(request, 'interactions/worklist.html', context)
+
+
+def worklist_api(request):
+    """
+    API endpoint returning one page of a worklist queue plus queue counts.
+    """
+    try:
+        limit = int(request.GET.get('limit', worklist.DEFAULT_QUEUE_SIZE))
+    except ValueError:
+        limit = worklist.DEFAULT_QUEUE_SIZE
+    items = worklist.get_queue(limit=limit, **_worklist_params(request))
+    results = [
+        {
+            'id': item.pk,
+            'customer': item.customer_id,
+            'customer_name': item.customer.name,
+            'channel': item.channel,
+            'direction': item.direction,
+            'status': item.status,
+            'interaction_date': item.interaction_date,
+            'summary': item.summary,
+            'created_by': item.created_by,
+            'claimed_by': item.claimed_by,
+        }
+        for item in items
+    ]
+    return JsonResponse({'results': results, 'counts': worklist.get_queue_counts()})
+
+
+def _agent_name(request):
+    if request.user.is_authenticated:
+        return request.user.get_username()
+    return request.POST.get('agent', '').strip()
+
+
+def _worklist_redirect(request):
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(
+        next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+    ):
+        return redirect(next_url)
+    return redirect('interactions:worklist')
+
+
+def _worklist_response(request, ok, success_message, conflict_message):
+    if request.headers.get('Accept') == 'application/json':
+        return JsonResponse({'ok': ok}, status=200 if ok else 409)
+    if ok:
+        messages.success(request, success_message)
+    else:
+        messages.error(request, conflict_message)
+    return _worklist_redirect(request)
+
+
+def _agent_required(request):
+    message = "An agent name is required to change a worklist item."
+    if request.headers.get('Accept') == 'application/json':
+        return JsonResponse({'ok': False, 'error': message}, status=400)
+    messages.error(request, message)
+    return _worklist_redirect(request)
+
+
+@require_POST
+def interaction_claim(request, pk):
+    """Claim an open interaction from the worklist."""
+    agent = _agent_name(request)
+    if not agent:
+        return _agent_required(request)
+    ok = worklist.claim(pk, agent)
+    logger.info("Claim of interaction %s by %s: %s", pk, agent, 'ok' if ok else 'conflict')
+    return _worklist_response(
+        request, ok, "Item claimed.", "This item was already claimed or closed."
+    )
+
+
+@require_POST
+def interaction_release(request, pk):
+    """Release an interaction previously claimed by the current agent."""
+    agent = _agent_name(request)
+    if not agent:
+        return _agent_required(request)
+    ok = worklist.release(pk, agent)
+    return _worklist_response(
+        request, ok, "Item released.", "You don't hold a claim on this item."
+    )
+
+
+@require_POST
+def interaction_complete(request, pk):
+    """Mark an open worklist interaction as completed."""
+    agent = _agent_name(request)
+    if not agent:
+        return _agent_required(request)
+    ok = worklist.complete(pk, agent)
+    logger.info("Completion of interaction %s by %s: %s", pk, agent, 'ok' if ok else 'conflict')
+    return _worklist_response(
+        request, ok, "Item completed.", "This item was already closed or is claimed by someone else."
+    )
+
+
+@replica_reads
+def trends_view(request):
+    """
+    Display interaction counts over time with a moving average.
+    """
+    form = TrendsForm(request.GET)
+    trend = trends.get_trends(**form.trend_params()) if form.is_valid() else None
+    return render(request, 'interactions/trends.html', {'form': form, 'trend': trend})
+
+
+@replica_reads
+def trends_api(request):
+    """
+    API endpoint returning bucketed interaction counts and moving averages.
+    """
+    form = TrendsForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse(trends.get_trends(**form.trend_params()))
+
+
+@replica_reads
+def response_times_view(request):
+    """
+    Display precomputed response-time percentiles by day, channel and agent.
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timedelta(days=days)
+    summaries = ResponseTimeSummary.objects.filter(day__gte=since)
+    channel_labels = dict(Interaction.CHANNEL_CHOICES)
+
+    def period_totals(queryset, field):
+        # Daily percentiles can't be merged exactly, so periods show the
+        # response-weighted mean and the worst daily p90.
+        rows = queryset.values(field).annotate(
+            responses_total=Sum('responses'),
+            seconds_total=Sum(F('mean_seconds') * F('responses'), output_field=FloatField()),
+            worst_p90=Max('p90_seconds'),
+        ).order_by(field)
+        return [
+            {
+                'name': row[field],
+                'label': channel_labels.get(row[field], row[field]),
+                'responses': row['responses_total'],
+                'mean_minutes': row['seconds_total'] / row['responses_total'] / 60,
+                'worst_p90_minutes': row['worst_p90'] / 60,
+            }
+            for row in rows
+        ]
+
+    context = {
+        'days': days,
+        'period_options': [7, 30, 90],
+        'daily': summaries.filter(agent=''),
+        'by_channel': period_totals(summaries.filter(agent=''), 'channel'),
+        'by_agent': period_totals(summaries.exclude(agent=''), 'agent'),
+    }
+    return render(request, 'interactions/response_times.html', context)
+
+
 # Legacy function-based views for backward compatibility
 def interact(request, cid):
     """Legacy view - redirects to new interaction create view."""
@@ -0,0 +1,139 @@
+"""
+Follow-up worklist over open (pending / follow_up) interactions.
+
+Queues are served from partial indexes that only contain open rows, so
+their cost depends on the number of open items rather than the size of
+the interaction table. Claim, release and complete are single-row conditional
+UPDATEs, which makes concurrent agents race safely.
+"""
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from customer360 import metrics
+from customer_management.signals import bulk_updated
+from .models import Interaction
+
+COUNTS_CACHE_KEY = 'worklist:queue-counts'
+COUNTS_CACHE_TIMEOUT = 60
+DEFAULT_QUEUE_SIZE = 50
+MAX_QUEUE_SIZE = 200
+
+
+def _open_predicate(alias):
+    """
+    ``status IN (...)`` for querying database ``alias``.
+
+    SQLite only considers a partial index when the query repeats the
+    index's WHERE term literally; a bound parameter hides it from the
+    planner, so there the statuses are inlined as literals. They are
+    constants from the model, never user input.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return Q(status__in=Interaction.OPEN_STATUSES)
+    quote_name = connection.ops.quote_name
+    status = Interaction._meta.get_field('status').column
+    column = f'{quote_name(Interaction._meta.db_table)}.{quote_name(status)}'
+    literals = ', '.join(f"'{status}'" for status in Interaction.OPEN_STATUSES)
+    return ExpressionWrapper(RawSQL(f'{column} IN ({literals})', []), output_field=BooleanField())
+
+
+def open_interactions():
+    """Queryset of open interactions that can use the partial indexes."""
+    queryset = Interaction.objects.all()
+    return queryset.filter(_open_predicate(queryset.db))
+
+
+def get_queue(agent=None, channel=None, status=None, unclaimed=False, after=None,
+              limit=DEFAULT_QUEUE_SIZE):
+    """
+    Return open interactions oldest first, optionally for one queue.
+
+    ``after`` is an ``(interaction_date, id)`` pair from the previous page.
+    """
+    limit = max(1, min(limit, MAX_QUEUE_SIZE))
+    queryset = open_interactions().select_related('customer')
+    if agent is not None:
+        queryset = queryset.filter(created_by=agent)
+    if channel:
+        queryset = queryset.filter(channel=channel)
+    if status in Interaction.OPEN_STATUSES:
+        queryset = queryset.filter(status=status)
+    if unclaimed:
+        queryset = queryset.filter(claimed_by='')
+    if after:
+        last_date, last_pk = after
+        queryset = queryset.filter(interaction_date__gte=last_date).filter(
+            Q(interaction_date__gt=last_date) | Q(interaction_date=last_date, id__gt=last_pk)
+        )
+    return list(queryset.order_by('interaction_date', 'id')[:limit])
+
+
+def get_queue_counts():
+    """
+    Return open-item counts overall, per agent and per channel.
+
+    Cached until the next change to an interaction's status; the cache is
+    only a shortcut, the grouped queries themselves hit the partial indexes.
+    """
+    counts = cache.get(COUNTS_CACHE_KEY)
+    metrics.record_cache('queue_counts', counts is not None)
+    if counts is not None:
+        return counts
+
+    by_agent = {
+        row['created_by']: row['count']
+        for row in open_interactions().order_by().values('created_by').annotate(count=Count('id'))
+    }
+    by_channel = {
+        row['channel']: row['count']
+        for row in open_interactions().order_by().values('channel').annotate(count=Count('id'))
+    }
+    counts = {
+        'total': sum(by_channel.values()),
+        'by_agent': by_agent,
+        'by_channel': by_channel,
+    }
+    cache.set(COUNTS_CACHE_KEY, counts, COUNTS_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_queue_counts():
+    cache.delete(COUNTS_CACHE_KEY)
+
+
+def _transition(pk, filters, values):
+    """Apply ``values`` to one open interaction if ``filters`` still hold."""
+    with transaction.atomic():
+        updated = open_interactions().filter(pk=pk, **filters).update(**values)
+        if updated:
+            bulk_updated.send(sender=Interaction, pks=[pk], values=values)
+    return bool(updated)
+
+
+def claim(pk, agent):
+    """
+    Claim an unclaimed open item for ``agent``.
+
+    Returns False if the item is closed or someone else claimed it first.
+    """
+    return _transition(pk, {'claimed_by': ''}, {'claimed_by': agent, 'claimed_at': timezone.now()})
+
+
+def release(pk, agent):
+    """Give back an item previously claimed by ``agent``."""
+    if not agent:
+        return False
+    return _transition(pk, {'claimed_by': agent}, {'claimed_by': '', 'claimed_at': None})
+
+
+def complete(pk, agent):
+    """
+    Mark an open item completed on behalf of ``agent``.
+
+    Returns False if the item is closed or claimed by another agent.
+    """
+    return _transition(pk, {'claimed_by__in': ('', agent)}, {'status': 'completed'})
@@ -0,0 +1,32 @@
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .models import Segment, SegmentFact
+
+
+@admin.register(Segment)
+class SegmentAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'member_count', 'customer_list_link', 'updated_at']
+    search_fields = ['name', 'slug', 'description']
+    prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['created_at', 'updated_at']
+
+    def member_count(self, obj):
+        return len(obj.get_bitmap())
+    member_count.short_description = 'Customers'
+
+    def customer_list_link(self, obj):
+        url = reverse('customer_management:customer_list')
+        return format_html('<a href="{}?segment={}&is_active=">View customers</a>', url, obj.slug)
+    customer_list_link.short_description = 'Customers list'
+
+
+@admin.register(SegmentFact)
+class SegmentFactAdmin(admin.ModelAdmin):
+    list_display = ['key', 'definition', 'member_count', 'computed_at']
+    readonly_fields = ['key', 'definition', 'member_count', 'computed_at']
+    exclude = ['bitmap']
+
+    def has_add_permission(self, request):
+        return False
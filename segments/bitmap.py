@@ -0,0 +1,84 @@
+"""
+Compressed bitmaps of customer ids.
+
+A bitmap is held in memory as a Python int, where bit ``n`` set means
+customer ``n`` is a member. AND/OR/difference and popcount are then
+single C-level operations over the whole id space. On disk a bitmap is
+the zlib-compressed little-endian byte string of that int, which stays
+small for both sparse and dense segments.
+"""
+import zlib
+
+
+class Bitmap:
+    """Immutable set of non-negative integer ids backed by an int."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Build a bitmap from an iterable of ids in O(n)."""
+        ids = list(ids)
+        if not ids:
+            return cls()
+        buffer = bytearray(max(ids) // 8 + 1)
+        for i in ids:
+            buffer[i >> 3] |= 1 << (i & 7)
+        return cls(int.from_bytes(buffer, 'little'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data:
+            return cls()
+        return cls(int.from_bytes(zlib.decompress(bytes(data)), 'little'))
+
+    def to_bytes(self):
+        raw = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        return zlib.compress(raw)
+
+    def with_ids(self, added=(), removed=()):
+        """Return a copy with ``added`` set and ``removed`` cleared."""
+        mask_add = Bitmap.from_ids(added).bits
+        mask_remove = Bitmap.from_ids(removed).bits
+        return Bitmap((self.bits | mask_add) & ~mask_remove)
+
+    def __and__(self, other):
+        return Bitmap(self.bits & other.bits)
+
+    def __or__(self, other):
+        return Bitmap(self.bits | other.bits)
+
+    def __sub__(self, other):
+        return Bitmap(self.bits & ~other.bits)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and self.bits == other.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __contains__(self, i):
+        return i >= 0 and (self.bits >> i) & 1 == 1
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        """Yield member ids in ascending order."""
+        data = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        for index, byte in enumerate(data):
+            if not byte:
+                continue
+            base = index << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield base + bit
+
+    def __repr__(self):
+        return f"<Bitmap: {len(self)} ids>"
@@ -0,0 +1,318 @@
+"""
+Segment rule evaluation over materialized leaf bitmaps.
+
+A rule is a tree of ``and`` / ``or`` / ``not`` nodes whose leaves are
+either ``{"customer": {...}}`` or ``{"interaction": {...}}``. Each distinct
+leaf is stored once as a :class:`SegmentFact` bitmap; evaluating a segment
+loads its leaves and combines them in memory, so no query ever joins
+customers to interactions.
+
+Writes only append the affected customer ids to ``SegmentDirtyCustomer``.
+The next evaluation re-checks just those customers against every leaf and
+patches the bitmaps, up to ``SEGMENT_PATCH_LIMIT`` of them so a large
+backlog can't stall a request; ``rebuild_segments --patch`` drains the
+rest. Leaves with a ``within_days`` window are also rebuilt
+in full once older than ``SEGMENT_WINDOW_MAX_AGE`` seconds, since their
+membership changes with the clock.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import BooleanField, Count, ExpressionWrapper
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from customer360.db_router import use_primary
+from customer_management.models import Customer
+from interactions.models import Interaction
+from .bitmap import Bitmap
+from .models import SegmentDirtyCustomer, SegmentFact
+
+TEXT_LOOKUPS = {'exact', 'iexact', 'contains', 'icontains', 'startswith', 'istartswith'}
+CUSTOMER_TEXT_FIELDS = {'name', 'email', 'phone', 'address', 'social_media'}
+INTERACTION_FIELDS = {'channel', 'direction', 'status', 'created_by'}
+PATCH_BATCH_SIZE = 500
+
+# Leaf matching every customer; NOT is evaluated as a difference from it.
+UNIVERSE = {'customer': {}}
+
+
+class InvalidRule(ValueError):
+    """Raised when a segment rule is malformed."""
+
+
+def _positive_int(value, name):
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise InvalidRule(f"'{name}' must be a positive integer")
+    return value
+
+
+def _parse_customer_leaf(spec):
+    for key, value in spec.items():
+        if key == 'is_active':
+            if not isinstance(value, bool):
+                raise InvalidRule("'is_active' must be true or false")
+        elif key == 'created_within_days':
+            _positive_int(value, key)
+        else:
+            field, _, lookup = key.partition('__')
+            if field not in CUSTOMER_TEXT_FIELDS or (lookup and lookup not in TEXT_LOOKUPS):
+                raise InvalidRule(f"Unsupported customer condition '{key}'")
+            if not isinstance(value, str):
+                raise InvalidRule(f"'{key}' must be a string")
+
+
+def _parse_interaction_leaf(spec):
+    if not spec:
+        raise InvalidRule("Interaction conditions can't be empty")
+    choices = {
+        'channel': {c for c, _ in Interaction.CHANNEL_CHOICES},
+        'direction': {c for c, _ in Interaction.DIRECTION_CHOICES},
+        'status': {c for c, _ in Interaction.STATUS_CHOICES},
+    }
+    for key, value in spec.items():
+        if key in ('within_days', 'min_count'):
+            _positive_int(value, key)
+            continue
+        if key not in INTERACTION_FIELDS:
+            raise InvalidRule(f"Unsupported interaction condition '{key}'")
+        values = value if isinstance(value, list) else [value]
+        if not values or not all(isinstance(v, str) for v in values):
+            raise InvalidRule(f"'{key}' must be a string or a list of strings")
+        if key in choices and not set(values) <= choices[key]:
+            raise InvalidRule(f"Unknown {key} in {values}")
+
+
+def parse_rule(rule):
+    """
+    Validate ``rule`` and return its distinct leaves.
+
+    Raises :class:`InvalidRule` describing the first problem found.
+    """
+    leaves = []
+
+    def walk(node):
+        if not isinstance(node, dict) or len(node) != 1:
+            raise InvalidRule("Each rule node must be an object with exactly one key")
+        (op, arg), = node.items()
+        if op in ('and', 'or'):
+            if not isinstance(arg, list) or not arg:
+                raise InvalidRule(f"'{op}' takes a non-empty list of rules")
+            for child in arg:
+                walk(child)
+        elif op == 'not':
+            walk(arg)
+            leaves.append(UNIVERSE)
+        elif op in ('customer', 'interaction'):
+            if not isinstance(arg, dict):
+                raise InvalidRule(f"'{op}' takes an object of conditions")
+            if op == 'customer':
+                _parse_customer_leaf(arg)
+            else:
+                _parse_interaction_leaf(arg)
+            leaves.append(node)
+        else:
+            raise InvalidRule(f"Unknown rule operator '{op}'")
+
+    walk(rule)
+    unique = {}
+    for leaf in leaves:
+        unique.setdefault(leaf_key(leaf), leaf)
+    return unique
+
+
+def leaf_key(leaf):
+    canonical = json.dumps(leaf, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def _is_windowed(leaf):
+    spec = next(iter(leaf.values()))
+    return 'within_days' in spec or 'created_within_days' in spec
+
+
+def leaf_customer_ids(leaf, customer_ids=None):
+    """
+    Return the ids of customers matching ``leaf``.
+
+    With ``customer_ids``, only those customers are checked.
+    """
+    (kind, spec), = leaf.items()
+    now = timezone.now()
+    if kind == 'customer':
+        queryset = Customer.objects.all()
+        for key, value in spec.items():
+            if key == 'created_within_days':
+                queryset = queryset.filter(created_at__gte=now - timedelta(days=value))
+            else:
+                queryset = queryset.filter(**{key: value})
+        if customer_ids is not None:
+            queryset = queryset.filter(pk__in=customer_ids)
+        return queryset.order_by().values_list('pk', flat=True)
+
+    queryset = Interaction.objects.all()
+    for key, value in spec.items():
+        if key == 'within_days':
+            queryset = queryset.filter(interaction_date__gte=now - timedelta(days=value))
+        elif key in INTERACTION_FIELDS:
+            lookup = f'{key}__in' if isinstance(value, list) else key
+            queryset = queryset.filter(**{lookup: value})
+    if customer_ids is not None:
+        queryset = queryset.filter(customer_id__in=customer_ids)
+    queryset = queryset.order_by().values('customer_id')
+    if spec.get('min_count', 1) > 1:
+        queryset = queryset.annotate(n=Count('id')).filter(n__gte=spec['min_count'])
+    return queryset.values_list('customer_id', flat=True).distinct()
+
+
+def _save_fact(fact, bitmap, rebuilt=False):
+    fact.bitmap = bitmap.to_bytes()
+    fact.member_count = len(bitmap)
+    update_fields = ['bitmap', 'member_count']
+    if rebuilt:
+        fact.computed_at = timezone.now()
+        update_fields.append('computed_at')
+    if fact.pk:
+        fact.save(update_fields=update_fields)
+    else:
+        fact.save()
+
+
+def rebuild_fact(fact):
+    """Recompute ``fact`` from scratch and return its bitmap."""
+    bitmap = Bitmap.from_ids(leaf_customer_ids(fact.definition).iterator(chunk_size=10000))
+    _save_fact(fact, bitmap, rebuilt=True)
+    return bitmap
+
+
+def apply_dirty_customers(limit=None):
+    """
+    Re-check customers marked dirty against all facts.
+
+    With ``limit``, only the oldest ``limit`` dirty rows are consumed.
+    Returns the number of dirty customers re-checked.
+    """
+    with transaction.atomic():
+        dirty = list(SegmentDirtyCustomer.objects.order_by('id').values_list('id', 'customer_id')[:limit])
+        if not dirty:
+            return 0
+        customer_ids = sorted({customer_id for _, customer_id in dirty})
+        for fact in SegmentFact.objects.select_for_update():
+            bitmap = Bitmap.from_bytes(fact.bitmap)
+            for start in range(0, len(customer_ids), PATCH_BATCH_SIZE):
+                batch = customer_ids[start:start + PATCH_BATCH_SIZE]
+                matching = set(leaf_customer_ids(fact.definition, batch))
+                bitmap = bitmap.with_ids(
+                    added=matching,
+                    removed=[pk for pk in batch if pk not in matching],
+                )
+            _save_fact(fact, bitmap)
+        # Rows added after the read above are left for the next patch.
+        SegmentDirtyCustomer.objects.filter(id__lte=max(pk for pk, _ in dirty)).delete()
+    return len(customer_ids)
+
+
+def load_leaf_bitmaps(leaves):
+    """Return ``{key: Bitmap}`` for ``leaves``, materializing missing ones."""
+    apply_dirty_customers(limit=settings.SEGMENT_PATCH_LIMIT)
+    facts = SegmentFact.objects.in_bulk(list(leaves), field_name='key')
+    max_age = timedelta(seconds=settings.SEGMENT_WINDOW_MAX_AGE)
+    now = timezone.now()
+    bitmaps = {}
+    for key, leaf in leaves.items():
+        fact = facts.get(key)
+        if fact is None:
+            try:
+                with transaction.atomic():
+                    bitmaps[key] = rebuild_fact(SegmentFact(key=key, definition=leaf))
+            except IntegrityError:
+                # Materialized concurrently by another request.
+                bitmaps[key] = Bitmap.from_bytes(SegmentFact.objects.get(key=key).bitmap)
+        elif _is_windowed(leaf) and now - fact.computed_at > max_age:
+            bitmaps[key] = rebuild_fact(fact)
+        else:
+            bitmaps[key] = Bitmap.from_bytes(fact.bitmap)
+    return bitmaps
+
+
+def evaluate(rule):
+    """Return the :class:`Bitmap` of customers matching ``rule``."""
+    leaves = parse_rule(rule)
+    # Patching writes bitmaps back, so it must start from primary data.
+    with use_primary():
+        bitmaps = load_leaf_bitmaps(leaves)
+    universe = bitmaps.get(leaf_key(UNIVERSE))
+
+    def combine(node):
+        (op, arg), = node.items()
+        if op == 'and':
+            result = combine(arg[0])
+            for child in arg[1:]:
+                result = result & combine(child)
+            return result
+        if op == 'or':
+            result = Bitmap()
+            for child in arg:
+                result = result | combine(child)
+            return result
+        if op == 'not':
+            return universe - combine(arg)
+        return bitmaps[leaf_key(node)]
+
+    return combine(rule)
+
+
+def mark_dirty(customer_ids):
+    """Record customers whose segment membership needs re-checking."""
+    customer_ids = {pk for pk in customer_ids if pk is not None}
+    if not customer_ids or not SegmentFact.objects.exists():
+        return
+    SegmentDirtyCustomer.objects.bulk_create(
+        [SegmentDirtyCustomer(customer_id=pk) for pk in customer_ids]
+    )
+
+
+def filter_by_bitmap(queryset, bitmap):
+    """
+    Restrict ``queryset`` to primary keys in ``bitmap``.
+
+    Large segments would overflow the bound-parameter limit of a plain
+    ``pk__in``, so on SQLite and PostgreSQL the ids are passed as a single
+    JSON / array parameter.
+    """
+    if not bitmap:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    column = queryset.model._meta.pk.column
+    ids = list(bitmap)
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        sql, params = f'"{table}"."{column}" IN (SELECT value FROM json_each(%s))', [json.dumps(ids)]
+    elif vendor == 'postgresql':
+        sql, params = f'"{table}"."{column}" = ANY(%s)', [ids]
+    else:
+        return queryset.filter(pk__in=ids)
+    return queryset.filter(ExpressionWrapper(RawSQL(sql, params), output_field=BooleanField()))
+
+
+def rebuild_segment_facts():
+    """
+    Rebuild every leaf used by a saved segment and drop unused leaves.
+
+    Returns the number of facts rebuilt.
+    """
+    from .models import Segment
+
+    leaves = {}
+    for rule in Segment.objects.values_list('rule', flat=True):
+        leaves.update(parse_rule(rule))
+    with use_primary(), transaction.atomic():
+        SegmentDirtyCustomer.objects.all().delete()
+        SegmentFact.objects.exclude(key__in=list(leaves)).delete()
+        existing = SegmentFact.objects.in_bulk(list(leaves), field_name='key')
+        for key, leaf in leaves.items():
+            rebuild_fact(existing.get(key) or SegmentFact(key=key, definition=leaf))
+    return len(leaves)
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from customer360.db_router import use_primary
+from segments.engine import apply_dirty_customers, rebuild_segment_facts
+
+
+class Command(BaseCommand):
+    help = "Rebuild the bitmaps behind every saved segment and drop unused ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patch',
+            action='store_true',
+            help="Only re-check customers marked dirty, in batches of SEGMENT_PATCH_LIMIT",
+        )
+
+    def handle(self, *args, **options):
+        if options['patch']:
+            patched = 0
+            with use_primary():
+                while batch := apply_dirty_customers(limit=settings.SEGMENT_PATCH_LIMIT):
+                    patched += batch
+            self.stdout.write(self.style.SUCCESS(f"Patched segment facts for {patched} customers"))
+            return
+        rebuilt = rebuild_segment_facts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} segment facts"))
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Segment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('rule', models.JSONField(help_text='Rule tree of and/or/not over customer and interaction leaves')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Segment',
+                'verbose_name_plural': 'Segments',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SegmentDirtyCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SegmentFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=40, unique=True)),
+                ('definition', models.JSONField()),
+                ('bitmap', models.BinaryField(help_text='zlib-compressed customer id bitmap')),
+                ('member_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(help_text='Last full rebuild')),
+            ],
+            options={
+                'verbose_name': 'Segment Fact',
+                'verbose_name_plural': 'Segment Facts',
+            },
+        ),
+    ]
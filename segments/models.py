@@ -0,0 +1,73 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+class Segment(models.Model):
+    """
+    Named customer segment defined by a rule over customer fields and
+    interaction facts.
+
+    Rules are JSON trees, e.g. active customers emailed in the last 30 days
+    who never called in::
+
+        {"and": [
+            {"customer": {"is_active": true}},
+            {"interaction": {"channel": "email", "within_days": 30}},
+            {"not": {"interaction": {"channel": "phone", "direction": "inbound"}}}
+        ]}
+    """
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
+    rule = models.JSONField(help_text="Rule tree of and/or/not over customer and interaction leaves")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Segment'
+        verbose_name_plural = 'Segments'
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from .engine import InvalidRule, parse_rule
+        try:
+            parse_rule(self.rule)
+        except InvalidRule as e:
+            raise ValidationError({'rule': str(e)})
+
+    def get_bitmap(self):
+        """Return the segment's members as a :class:`~segments.bitmap.Bitmap`."""
+        from .engine import evaluate
+        return evaluate(self.rule)
+
+
+class SegmentFact(models.Model):
+    """
+    Materialized bitmap of the customers matching one rule leaf.
+
+    Leaves are shared between segments through ``key``, a hash of the
+    leaf's canonical JSON.
+    """
+    key = models.CharField(max_length=40, unique=True)
+    definition = models.JSONField()
+    bitmap = models.BinaryField(help_text="zlib-compressed customer id bitmap")
+    member_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(help_text="Last full rebuild")
+
+    class Meta:
+        verbose_name = 'Segment Fact'
+        verbose_name_plural = 'Segment Facts'
+
+    def __str__(self):
+        return f"{self.definition} ({self.member_count})"
+
+
+class SegmentDirtyCustomer(models.Model):
+    """
+    Customer whose fact membership may have changed since the bitmaps were
+    last patched. Rows are appended on writes and consumed on evaluation.
+    """
+    customer_id = models.BigIntegerField()
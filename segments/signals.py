@@ -0,0 +1,42 @@
+"""
+Signal receivers queueing customers for segment bitmap patching.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customer_management.models import Customer
+from customer_management.signals import bulk_updated
+from interactions.models import Interaction
+from .engine import mark_dirty
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def mark_customer_dirty(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_dirty([instance.pk])
+
+
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+def mark_interaction_customer_dirty(sender, instance, raw=False, origin=None, **kwargs):
+    if raw:
+        return
+    # Cascades from a customer delete are covered by the customer's own row.
+    if isinstance(origin, Customer) or getattr(origin, 'model', None) is Customer:
+        return
+    # _previous_customer_id is set by interactions.signals on reassignment.
+    mark_dirty([instance.customer_id, getattr(instance, '_previous_customer_id', None)])
+
+
+@receiver(bulk_updated, sender=Customer)
+def mark_bulk_customers_dirty(sender, pks, **kwargs):
+    mark_dirty(pks)
+
+
+@receiver(bulk_updated, sender=Interaction)
+def mark_bulk_interaction_customers_dirty(sender, pks, previous_customer_ids=(), **kwargs):
+    customer_ids = set(
+        Interaction.objects.filter(pk__in=pks).order_by().values_list('customer_id', flat=True).distinct()
+    )
+    mark_dirty(customer_ids | set(previous_customer_ids))
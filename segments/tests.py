@@ -0,0 +1,138 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from interactions.models import Interaction
+from interactions.tests import InteractionTestMixin
+from .bitmap import Bitmap
+from .engine import evaluate, rebuild_segment_facts
+from .models import Segment, SegmentDirtyCustomer, SegmentFact
+
+EMAILED_NO_INBOUND_CALL = {'and': [
+    {'customer': {'is_active': True}},
+    {'interaction': {'channel': 'email', 'within_days': 30}},
+    {'not': {'interaction': {'channel': 'phone', 'direction': 'inbound'}}},
+]}
+
+
+class BitmapTest(TestCase):
+    """Test cases for the compressed id bitmap."""
+
+    def test_set_algebra(self):
+        a = Bitmap.from_ids([1, 5, 9, 1000])
+        b = Bitmap.from_ids([5, 1000, 2000])
+        self.assertEqual(list(a & b), [5, 1000])
+        self.assertEqual(list(a | b), [1, 5, 9, 1000, 2000])
+        self.assertEqual(list(a - b), [1, 9])
+        self.assertEqual(len(a), 4)
+        self.assertIn(9, a)
+        self.assertNotIn(2000, a)
+
+    def test_round_trip(self):
+        bitmap = Bitmap.from_ids(range(0, 100000, 3))
+        data = bitmap.to_bytes()
+        self.assertLess(len(data), 100000 // 8)
+        self.assertEqual(Bitmap.from_bytes(data), bitmap)
+        self.assertEqual(Bitmap.from_bytes(Bitmap().to_bytes()), Bitmap())
+
+    def test_with_ids(self):
+        bitmap = Bitmap.from_ids([1, 2, 3]).with_ids(added=[10], removed=[2, 7])
+        self.assertEqual(list(bitmap), [1, 3, 10])
+
+
+class SegmentEngineTest(InteractionTestMixin, TestCase):
+    """Test cases for segment evaluation and incremental refresh."""
+
+    def setUp(self):
+        self.emailed = self.create_customer(name='Emailed', email='emailed@example.com')
+        self.caller = self.create_customer(name='Caller', email='caller@example.com')
+        self.inactive = self.create_customer(
+            name='Inactive', email='inactive@example.com', is_active=False
+        )
+        self.quiet = self.create_customer(name='Quiet', email='quiet@example.com')
+        for customer in (self.emailed, self.caller, self.inactive):
+            self.create_interaction(customer, channel='email')
+        self.create_interaction(self.caller, channel='phone', direction='inbound')
+
+    def test_evaluate_rule(self):
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [self.emailed.pk])
+
+    def test_or_and_min_count(self):
+        rule = {'or': [
+            {'interaction': {'channel': 'phone'}},
+            {'customer': {'name__istartswith': 'qu'}},
+        ]}
+        self.assertEqual(set(evaluate(rule)), {self.caller.pk, self.quiet.pk})
+        self.assertEqual(
+            list(evaluate({'interaction': {'min_count': 2}})), [self.caller.pk]
+        )
+
+    def test_leaves_are_shared_and_patched_incrementally(self):
+        evaluate(EMAILED_NO_INBOUND_CALL)
+        facts = SegmentFact.objects.count()
+        self.create_interaction(self.emailed, channel='phone', direction='inbound')
+        self.assertTrue(SegmentDirtyCustomer.objects.exists())
+
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [])
+        self.assertFalse(SegmentDirtyCustomer.objects.exists())
+        self.assertEqual(SegmentFact.objects.count(), facts)
+
+        self.emailed.interactions.filter(channel='phone').delete()
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [self.emailed.pk])
+
+    def test_customer_changes_patch_bitmaps(self):
+        evaluate(EMAILED_NO_INBOUND_CALL)
+        self.emailed.is_active = False
+        self.emailed.save()
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [])
+
+    def test_patching_is_capped_per_evaluation(self):
+        evaluate(EMAILED_NO_INBOUND_CALL)
+        for customer in (self.emailed, self.quiet):
+            self.create_interaction(customer, channel='phone', direction='inbound')
+        with self.settings(SEGMENT_PATCH_LIMIT=1):
+            evaluate(EMAILED_NO_INBOUND_CALL)
+            dirty = SegmentDirtyCustomer.objects.values_list('customer_id', flat=True)
+            self.assertEqual(list(dirty), [self.quiet.pk])
+            out = StringIO()
+            call_command('rebuild_segments', '--patch', stdout=out)
+        self.assertIn('Patched segment facts for 1 customers', out.getvalue())
+        self.assertFalse(SegmentDirtyCustomer.objects.exists())
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [])
+
+    def test_window_leaves_expire(self):
+        evaluate(EMAILED_NO_INBOUND_CALL)
+        Interaction.objects.filter(customer=self.emailed).update(
+            interaction_date=timezone.now() - timedelta(days=40)
+        )
+        self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [self.emailed.pk])
+        with self.settings(SEGMENT_WINDOW_MAX_AGE=0):
+            self.assertEqual(list(evaluate(EMAILED_NO_INBOUND_CALL)), [])
+
+    def test_invalid_rule(self):
+        segment = Segment(name='Bad', slug='bad', rule={'interaction': {'channel': 'fax'}})
+        with self.assertRaises(ValidationError):
+            segment.full_clean()
+
+    def test_rebuild_drops_unused_facts(self):
+        evaluate({'interaction': {'channel': 'sms'}})
+        Segment.objects.create(name='Emailed', slug='emailed', rule=EMAILED_NO_INBOUND_CALL)
+        self.assertEqual(rebuild_segment_facts(), 4)
+        self.assertEqual(SegmentFact.objects.count(), 4)
+
+    def test_customer_list_and_export_filter_by_segment(self):
+        Segment.objects.create(name='Emailed', slug='emailed', rule=EMAILED_NO_INBOUND_CALL)
+        response = self.client.get(reverse('customer_management:customer_list'), {'segment': 'emailed'})
+        self.assertEqual(list(response.context['customers']), [self.emailed])
+
+        response = self.client.get(
+            reverse('customer_management:customer_export'), {'segment': 'emailed', 'is_active': ''}
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('emailed@example.com', lines[1])